@@ -212,8 +212,8 @@ async def read_excel_content(request: Dict[str, Any]):
         # 创建Excel读取器
         reader = StoreMetricsReader(file_path, reading_mode, target_month)
         
-        # 读取Excel内容
-        result = reader.read_excel()
+        # 读取Excel内容（同一文件的解析结果缓存复用）
+        result = reader.read_excel_cached()
         
         if not result["success"]:
             logger.warning(f"读取Excel内容失败: {result['message']}")
@@ -252,8 +252,8 @@ async def get_store_metrics(store_name: str, file_path: str):
         # 创建Excel读取器
         reader = StoreMetricsReader(file_path)
         
-        # 读取Excel内容
-        result = reader.read_excel()
+        # 读取Excel内容（同一文件的解析结果缓存复用）
+        result = reader.read_excel_cached()
         
         if not result["success"]:
             raise HTTPException(status_code=400, detail=result["message"])
@@ -288,8 +288,12 @@ async def get_metric_daily_data(store_name: str, metric_name: str, file_path: st
     try:
         logger.info(f"收到获取每日数据请求: {store_name}, {metric_name}, 文件: {file_path}")
         
-        # 创建Excel读取器
+        # 创建Excel读取器，从缓存的解析结果中取出门店数据
         reader = StoreMetricsReader(file_path)
+        result = reader.read_excel_cached()
+        if not result["success"]:
+            raise HTTPException(status_code=400, detail=result["message"])
+        reader.store_data = result["data"]
         
         # 获取每日数据
         daily_data = reader.get_daily_data(store_name, metric_name)
@@ -314,6 +318,25 @@ async def get_metric_daily_data(store_name: str, metric_name: str, file_path: st
         raise HTTPException(status_code=500, detail=f"获取每日数据失败: {str(e)}")
 
 
+@router.get("/workbook-cache")
+async def get_workbook_cache_stats():
+    """
+    获取工作簿解析结果缓存的统计信息
+    """
+    from backend.utils.workbook_cache import workbook_cache
+    return {"success": True, "stats": workbook_cache.stats()}
+
+
+@router.delete("/workbook-cache")
+async def clear_workbook_cache():
+    """
+    清空工作簿解析结果缓存
+    """
+    from backend.utils.workbook_cache import workbook_cache
+    workbook_cache.clear()
+    return {"success": True, "message": "工作簿缓存已清空"}
+
+
 @router.get("/store-tracking")
 async def get_store_tracking():
     """
@@ -90,6 +90,22 @@ app.include_router(sync.router)
 app.include_router(export.router)
 app.include_router(import_api.router, prefix="/api/import", tags=["import"])
 
+@app.on_event("startup")
+async def start_sync_scheduler():
+    """启动定时同步（规则保存在config.db的sync_schedules表中）"""
+    from backend.utils.scheduler import sync_scheduler
+    sync_scheduler.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_sync_jobs():
+    """应用退出时停止定时同步和同步任务队列，关闭常驻爬虫工作进程和正在运行的爬虫进程"""
+    from backend.utils.scheduler import sync_scheduler
+    from backend.utils.sync_jobs import sync_job_manager
+    await sync_scheduler.stop()
+    await sync_job_manager.shutdown()
+
+
 # 添加端口信息接口
 @app.get("/port-info")
 async def get_port_info():
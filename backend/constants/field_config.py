@@ -102,6 +102,30 @@ EXCEL_METRICS_MAPPING = {
     "美团综合体体验分": "meituanComprehensiveExperienceDivision"
 }
 
+# 对比Excel和数据库数据时各字段的单位
+# percent: 百分比，"95.5%"取百分号前的数值，0~1之间的小数乘以100（数据库可能存小数或百分数）
+# number: 普通数值（评分、数量等），不做换算
+# 未声明的字段按percent的规则处理
+FIELD_UNITS = {
+    "monthlyCanceledRate": "percent",
+    "dailyCanceledRate": "percent",
+    "monthlyMerchantRefundRate": "percent",
+    "monthlyOosRefundRate": "percent",
+    "monthlyPartialRefundRate": "percent",
+    "monthlyBadReviewRate": "percent",
+    "dailyMeituanReplyRate": "percent",
+    "monthlyMeituanPunctualityRate": "percent",
+    "monthlyElemeOntimeRate": "percent",
+    "monthlyJdFulfillmentRate": "percent",
+    "monthlyAvgStockRate": "percent",
+    "monthlyAvgTop500StockRate": "percent",
+    "monthlyAvgDirectStockRate": "percent",
+    "dailyMeituanRating": "number",
+    "dailyElemeRating": "number",
+    "monthlyBadReviews": "number",
+    "meituanComprehensiveExperienceDivision": "number",
+}
+
 def get_field_display_name(field_key: str) -> str:
     """获取字段的显示名称"""
     return FIELD_CONFIG.get(field_key, {}).get("name", field_key)
@@ -117,3 +141,7 @@ def get_all_field_keys() -> list:
 def get_excel_metric_key(excel_metric_name: str) -> str:
     """根据Excel中的指标名称获取对应的字段键名"""
     return EXCEL_METRICS_MAPPING.get(excel_metric_name, excel_metric_name)
+
+def get_field_unit(field_key: str) -> str:
+    """获取字段对比时使用的单位"""
+    return FIELD_UNITS.get(field_key, "percent")
@@ -13,6 +13,7 @@ from datetime import datetime, date
 class SyncRequest(BaseModel):
     """同步请求模型"""
     date: Optional[str] = None  # 可选，如果不提供则使用默认日期
+    wait: bool = True  # 是否等待同步任务结束；为False时立即返回任务ID
 
 
 class SyncDataRequest(BaseModel):
@@ -24,6 +25,20 @@ class BatchSyncRequest(BaseModel):
     """批量同步请求模型"""
     start_date: str
     end_date: Optional[str] = None  # 如果不提供，默认等于start_date
+    resume: bool = False  # 是否从上次中断的检查点继续，跳过已完成的日期
+    plan: bool = False  # 是否先生成爬取计划，只爬取缺失或有变化的日期
+
+
+class SyncScheduleRequest(BaseModel):
+    """定时同步规则请求模型"""
+    name: str
+    cron: str  # 分 时 日 月 周，如 "30 6 * * *"
+    kind: str = 'sync'  # sync: 单日；batch: 日期范围；plan: 只爬取缺失或有变化的日期
+    start_offset_days: int = 1  # 开始日期 = 今天 - N天
+    end_offset_days: int = 1  # 结束日期 = 今天 - N天
+    jitter_seconds: int = 0  # 在触发时间后随机延迟0~N秒
+    skip_windows: List[str] = []  # 不运行的时间窗口，如 ["09:00-12:00"]
+    enabled: bool = True
 
 
 class ExportDataRequest(BaseModel):
@@ -72,6 +87,10 @@ class SyncResponse(BaseModel):
     message: str
     total: Optional[int] = None
     error_code: Optional[str] = None
+    plan: Optional[Dict[str, Any]] = None  # 爬取计划（批量同步时请求了plan）
+    report: Optional[Dict[str, Any]] = None  # 运行报告（各阶段耗时p50/p95、入库和网络统计）
+    job_id: Optional[str] = None  # 同步任务ID，可通过 /api/sync-jobs/{job_id} 查询进度
+    status: Optional[str] = None  # 同步任务状态：queued / running / succeeded / failed
 
 
 class DataResponse(BaseModel):
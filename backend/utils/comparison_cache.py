@@ -0,0 +1,82 @@
+"""
+数据对比结果缓存
+按（Excel文件名, 目标月份）保存最近一次对比的中间结果，用户修改几个单元格或多同步一天数据后
+重新对比时，只重新计算Excel数据或数据库数据有变化的门店：
+
+- 每个门店保存Excel数据的内容哈希、匹配到的数据库门店和对比结果
+- 每个日期数据库文件保存版本（大小、修改时间），只重新读取有变化的日期
+- 数据库门店的数据按日期分别保存，用于合并出最新的整月数据
+
+同时记录每个导出文件对应的对比数据哈希，对比数据没有变化时不重新生成导出的Excel
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from backend.utils.workbook_cache import file_identity
+
+# 最多保存的对比结果数
+DEFAULT_MAX_ENTRIES = 4
+
+
+def content_hash(value: Any) -> str:
+    """数据内容的哈希（字典按键排序，无法序列化的值按字符串处理）"""
+    payload = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.md5(payload.encode('utf-8')).hexdigest()
+
+
+class ComparisonCache:
+    """进程内共享的对比结果缓存（线程安全）"""
+
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries or int(os.environ.get('KSX_COMPARISON_CACHE_ENTRIES', DEFAULT_MAX_ENTRIES))
+        self._entries: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        # 导出文件路径 -> (文件身份, 对比数据哈希)
+        self._exports: Dict[str, Tuple[Tuple[str, int, int], str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        """上一次对比的中间结果（由调用方共享，不应被修改）"""
+        with self._lock:
+            state = self._entries.get(key)
+            if state is not None:
+                self._entries.move_to_end(key)
+            return state
+
+    def put(self, key: Tuple, state: Dict[str, Any]):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = state
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def export_is_current(self, file_path: str, data_hash: str) -> bool:
+        """导出文件是否已经是该对比数据生成的（文件生成后未被修改或删除）"""
+        with self._lock:
+            recorded = self._exports.get(file_path)
+        if recorded is None or recorded[1] != data_hash:
+            return False
+        try:
+            return file_identity(file_path) == recorded[0]
+        except OSError:
+            return False
+
+    def remember_export(self, file_path: str, data_hash: str):
+        try:
+            identity = file_identity(file_path)
+        except OSError:
+            return
+        with self._lock:
+            self._exports[file_path] = (identity, data_hash)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._exports.clear()
+
+
+# 全局对比结果缓存
+comparison_cache = ComparisonCache()
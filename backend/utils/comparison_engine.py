@@ -0,0 +1,129 @@
+"""
+Excel与数据库指标值的批量对比
+把一个门店所有（指标, 日期）的Excel值和数据库值转换为对齐的NumPy浮点数组（缺失值为NaN），
+按字段单位统一换算后一次计算出差异掩码，代替逐个值的字符串解析和比较
+
+判断规则与逐个比较相同：
+- 两边都为空（None）时一致，只有一边为空时不一致
+- "95.5%"取百分号前的数值；percent单位的字段中0~1之间的数值乘以100
+- 空字符串和无法解析的值按0处理
+- 换算后的差值超过COMPARISON_TOLERANCE时不一致
+"""
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from backend.constants.field_config import get_field_unit
+
+# 换算后的数值差超过该值视为不一致（考虑到四舍五入误差）
+COMPARISON_TOLERANCE = 0.0001
+
+# 需要把0~1的小数换算为百分数的单位
+_SCALED_UNITS = frozenset(["percent"])
+
+
+def _parse_value(value: Any) -> Tuple[float, bool]:
+    """
+    单个值转为数值
+
+    Returns:
+        (数值, 是否为百分号格式的文本)
+    """
+    if type(value) is float or type(value) is int:
+        return float(value), False
+    if value == "":
+        return 0.0, False
+    try:
+        value_str = str(value).strip()
+        if value_str.endswith('%'):
+            return float(value_str[:-1]), True
+        return float(value_str), False
+    except (ValueError, TypeError):
+        return 0.0, False
+
+
+def normalize_values(values: Sequence[Any], units: Sequence[str]) -> np.ndarray:
+    """
+    把一组值按各自的单位换算为可比较的浮点数组，None为NaN
+
+    Args:
+        values: 原始值（Excel或数据库中的值）
+        units: 与values一一对应的字段单位
+    """
+    numbers: List[float] = []
+    percent_text: List[bool] = []
+    # 同一个文本值（如"98.50%"）在一个门店中会重复出现，只解析一次
+    parsed: Dict[str, Tuple[float, bool]] = {}
+    for value in values:
+        if value is None:
+            number, is_percent = np.nan, False
+        elif type(value) is float or type(value) is int:
+            number, is_percent = float(value), False
+        elif type(value) is str:
+            result = parsed.get(value)
+            if result is None:
+                result = parsed[value] = _parse_value(value)
+            number, is_percent = result
+        else:
+            number, is_percent = _parse_value(value)
+        numbers.append(number)
+        percent_text.append(is_percent)
+
+    numbers = np.array(numbers, dtype=float)
+    scaled = np.array([unit in _SCALED_UNITS for unit in units], dtype=bool)
+    with np.errstate(invalid='ignore'):
+        scale = scaled & ~np.array(percent_text, dtype=bool) & (numbers >= 0) & (numbers <= 1)
+    numbers[scale] *= 100
+    return numbers
+
+
+def difference_mask(excel_values: Sequence[Any], db_values: Sequence[Any], units: Sequence[str]) -> np.ndarray:
+    """
+    逐项判断Excel值和数据库值是否不一致
+
+    Returns:
+        与输入等长的布尔数组，True表示不一致
+    """
+    excel_numbers = normalize_values(excel_values, units)
+    db_numbers = normalize_values(db_values, units)
+    excel_missing = np.array([value is None for value in excel_values], dtype=bool)
+    db_missing = np.array([value is None for value in db_values], dtype=bool)
+    # "nan"等解析为NaN的值与任何非空值都视为一致
+    with np.errstate(invalid='ignore'):
+        exceeds = np.abs(excel_numbers - db_numbers) > COMPARISON_TOLERANCE
+    return np.where(excel_missing | db_missing, excel_missing != db_missing, exceeds)
+
+
+def compare_store_values(entries: List[Tuple[str, str, Any, Any]]) -> Tuple[Dict[str, Dict[str, Dict[str, Any]]], List[Dict[str, Any]]]:
+    """
+    对比一个门店的所有指标值
+
+    Args:
+        entries: [(Excel日期, 字段键名, Excel值, 数据库值)]，按指标、日期的顺序排列
+
+    Returns:
+        (daily_comparisons, data_errors)：结构与顺序与逐个对比时相同
+    """
+    daily_comparisons: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    data_errors: List[Dict[str, Any]] = []
+    if not entries:
+        return daily_comparisons, data_errors
+
+    dates, fields, excel_values, db_values = zip(*entries)
+    field_units = {field: get_field_unit(field) for field in set(fields)}
+    mask = difference_mask(excel_values, db_values, [field_units[field] for field in fields])
+    for date_str, field_key, excel_value, db_value, is_different in zip(dates, fields, excel_values, db_values,
+                                                                      mask.tolist()):
+        daily_comparisons.setdefault(date_str, {})[field_key] = {
+            "excel_value": excel_value,
+            "db_value": db_value,
+            "is_different": is_different
+        }
+        if is_different:
+            data_errors.append({
+                "date": date_str,
+                "field": field_key,
+                "excel_value": excel_value,
+                "db_value": db_value
+            })
+    return daily_comparisons, data_errors
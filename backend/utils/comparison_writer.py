@@ -0,0 +1,137 @@
+"""
+数据对比报告的Excel写入
+使用openpyxl只写模式（write_only）逐行写出报告，每个单元格写入时直接带上最终样式（工作簿中共享的命名样式），
+不再先写入所有单元格、再逐个单元格创建和设置样式，生成时间与单元格数成正比，内存占用不随报告大小增长
+
+报告的布局和样式与原来相同：
+- 第1、2行为表头：序号、门店名称、指标名称（各跨两行），每个日期两列（系统、填报），日期跨两列
+- 每个门店每个选中字段一行，门店名称单元格跨该门店的所有行
+- 数据不一致的单元格为红底白色粗体，其余单元格居中并加细边框
+"""
+from typing import Any, Callable, Dict, List
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.utils import get_column_letter
+
+from backend.constants.field_config import get_field_display_name
+
+SHEET_TITLE = "数据对比报告"
+ROW_HEIGHT = 25
+# 序号、门店名称、指标名称列的宽度，日期列的宽度
+BASE_COLUMN_WIDTHS = (8, 25, 20)
+DATE_COLUMN_WIDTH = 12
+
+# 命名样式
+HEADER_STYLE = "对比报告表头"
+DATA_STYLE = "对比报告数据"
+DIFFERENT_STYLE = "对比报告差异"
+
+
+def _named_styles() -> List[NamedStyle]:
+    thin = Side(style='thin')
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    center = Alignment(horizontal='center', vertical='center', wrap_text=True)
+    return [
+        NamedStyle(name=HEADER_STYLE, font=Font(color="FFFFFF", bold=True), border=border, alignment=center,
+                   fill=PatternFill(start_color="366092", end_color="366092", fill_type="solid")),
+        NamedStyle(name=DATA_STYLE, border=border, alignment=center),
+        NamedStyle(name=DIFFERENT_STYLE, font=Font(color="FFFFFF", bold=True),
+                   fill=PatternFill(start_color="FF0000", end_color="FF0000", fill_type="solid")),
+    ]
+
+
+def sort_dates_by_number(dates) -> List[str]:
+    """按日期数字排序（"2日"在"10日"之前），无法识别的日期排在最前"""
+    def sort_key(date_str):
+        try:
+            if date_str.endswith('日'):
+                return int(date_str[:-1])
+            return 0
+        except (ValueError, AttributeError):
+            return 0
+
+    return sorted(dates, key=sort_key)
+
+
+def write_comparison_workbook(file_path: str, comparison_data: Dict[str, Dict[str, Any]], selected_fields: List[str],
+                              convert_value: Callable[[Any], Any]) -> int:
+    """
+    写出数据对比报告
+
+    Args:
+        file_path: 保存路径
+        comparison_data: {Excel门店名称: 门店对比结果}，门店对比结果包含db_store_name和daily_comparisons
+        selected_fields: 每个门店输出的字段（每个字段一行）
+        convert_value: 单元格取值转换（系统数据和填报数据转为Excel中显示的值）
+
+    Returns:
+        写出的总行数（含表头）
+    """
+    sorted_dates = sort_dates_by_number(set().union(
+        *(store_data.get("daily_comparisons", {}).keys() for store_data in comparison_data.values())
+    ))
+    max_col = 3 + 2 * len(sorted_dates)
+
+    wb = Workbook(write_only=True)
+    for style in _named_styles():
+        wb.add_named_style(style)
+    ws = wb.create_sheet(SHEET_TITLE)
+
+    # 只写模式下列宽、行高、合并单元格需要在写出对应的行之前设置
+    for col, width in enumerate(BASE_COLUMN_WIDTHS, start=1):
+        ws.column_dimensions[get_column_letter(col)].width = width
+    for col in range(4, max_col + 1):
+        ws.column_dimensions[get_column_letter(col)].width = DATE_COLUMN_WIDTH
+
+    def make_cell(value, style):
+        cell = WriteOnlyCell(ws, value=value)
+        cell.style = style
+        return cell
+
+    def append_row(row_idx, cells):
+        ws.row_dimensions[row_idx].height = ROW_HEIGHT
+        ws.append(cells)
+
+    # 表头
+    first_header = ["序号", "门店名称", "指标名称"]
+    second_header = [None, None, None]
+    for date in sorted_dates:
+        first_header += [date, None]
+        second_header += ["系统", "填报"]
+    for col in range(1, 4):
+        ws.merged_cells.add(f"{get_column_letter(col)}1:{get_column_letter(col)}2")
+    for col in range(4, max_col + 1, 2):
+        ws.merged_cells.add(f"{get_column_letter(col)}1:{get_column_letter(col + 1)}1")
+    append_row(1, [make_cell(value, HEADER_STYLE) for value in first_header])
+    append_row(2, [make_cell(value, HEADER_STYLE) for value in second_header])
+
+    field_names = [(field_key, get_field_display_name(field_key)) for field_key in selected_fields]
+    empty: Dict[str, Any] = {}
+    row_idx = 3
+    for serial_number, (store_name, store_data) in enumerate(comparison_data.items(), start=1):
+        db_store_name = store_data.get("db_store_name", store_name)
+        daily_comparisons = store_data.get("daily_comparisons", {})
+        day_data = [daily_comparisons.get(date, empty) for date in sorted_dates]
+
+        # 门店名称单元格跨该门店的所有行
+        if len(field_names) > 1:
+            ws.merged_cells.add(f"B{row_idx}:B{row_idx + len(field_names) - 1}")
+
+        for field_idx, (field_key, field_display_name) in enumerate(field_names):
+            cells = [
+                make_cell(serial_number, DATA_STYLE),
+                make_cell(f"{store_name}\n({db_store_name})" if field_idx == 0 else None, DATA_STYLE),
+                make_cell(field_display_name, DATA_STYLE),
+            ]
+            for daily in day_data:
+                comparison = daily.get(field_key, empty)
+                style = DIFFERENT_STYLE if comparison.get("is_different", False) else DATA_STYLE
+                cells.append(make_cell(convert_value(comparison.get("db_value", "")), style))
+                cells.append(make_cell(convert_value(comparison.get("excel_value", "")), style))
+            append_row(row_idx, cells)
+            row_idx += 1
+
+    wb.save(file_path)
+    return row_idx - 1
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常驻爬虫工作进程的后端侧管理
+按需启动 services/crawler/worker.py，通过本地IPC通道（multiprocessing.connection，
+随机认证密钥）发送同步任务并接收爬虫事件；工作进程退出或崩溃后，下一个任务会重新启动它。
+应用退出时通知工作进程关闭浏览器，超时后强制结束
+"""
+
+import asyncio
+import secrets
+import subprocess
+import threading
+from collections import deque
+from multiprocessing.connection import Listener
+from typing import Any, Dict, Optional
+
+from services.crawler.worker import AUTHKEY_ENV, load_worker_config
+
+# 尝试导入loguru，如果失败则使用标准logging
+try:
+    from loguru import logger
+except ImportError:
+    import logging
+    logger = logging.getLogger(__name__)
+
+
+class CrawlerWorkerClient:
+    """一个常驻爬虫工作进程，同一时间只执行一个任务"""
+
+    def __init__(self, index: int = 1, config: Dict[str, Any] = None):
+        self.index = index
+        self.config = dict(load_worker_config(), **(config or {}))
+        self.process: Optional[subprocess.Popen] = None
+        self.conn = None
+        self.status: Dict[str, Any] = {}
+        self._lock = asyncio.Lock()
+        self._tail = deque(maxlen=30)
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None and self.conn is not None
+
+    async def start(self):
+        """启动工作进程并等待其连接"""
+        from backend.utils.sync_jobs import crawler_command, crawler_env, project_root, _pump_output
+
+        authkey = secrets.token_bytes(16)
+        listener = Listener(('127.0.0.1', 0), authkey=authkey)
+        host, port = listener.address
+        try:
+            env = crawler_env()
+            env[AUTHKEY_ENV] = authkey.hex()
+            cmd = crawler_command('--connect', f"{host}:{port}", script='worker.py')
+            logger.info(f"启动常驻爬虫工作进程{self.index}: {' '.join(cmd)}")
+            self.process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                            cwd=project_root, env=env)
+            # 工作进程长期运行，使用守护线程转发输出，不占用默认线程池
+            for stream, is_stderr in ((self.process.stdout, False), (self.process.stderr, True)):
+                threading.Thread(target=_pump_output, args=(stream, self._tail, is_stderr), daemon=True).start()
+
+            try:
+                self.conn = await asyncio.wait_for(asyncio.to_thread(listener.accept), self.config['connect_timeout'])
+            except asyncio.TimeoutError:
+                self._kill()
+                raise RuntimeError(f"常驻爬虫工作进程在 {self.config['connect_timeout']}s 内没有连接")
+            logger.info(f"常驻爬虫工作进程{self.index}已连接，进程ID: {self.process.pid}")
+        finally:
+            # 关闭监听端口（accept仍在等待时会随之返回错误）
+            listener.close()
+
+    def _kill(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.kill()
+        self._close_conn()
+
+    def _close_conn(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except OSError:
+                pass
+            self.conn = None
+
+    async def run(self, job) -> Dict[str, Any]:
+        """
+        在工作进程中执行同步任务，事件实时更新任务状态
+
+        Returns:
+            Dict[str, Any]: {"success", "message", "total", "report"}
+        """
+        async with self._lock:
+            if not self.alive:
+                self._close_conn()
+                await self.start()
+            job.pid = self.process.pid
+            self.conn.send({'type': 'job', 'job_id': job.job_id, 'kind': job.kind, 'params': job.params})
+
+            while True:
+                try:
+                    message = await asyncio.to_thread(self.conn.recv)
+                except (EOFError, OSError):
+                    return_code = await asyncio.to_thread(self.process.wait)
+                    self._close_conn()
+                    logger.error(f"常驻爬虫工作进程{self.index}意外退出，返回码: {return_code}\n" + '\n'.join(self._tail))
+                    result = job.result()
+                    if job.summary is None:
+                        result['message'] = f"爬虫工作进程意外退出（返回码: {return_code}）: {result['message']}"
+                    return result
+
+                kind = message.get('type')
+                if kind == 'event':
+                    job.apply_event(message['event'])
+                elif kind == 'result':
+                    self.status = message.get('worker') or {}
+                    if message.get('restart'):
+                        logger.info(f"常驻爬虫工作进程{self.index}内存增长过多，等待其退出后按需重启")
+                        await self._wait_exit()
+                    return job.result() if job.summary is not None else message.get('result') or job.result()
+
+    async def _wait_exit(self):
+        """等待工作进程退出，超时后强制结束"""
+        try:
+            await asyncio.to_thread(self.process.wait, self.config['shutdown_timeout'])
+        except subprocess.TimeoutExpired:
+            logger.warning(f"常驻爬虫工作进程{self.index}没有按时退出，强制结束")
+            self.process.kill()
+        self._close_conn()
+
+    async def close(self):
+        """通知工作进程关闭浏览器并退出"""
+        if self.process is None or self.process.poll() is not None:
+            self._close_conn()
+            return
+        try:
+            if self.conn is not None:
+                self.conn.send({'type': 'shutdown'})
+        except OSError:
+            pass
+        await self._wait_exit()
+        logger.info(f"常驻爬虫工作进程{self.index}已关闭")
@@ -4,17 +4,15 @@
 数据对比器 - 用于对比Excel数据与数据库数据
 """
 
+import copy
 import sys
 import os
 from typing import Dict, List, Any, Optional, Tuple
 from loguru import logger
 from datetime import datetime, timedelta
 import re
-from difflib import SequenceMatcher
+import string
 import pandas as pd
-from openpyxl import Workbook
-from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
 
 # 添加项目根目录到路径
 project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -22,7 +20,14 @@ sys.path.append(project_root)
 
 from services.database_manager import get_db_manager
 from services.config_database_manager import config_db_manager
-from backend.constants.field_config import FIELD_CONFIG, EXCEL_METRICS_MAPPING, get_field_display_name
+from backend.constants.field_config import FIELD_CONFIG, EXCEL_METRICS_MAPPING
+from backend.utils.comparison_cache import comparison_cache, content_hash
+from backend.utils.comparison_engine import compare_store_values
+from backend.utils.comparison_writer import write_comparison_workbook
+from backend.utils.store_matcher import StoreNameMatcher
+
+# SQLite的LIKE只对ASCII字母不区分大小写
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
 
 
 class DataComparator:
@@ -47,6 +52,10 @@ class DataComparator:
         self.errors = []
         self.warnings = []
         self.comparison_data = {}
+        # 批量加载的目标月份数据：{数据库门店名称: {Excel日期: {字段: 值}}}
+        self._month_data: Optional[Dict[str, Dict[str, Dict[str, Any]]]] = None
+        # 当前对比使用的门店名称匹配器
+        self._store_matcher: Optional[StoreNameMatcher] = None
         
         # 初始化数据库连接
         self.db_manager = get_db_manager()
@@ -129,12 +138,19 @@ class DataComparator:
             
             logger.info(f"使用字段配置: {len(selected_fields)} 个字段")
             
-            # 为每个Excel门店查找匹配的数据库门店
-            for excel_store_name, excel_store_data in excel_data.items():
+            # 先为每个Excel门店查找匹配的数据库门店，再一次性加载这些门店整月的数据
+            store_matches = {}
+            self._store_matcher = self._build_store_matcher() if self.db_manager else None
+            for excel_store_name in excel_data:
                 logger.info(f"处理Excel门店: {excel_store_name}")
-                
-                # 查找匹配的数据库门店
-                matched_stores = await self._find_matching_stores(excel_store_name)
+                store_matches[excel_store_name] = await self._find_matching_stores(excel_store_name)
+            self._load_month_data(
+                [matched[0]['storeName'] for matched in store_matches.values() if len(matched) == 1],
+                selected_fields
+            )
+            
+            for excel_store_name, excel_store_data in excel_data.items():
+                matched_stores = store_matches[excel_store_name]
                 
                 if len(matched_stores) == 0:
                     # 未找到匹配门店
@@ -168,6 +184,9 @@ class DataComparator:
                 
                 self.comparison_data[excel_store_name] = store_comparison
             
+            self._month_data = None
+            self._store_matcher = None
+            
             # 检查是否有错误
             has_errors = len(self.errors) > 0
             
@@ -202,64 +221,32 @@ class DataComparator:
             if not self.db_manager:
                 return []
             
-            # 获取所有门店名称（从数据库中查询唯一的MDShow值）
-            all_stores = self._get_all_unique_stores()
-            matched_stores = []
+            # 门店匹配器在一次对比中只建立一次（单独调用时临时建立）
+            matcher = self._store_matcher or self._build_store_matcher()
             
             logger.info(f"开始匹配Excel门店: '{excel_store_name}'")
-            logger.info(f"数据库中共有 {len(all_stores)} 个门店")
-            
-            # 清理Excel门店名称
-            clean_excel_name = self._clean_store_name(excel_store_name)
-            logger.info(f"清理后的Excel门店名: '{clean_excel_name}'")
-            
-            # 优化匹配策略：先尝试精确搜索，再尝试模糊搜索
-            # 策略1: 精确匹配（直接搜索）
-            exact_matches = [store for store in all_stores if self._clean_store_name(store) == clean_excel_name]
-            if exact_matches:
-                for store_name in exact_matches:
-                    matched_stores.append({
-                        'storeName': self._clean_display_name(store_name),
-                        'id': store_name
-                    })
-                    logger.info(f"精确匹配: '{excel_store_name}' -> '{store_name}'")
             
-            # 策略2: 包含匹配（搜索包含关系）
-            if not matched_stores:
-                for store_name in all_stores:
-                    clean_db_name = self._clean_store_name(store_name)
-                    if clean_excel_name in clean_db_name or clean_db_name in clean_excel_name:
-                        matched_stores.append({
-                            'storeName': self._clean_display_name(store_name),
-                            'id': store_name
-                        })
-                        logger.info(f"包含匹配: '{excel_store_name}' -> '{store_name}'")
-                        break  # 找到第一个包含匹配就停止
-            
-            # 策略3: 相似度匹配（只在前面策略都失败时使用）
-            if not matched_stores:
-                best_similarity = 0
-                best_match = None
-                
-                for store_name in all_stores:
-                    clean_db_name = self._clean_store_name(store_name)
-                    similarity = SequenceMatcher(None, clean_excel_name, clean_db_name).ratio()
-                    
-                    if similarity > best_similarity and similarity > 0.6:
-                        best_similarity = similarity
-                        best_match = store_name
-                
-                if best_match:
-                    matched_stores.append({
-                        'storeName': self._clean_display_name(best_match),
-                        'id': best_match
-                    })
-                    logger.info(f"相似度匹配: '{excel_store_name}' -> '{best_match}' (相似度: {best_similarity:.3f})")
+            # 匹配策略：精确匹配 > 之前保存的匹配结果 > 包含匹配（取第一个） > 相似度匹配
+            store_names, match_type, similarity = matcher.match(excel_store_name)
+            matched_stores = [{
+                'storeName': self._clean_display_name(store_name),
+                'id': store_name
+            } for store_name in store_names]
+            
+            for store_name in store_names:
+                if match_type == "exact":
+                    logger.info(f"精确匹配: '{excel_store_name}' -> '{store_name}'")
+                elif match_type == "contains":
+                    logger.info(f"包含匹配: '{excel_store_name}' -> '{store_name}'")
+                elif match_type == "similarity":
+                    logger.info(f"相似度匹配: '{excel_store_name}' -> '{store_name}' (相似度: {similarity:.3f})")
+                else:
+                    logger.info(f"使用已保存的匹配: '{excel_store_name}' -> '{store_name}' ({match_type})")
             
             if not matched_stores:
-                logger.warning(f"未找到匹配门店: '{excel_store_name}' (清理后: '{clean_excel_name}')")
+                logger.warning(f"未找到匹配门店: '{excel_store_name}' (清理后: '{self._clean_store_name(excel_store_name)}')")
                 # 输出前几个数据库门店名称作为参考
-                sample_stores = all_stores[:5]
+                sample_stores = matcher.store_names[:5]
                 logger.info(f"数据库门店示例: {sample_stores}")
             
             return matched_stores
@@ -268,6 +255,12 @@ class DataComparator:
             logger.error(f"查找匹配门店异常: {e}")
             return []
     
+    def _build_store_matcher(self) -> StoreNameMatcher:
+        """获取数据库门店列表并建立匹配索引"""
+        all_stores = self._get_all_unique_stores()
+        logger.info(f"数据库中共有 {len(all_stores)} 个门店")
+        return StoreNameMatcher(all_stores, self._clean_store_name)
+    
     def _get_all_unique_stores(self) -> List[str]:
         """获取数据库中所有唯一的门店名称"""
         try:
@@ -278,13 +271,13 @@ class DataComparator:
             stores_data = self.db_manager.get_stores()
             
             # 提取门店名称
-            store_names = []
+            store_names = {}
             for store in stores_data:
                 name = store.get('name') or store.get('value') or store.get('storeName', '')
-                if name and name not in store_names:
-                    store_names.append(name)
+                if name:
+                    store_names.setdefault(name, None)
             
-            return store_names
+            return list(store_names)
             
         except Exception as e:
             logger.error(f"获取门店列表异常: {e}")
@@ -542,7 +535,8 @@ class DataComparator:
                 })
                 return store_comparison
             
-            # 对比每日数据
+            # 按指标、日期的顺序收集需要对比的值，再一次性批量对比
+            entries = []
             for metric_name, metric_data in excel_data.items():
                 if not isinstance(metric_data, dict):
                     continue
@@ -557,42 +551,17 @@ class DataComparator:
                 if not isinstance(daily_data, dict):
                     continue
                 
-                # 对比该指标的每日数据
                 for date_str, excel_value in daily_data.items():
-                    # 调试：记录Excel中的日期格式
-                    logger.debug(f"Excel日期: '{date_str}' (类型: {type(date_str)})")
-                    logger.debug(f"数据库可用日期: {list(db_data.keys())}")
-                    
                     # 数据库数据已经按Excel日期格式组织，直接使用Excel日期作为键
                     # 只处理数据库中有数据的日期
                     if date_str not in db_data:
-                        logger.debug(f"跳过Excel日期 {date_str}，数据库中无对应数据")
                         continue
-                    
-                    if date_str not in store_comparison["daily_comparisons"]:
-                        store_comparison["daily_comparisons"][date_str] = {}
-                    
-                    # 获取数据库中对应的值（直接使用Excel日期作为键）
-                    db_value = self._get_db_value(db_data, date_str, field_key)
-                    
-                    # 记录对比结果（保持原始格式）
-                    comparison = {
-                        "excel_value": excel_value,
-                        "db_value": db_value,
-                        "is_different": self._values_are_different(excel_value, db_value)
-                    }
-                    
-                    store_comparison["daily_comparisons"][date_str][field_key] = comparison
-                    
-                    # 如果数据不一致，记录错误
-                    if comparison["is_different"]:
-                        store_comparison["has_data_errors"] = True
-                        store_comparison["data_errors"].append({
-                            "date": date_str,
-                            "field": field_key,
-                            "excel_value": excel_value,
-                            "db_value": db_value
-                        })
+                    entries.append((date_str, field_key, excel_value, self._get_db_value(db_data, date_str, field_key)))
+            
+            daily_comparisons, data_errors = compare_store_values(entries)
+            store_comparison["daily_comparisons"] = daily_comparisons
+            store_comparison["data_errors"] = data_errors
+            store_comparison["has_data_errors"] = bool(data_errors)
             
             return store_comparison
             
@@ -602,10 +571,136 @@ class DataComparator:
     
     def _get_field_key_by_excel_name(self, excel_name: str) -> Optional[str]:
         """根据Excel指标名称获取字段键名"""
-        for excel_metric_name, field_key in EXCEL_METRICS_MAPPING.items():
-            if excel_metric_name == excel_name:
-                return field_key
-        return None
+        return EXCEL_METRICS_MAPPING.get(excel_name)
+    
+    def _month_date_range(self) -> Tuple[datetime, datetime]:
+        """
+        需要查询的数据库日期范围：目标月份上个月的最后一天到目标月份的最后一天
+        （Excel的1日对应数据库中上个月最后一天的数据）；没有目标月份时为今天
+        """
+        if not self.target_month:
+            today = datetime.now()
+            return today, today
+        
+        year, month = map(int, self.target_month.split('-'))
+        start_date = datetime(year, month, 1) - timedelta(days=1)
+        if month == 12:
+            end_date = datetime(year + 1, 1, 1) - timedelta(days=1)
+        else:
+            end_date = datetime(year, month + 1, 1) - timedelta(days=1)
+        return start_date, end_date
+    
+    def _organize_store_records(self, records: List[Dict[str, Any]], fields=None) -> Dict[str, Dict[str, Any]]:
+        """将门店的数据库记录按Excel日期组织为 {Excel日期: {字段: 值}}，同一日期后面的记录覆盖前面的"""
+        organized_data = {}
+        for record in records:
+            create_date = record.get('createDateShow', '')
+            if not create_date:
+                continue
+            
+            # 将数据库日期格式转换为Excel格式，考虑日期偏移
+            # 数据库格式: '2025-07-31' -> Excel格式: '1日'（Excel日期对应数据库前一天）
+            excel_date_key = self._convert_db_date_to_excel_format_with_offset(create_date)
+            if not excel_date_key:
+                continue
+            
+            if excel_date_key not in organized_data:
+                organized_data[excel_date_key] = {}
+            
+            # 保存记录中的字段（批量加载时只包含选中的字段）
+            for field_key, value in record.items():
+                if field_key in FIELD_CONFIG and (fields is None or field_key in fields):
+                    organized_data[excel_date_key][field_key] = value
+        return organized_data
+    
+    def _load_month_data(self, store_names: List[str], selected_fields: List[str],
+                         cached_days: Dict[str, Dict[str, Dict[str, Dict[str, Any]]]] = None
+                         ) -> Optional[Dict[str, Dict[str, Dict[str, Dict[str, Any]]]]]:
+        """
+        一次性加载目标月份（含偏移的前一天）所有匹配门店的数据，代替每个门店逐日查询
+        
+        每个日期的数据库只打开一次、只查询选中的字段，按门店名称（与原来的 MDShow LIKE '%门店%'
+        规则相同：包含即匹配，ASCII字母不区分大小写）分配到各门店，按日期合并后保存在
+        self._month_data = {门店名称: {Excel日期: {字段: 值}}}，对比每个门店时直接读取
+        
+        Args:
+            store_names: 需要加载的门店名称
+            selected_fields: 选中的字段
+            cached_days: 已有的各门店按日期的数据 {门店名称: {数据库日期: {Excel日期: {字段: 值}}}}，
+                其中的门店和日期不再查询（用于重新对比时只读取有变化的日期）
+        
+        Returns:
+            各门店按日期的数据（格式同cached_days），加载失败时返回None
+        """
+        self._month_data = None
+        store_names = list(dict.fromkeys(name for name in store_names if name))
+        if not self.db_manager:
+            return None
+        if not store_names:
+            return {}
+        
+        try:
+            started = datetime.now()
+            fields = set(field for field in selected_fields if field in FIELD_CONFIG)
+            columns = ['MDShow', 'createDateShow'] + sorted(fields)
+            lowered_names = {name: name.translate(_ASCII_LOWER) for name in store_names}
+            # MDShow -> 匹配该MDShow的门店名称，不同日期的MDShow基本相同，只计算一次
+            mdshow_matches: Dict[str, List[str]] = {}
+            store_days: Dict[str, Dict[str, Dict[str, Dict[str, Any]]]] = {name: {} for name in store_names}
+            
+            start_date, end_date = self._month_date_range()
+            dates = []
+            current_date = start_date
+            days = 0
+            while current_date <= end_date:
+                date_key = current_date.strftime('%Y-%m-%d')
+                dates.append(date_key)
+                wanted = []
+                for name in store_names:
+                    cached = (cached_days or {}).get(name)
+                    if cached is not None and date_key in cached:
+                        store_days[name][date_key] = cached[date_key]
+                    else:
+                        wanted.append(name)
+                if wanted:
+                    wanted_set = set(wanted)
+                    day_records: Dict[str, List[Dict[str, Any]]] = {name: [] for name in wanted}
+                    # 保持每天内按created_at的顺序，与逐日查询时后面的记录覆盖前面的一致
+                    for record in self.db_manager.query_columns(current_date, columns):
+                        mdshow = record.get('MDShow') or ''
+                        names = mdshow_matches.get(mdshow)
+                        if names is None:
+                            lowered = mdshow.translate(_ASCII_LOWER)
+                            names = [name for name, lowered_name in lowered_names.items() if lowered_name in lowered]
+                            mdshow_matches[mdshow] = names
+                        for name in names:
+                            if name in wanted_set:
+                                day_records[name].append(record)
+                    for name, records in day_records.items():
+                        store_days[name][date_key] = self._organize_store_records(records, fields)
+                    days += 1
+                current_date += timedelta(days=1)
+            
+            self._month_data = {
+                name: self._merge_store_days(day_data, dates) for name, day_data in store_days.items()
+            }
+            seconds = (datetime.now() - started).total_seconds()
+            logger.info(f"批量加载 {self.target_month} 月份数据完成: {len(store_names)} 个门店，读取 {days} 个日期，"
+                        f"{len(fields)} 个字段，耗时 {seconds:.2f}s")
+            return store_days
+        except Exception as e:
+            # 批量加载失败时对比每个门店时逐日查询
+            logger.error(f"批量加载月份数据异常，改为逐个门店查询: {e}")
+            self._month_data = None
+            return None
+    
+    def _merge_store_days(self, day_data: Dict[str, Dict[str, Dict[str, Any]]], dates: List[str]) -> Dict[str, Dict[str, Any]]:
+        """按日期顺序合并门店每天的数据，与整月记录一起组织的结果相同（后面的日期覆盖前面的）"""
+        organized_data: Dict[str, Dict[str, Any]] = {}
+        for date_key in dates:
+            for excel_date_key, values in day_data.get(date_key, {}).items():
+                organized_data.setdefault(excel_date_key, {}).update(values)
+        return organized_data
     
     async def _get_store_database_data(self, store_name: str) -> Dict:
         """获取门店的数据库数据"""
@@ -613,31 +708,17 @@ class DataComparator:
             if not self.db_manager:
                 return {}
             
+            # 已批量加载目标月份数据时直接读取
+            if self._month_data is not None and store_name in self._month_data:
+                organized_data = self._month_data[store_name]
+                if not organized_data:
+                    logger.warning(f"门店 {store_name} 在 {self.target_month} 月份没有找到数据")
+                return organized_data
+            
             # 查询该门店的所有数据
             # 使用模糊查询来匹配门店名称
-            from datetime import datetime, timedelta
-            import os
-            
-            # 如果有target_month，查询该月份及上个月的数据；否则查询当前月份
-            if self.target_month:
-                # 解析target_month (例如: "2025-09")
-                year, month = map(int, self.target_month.split('-'))
-                
-                # 查询上个月最后一天到目标月份最后一天的数据
-                # 因为Excel的1日可能对应上个月最后一天的数据
-                if month == 1:
-                    # 如果目标月份是1月，查询上一年12月最后一天到1月31日
-                    start_date = datetime(year - 1, 12, 1)
-                    # 获取上一年12月的最后一天
-                    start_date = (start_date.replace(month=1, year=year) - timedelta(days=1))
-                    end_date = datetime(year, 2, 1) - timedelta(days=1)
-                else:
-                    # 获取上个月的最后一天
-                    start_date = datetime(year, month, 1) - timedelta(days=1)
-                    end_date = datetime(year, month + 1, 1) - timedelta(days=1)
-            else:
-                start_date = datetime.now()
-                end_date = start_date
+            # 如果有target_month，查询上个月最后一天到目标月份最后一天的数据；否则查询当前月份
+            start_date, end_date = self._month_date_range()
             
             # 收集该月份所有天的数据
             all_data = []
@@ -661,28 +742,7 @@ class DataComparator:
                 return {}
             
             # 将数据按日期组织
-            organized_data = {}
-            for record in all_data:
-                create_date = record.get('createDateShow', '')
-                if not create_date:
-                    continue
-                
-                # 调试：记录数据库中的日期格式
-                logger.debug(f"数据库记录日期: '{create_date}' (类型: {type(create_date)})")
-                
-                # 将数据库日期格式转换为Excel格式，考虑日期偏移
-                # 数据库格式: '2025-07-31' -> Excel格式: '1日'（Excel日期对应数据库前一天）
-                excel_date_key = self._convert_db_date_to_excel_format_with_offset(create_date)
-                if not excel_date_key:
-                    continue
-                
-                if excel_date_key not in organized_data:
-                    organized_data[excel_date_key] = {}
-                
-                # 将记录的所有字段都保存
-                for field_key, value in record.items():
-                    if field_key in FIELD_CONFIG:
-                        organized_data[excel_date_key][field_key] = value
+            organized_data = self._organize_store_records(all_data)
             
             logger.info(f"门店 {store_name} 数据库数据组织完成，包含日期: {list(organized_data.keys())}")
             return organized_data
@@ -809,50 +869,6 @@ class DataComparator:
         except (ValueError, TypeError):
             return str(value)
     
-    def _normalize_value_for_comparison(self, value: Any) -> float:
-        """标准化值用于比较"""
-        try:
-            if value is None or value == "":
-                return 0.0
-            
-            value_str = str(value).strip()
-            
-            # 处理百分比格式
-            if value_str.endswith('%'):
-                return float(value_str[:-1])
-            
-            # 处理小数格式（转换为百分比数值）
-            num_value = float(value_str)
-            if 0 <= num_value <= 1:
-                # 小数格式，转换为百分比
-                return num_value * 100
-            else:
-                # 已经是百分比数值或其他格式
-                return num_value
-            
-        except (ValueError, TypeError):
-            return 0.0
-    
-    def _values_are_different(self, excel_value: Any, db_value: Any) -> bool:
-        """判断两个值是否不同，保持原始格式进行比较"""
-        try:
-            # 处理None值
-            if excel_value is None and db_value is None:
-                return False
-            if excel_value is None or db_value is None:
-                return True
-            
-            # 标准化值进行比较
-            excel_normalized = self._normalize_value_for_comparison(excel_value)
-            db_normalized = self._normalize_value_for_comparison(db_value)
-            
-            # 使用较小的精度进行比较（考虑到四舍五入误差）
-            return abs(excel_normalized - db_normalized) > 0.0001
-                
-        except Exception as e:
-            logger.debug(f"值比较异常: {e}")
-            return True
-    
     async def export_comparison_excel(self, comparison_data: Dict) -> Dict[str, Any]:
         """
         导出对比结果到Excel文件
@@ -866,26 +882,6 @@ class DataComparator:
         try:
             logger.info("开始生成对比Excel文件")
             
-            # 创建工作簿
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "数据对比报告"
-            
-            # 设置样式
-            header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-            header_font = Font(color="FFFFFF", bold=True)
-            error_fill = PatternFill(start_color="FF0000", end_color="FF0000", fill_type="solid")
-            error_font = Font(color="FFFFFF", bold=True)
-            
-            # 生成表头
-            self._create_comparison_headers(ws, comparison_data)
-            
-            # 填充数据
-            self._fill_comparison_data(ws, comparison_data)
-            
-            # 应用样式
-            self._apply_comparison_styles(ws, header_fill, header_font, error_fill, error_font)
-            
             # 生成基于字段配置和目标月份的固定文件名
             from backend.constants.field_config import FIELD_CONFIG
             field_rule = config_db_manager.get_export_field_rule()
@@ -914,13 +910,20 @@ class DataComparator:
             os.makedirs(export_dir, exist_ok=True)
             
             file_path = os.path.join(export_dir, filename)
-            wb.save(file_path)
+            
+            # 对比数据与上次导出时相同且文件未被改动时，直接使用已生成的文件
+            data_hash = content_hash(comparison_data)
+            if comparison_cache.export_is_current(file_path, data_hash):
+                logger.info(f"对比数据未变化，使用已生成的对比Excel文件: {file_path}")
+            else:
+                rows = write_comparison_workbook(file_path, comparison_data, selected_fields,
+                                                 self._convert_to_excel_value)
+                comparison_cache.remember_export(file_path, data_hash)
+                logger.info(f"对比Excel文件生成成功: {file_path}，共 {rows} 行")
             
             # 生成摘要
             summary = self._generate_export_summary(comparison_data)
             
-            logger.info(f"对比Excel文件生成成功: {file_path}")
-            
             return {
                 "file_path": file_path,
                 "file_name": filename,
@@ -955,199 +958,6 @@ class DataComparator:
             # 开发环境
             return os.path.join(project_root, "backend", "exports")
     
-    def _sort_dates_by_number(self, dates: List[str]) -> List[str]:
-        """按日期数字排序，而不是字符串排序"""
-        def sort_key(date_str):
-            """提取日期数字进行排序"""
-            try:
-                if date_str.endswith('日'):
-                    day_num = int(date_str[:-1])
-                    return day_num
-                return 0
-            except:
-                return 0
-        
-        return sorted(dates, key=sort_key)
-    
-    def _create_comparison_headers(self, ws, comparison_data: Dict):
-        """创建对比表格的表头"""
-        try:
-            # 获取所有日期
-            all_dates = set()
-            for store_data in comparison_data.values():
-                all_dates.update(store_data.get("daily_comparisons", {}).keys())
-            
-            # 按日期数字排序，而不是字符串排序
-            sorted_dates = self._sort_dates_by_number(list(all_dates))
-            
-            # 设置基础表头（合并单元格）
-            ws.cell(row=1, column=1, value="序号")
-            ws.merge_cells(start_row=1, start_column=1, end_row=2, end_column=1)
-            
-            ws.cell(row=1, column=2, value="门店名称")
-            ws.merge_cells(start_row=1, start_column=2, end_row=2, end_column=2)
-            
-            ws.cell(row=1, column=3, value="指标名称")
-            ws.merge_cells(start_row=1, start_column=3, end_row=2, end_column=3)
-            
-            # 为每个日期创建双列（系统数据 + 填报数据）
-            current_col = 4
-            for date in sorted_dates:
-                # 第一行：日期（跨两列）
-                ws.cell(row=1, column=current_col, value=date)
-                ws.merge_cells(start_row=1, start_column=current_col, end_row=1, end_column=current_col + 1)
-                
-                # 第二行：系统/填报标识
-                ws.cell(row=2, column=current_col, value="系统")
-                ws.cell(row=2, column=current_col + 1, value="填报")
-                
-                current_col += 2
-            
-            logger.info(f"创建表头完成，日期数量: {len(sorted_dates)}, 总列数: {current_col - 1}")
-            
-        except Exception as e:
-            logger.error(f"创建表头异常: {e}")
-            raise e
-    
-    def _fill_comparison_data(self, ws, comparison_data: Dict):
-        """填充对比数据"""
-        try:
-            # 获取字段配置
-            field_rule = config_db_manager.get_export_field_rule()
-            if field_rule and field_rule.get('selected_fields'):
-                selected_fields = field_rule['selected_fields']
-            else:
-                selected_fields = list(FIELD_CONFIG.keys())
-            
-            # 获取所有日期并排序
-            all_dates = set()
-            for store_data in comparison_data.values():
-                all_dates.update(store_data.get("daily_comparisons", {}).keys())
-            
-            # 按日期数字排序，而不是字符串排序
-            sorted_dates = self._sort_dates_by_number(list(all_dates))
-            
-            current_row = 3  # 从第3行开始填充数据
-            serial_number = 1
-            
-            for store_name, store_data in comparison_data.items():
-                store_start_row = current_row
-                db_store_name = store_data.get("db_store_name", store_name)
-                daily_comparisons = store_data.get("daily_comparisons", {})
-                
-                # 为每个选中的字段创建一行
-                for field_key in selected_fields:
-                    field_display_name = get_field_display_name(field_key)
-                    
-                    # 基础信息列
-                    ws.cell(row=current_row, column=1, value=serial_number)
-                    ws.cell(row=current_row, column=2, value=f"{store_name}\n({db_store_name})")
-                    ws.cell(row=current_row, column=3, value=field_display_name)
-                    
-                    # 填充每日数据
-                    current_col = 4
-                    for date in sorted_dates:
-                        daily_data = daily_comparisons.get(date, {})
-                        field_comparison = daily_data.get(field_key, {})
-                        
-                        # 获取原始值（保持原始格式）
-                        db_value = field_comparison.get("db_value", "")
-                        excel_value = field_comparison.get("excel_value", "")
-                        is_different = field_comparison.get("is_different", False)
-                        
-                        # 调试信息
-                        logger.debug(f"填充数据 - 门店: {store_name}, 字段: {field_key}, 日期: {date}")
-                        logger.debug(f"  db_value: {db_value} (类型: {type(db_value)})")
-                        logger.debug(f"  excel_value: {excel_value} (类型: {type(excel_value)})")
-                        
-                        # 确保值是Excel兼容的类型，保持原始格式
-                        db_display_value = self._convert_to_excel_value(db_value)
-                        excel_display_value = self._convert_to_excel_value(excel_value)
-                        
-                        # 系统数据列
-                        db_cell = ws.cell(row=current_row, column=current_col, value=db_display_value)
-                        # 填报数据列
-                        excel_cell = ws.cell(row=current_row, column=current_col + 1, value=excel_display_value)
-                        
-                        # 如果数据不一致，标红
-                        if is_different:
-                            db_cell.fill = PatternFill(start_color="FF0000", end_color="FF0000", fill_type="solid")
-                            db_cell.font = Font(color="FFFFFF", bold=True)
-                            excel_cell.fill = PatternFill(start_color="FF0000", end_color="FF0000", fill_type="solid")
-                            excel_cell.font = Font(color="FFFFFF", bold=True)
-                        
-                        current_col += 2
-                    
-                    current_row += 1
-                
-                # 合并门店名称单元格
-                if current_row > store_start_row + 1:
-                    ws.merge_cells(start_row=store_start_row, start_column=2, end_row=current_row - 1, end_column=2)
-                
-                serial_number += 1
-            
-            logger.info(f"数据填充完成，总行数: {current_row - 1}")
-            
-        except Exception as e:
-            logger.error(f"填充数据异常: {e}")
-            raise e
-    
-    def _apply_comparison_styles(self, ws, header_fill, header_font, error_fill, error_font):
-        """应用对比样式"""
-        try:
-            # 设置边框样式
-            thin_border = Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
-            
-            # 设置对齐方式
-            center_alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-            
-            # 应用表头样式
-            max_row = ws.max_row
-            max_col = ws.max_column
-            
-            # 第一行和第二行表头样式
-            for row in range(1, 3):
-                for col in range(1, max_col + 1):
-                    cell = ws.cell(row=row, column=col)
-                    cell.fill = header_fill
-                    cell.font = header_font
-                    cell.alignment = center_alignment
-                    cell.border = thin_border
-            
-            # 数据行样式
-            for row in range(3, max_row + 1):
-                for col in range(1, max_col + 1):
-                    cell = ws.cell(row=row, column=col)
-                    if not cell.fill.start_color.rgb or cell.fill.start_color.rgb == '00000000':
-                        # 只有没有填充色的单元格才添加边框和对齐
-                        cell.border = thin_border
-                        cell.alignment = center_alignment
-            
-            # 设置列宽
-            ws.column_dimensions['A'].width = 8   # 序号
-            ws.column_dimensions['B'].width = 25  # 门店名称
-            ws.column_dimensions['C'].width = 20  # 指标名称
-            
-            # 设置日期列宽度
-            for col in range(4, max_col + 1):
-                col_letter = get_column_letter(col)
-                ws.column_dimensions[col_letter].width = 12
-            
-            # 设置行高
-            for row in range(1, max_row + 1):
-                ws.row_dimensions[row].height = 25
-            
-            logger.info("样式应用完成")
-            
-        except Exception as e:
-            logger.error(f"应用样式异常: {e}")
-            raise e
-    
     def _generate_export_summary(self, comparison_data: Dict) -> Dict:
         """生成导出摘要"""
         total_stores = len(comparison_data)
@@ -1160,6 +970,31 @@ class DataComparator:
             "total_warnings": len(self.warnings)
         }
     
+    async def _compare_matched_store(self, store_name: str, store_data: Dict, matched_stores: List[Dict],
+                                     selected_fields: List[str]) -> Optional[Dict]:
+        """对比一个Excel门店与匹配到的数据库门店，未匹配或匹配到多个门店时记录错误/警告"""
+        if not matched_stores:
+            self.errors.append({
+                "type": "store_not_found",
+                "excel_store": store_name,
+                "message": f"Excel门店 '{store_name}' 在数据库中未找到匹配"
+            })
+            return None
+        elif len(matched_stores) > 1:
+            self.warnings.append({
+                "type": "multiple_matches",
+                "excel_store": store_name,
+                "matched_stores": [store['storeName'] for store in matched_stores],
+                "message": f"Excel门店 '{store_name}' 匹配到多个数据库门店"
+            })
+        
+        # 匹配到多个门店时使用第一个
+        db_store = matched_stores[0]
+        logger.info(f"Excel门店 '{store_name}' 匹配到数据库门店 '{db_store['storeName']}'")
+        
+        # 对比门店数据
+        return await self._compare_store_data(store_name, store_data, db_store, selected_fields)
+    
     async def process_comparison(self, excel_data: Dict, stores: List[Dict], selected_fields: List[str] = None) -> Dict:
         """
         处理数据对比的主要方法
@@ -1190,41 +1025,85 @@ class DataComparator:
                 from backend.constants.field_config import FIELD_CONFIG
                 selected_fields = list(FIELD_CONFIG.keys())
             
+            # 同一Excel文件和月份重新对比时，复用上一次的结果，只重新计算Excel数据或数据库数据有变化的门店
+            cache_key = (self.excel_filename, self.target_month) if self.excel_filename and self.db_manager else None
+            previous = comparison_cache.get(cache_key) if cache_key else None
+            file_versions = self.db_manager.get_file_versions() if cache_key else {}
+            if previous and previous['fields'] != tuple(selected_fields):
+                previous = None
+            previous_stores = previous['stores'] if previous else {}
+            # 数据库文件都没有变化时门店列表不变，之前的匹配结果仍然有效
+            reuse_matches = previous is not None and previous['file_versions'] == file_versions
+            
+            # 先匹配所有Excel门店，再一次性加载匹配到的门店整月的数据
+            store_matches = {}
+            for store_name in excel_data:
+                if reuse_matches and store_name in previous_stores:
+                    store_matches[store_name] = previous_stores[store_name]['matches']
+                    continue
+                if self._store_matcher is None and self.db_manager:
+                    self._store_matcher = self._build_store_matcher()
+                logger.info(f"处理Excel门店: {store_name}")
+                store_matches[store_name] = await self._find_matching_stores(store_name)
+            
+            # 只重新读取有变化的日期数据库
+            cached_days = None
+            if previous:
+                cached_days = {
+                    name: {date_key: data for date_key, data in days.items()
+                           if previous['file_versions'].get(f"ksx_{date_key}.db") == file_versions.get(f"ksx_{date_key}.db")}
+                    for name, days in previous['store_days'].items()
+                }
+            store_days = self._load_month_data(
+                [matched[0]['storeName'] for matched in store_matches.values() if matched],
+                selected_fields,
+                cached_days
+            )
+            
             # 对比每个门店的数据
+            stores_state = {}
+            reused = 0
             for store_name, store_data in excel_data.items():
-                logger.info(f"处理Excel门店: {store_name}")
-                
-                # 匹配数据库门店
-                matched_stores = await self._find_matching_stores(store_name)
-                
-                if not matched_stores:
-                    self.errors.append({
-                        "type": "store_not_found",
-                        "excel_store": store_name,
-                        "message": f"Excel门店 '{store_name}' 在数据库中未找到匹配"
-                    })
-                    continue
-                elif len(matched_stores) > 1:
-                    self.warnings.append({
-                        "type": "multiple_matches",
-                        "excel_store": store_name,
-                        "matched_stores": [store['storeName'] for store in matched_stores],
-                        "message": f"Excel门店 '{store_name}' 匹配到多个数据库门店"
-                    })
-                    # 使用第一个匹配的门店
-                    db_store = matched_stores[0]
+                matched_stores = store_matches[store_name]
+                state = {
+                    'hash': content_hash(store_data),
+                    'matches': matched_stores,
+                    'db_hash': content_hash(self._month_data.get(matched_stores[0]['storeName']))
+                    if matched_stores and self._month_data is not None else None,
+                }
+                cached = previous_stores.get(store_name)
+                if cached is not None and all(cached[key] == state[key] for key in ('hash', 'matches', 'db_hash')):
+                    # Excel数据、匹配的门店和数据库数据都没有变化；缓存的结果会被多次复用，返回副本
+                    self.errors.extend(copy.deepcopy(cached['errors']))
+                    self.warnings.extend(copy.deepcopy(cached['warnings']))
+                    store_comparison = copy.deepcopy(cached['comparison'])
+                    reused += 1
                 else:
-                    db_store = matched_stores[0]
-                
-                logger.info(f"Excel门店 '{store_name}' 匹配到数据库门店 '{db_store['storeName']}'")
-                
-                # 对比门店数据
-                store_comparison = await self._compare_store_data(
-                    store_name, store_data, db_store, selected_fields
-                )
+                    errors_count, warnings_count = len(self.errors), len(self.warnings)
+                    store_comparison = await self._compare_matched_store(
+                        store_name, store_data, matched_stores, selected_fields
+                    )
+                    cached = {'errors': self.errors[errors_count:], 'warnings': self.warnings[warnings_count:]}
                 
                 if store_comparison:
                     self.comparison_data[store_name] = store_comparison
+                # 缓存中保存独立的副本，调用方修改返回的结果不会影响下一次对比
+                stores_state[store_name] = dict(state, errors=copy.deepcopy(cached['errors']),
+                                                warnings=copy.deepcopy(cached['warnings']),
+                                                comparison=copy.deepcopy(store_comparison))
+            
+            if previous:
+                logger.info(f"重新对比: 复用 {reused} 个门店的结果，重新计算 {len(excel_data) - reused} 个门店")
+            if cache_key and store_days is not None:
+                comparison_cache.put(cache_key, {
+                    'fields': tuple(selected_fields),
+                    'file_versions': file_versions,
+                    'store_days': store_days,
+                    'stores': stores_state,
+                })
+            
+            self._month_data = None
+            self._store_matcher = None
             
             # 检查是否有错误
             has_errors = len(self.errors) > 0 or len(self.warnings) > 0
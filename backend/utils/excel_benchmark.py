@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+门店指标Excel读取压测脚本
+在临时目录生成与导入文件相同布局的工作簿（每个门店一个工作表，第4列开始每6列为一天），
+对比逐行逐列扫描和指标定位索引提取指标数据的耗时、pandas.read_excel和流式读取的耗时、
+串行和多进程并行解析的耗时，并校验各方式的结果一致
+
+用法:
+    python -m backend.utils.excel_benchmark --sheets 100
+    python -m backend.utils.excel_benchmark --sheets 300 --rows 80 --output bench.json
+    python -m backend.utils.excel_benchmark --sheets 100 --memory   # 同时统计解析的内存峰值
+    python -m backend.utils.excel_benchmark --sheets 300 --workers 4  # 并行解析使用的进程数
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# 添加项目根目录到路径，以便直接运行本脚本
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+
+def generate_workbook(path: str, sheets: int, rows: int, days: int, seed: int = 42):
+    """生成测试工作簿：sheets个门店工作表和一个不含"店"字的汇总表"""
+    from openpyxl import Workbook
+    from backend.constants.field_config import EXCEL_METRICS_MAPPING
+    from backend.utils.excel_reader import DAY_START_COL, DAY_GROUP_SIZE
+
+    rng = random.Random(seed)
+    metrics = list(EXCEL_METRICS_MAPPING.keys())
+    # 不使用write_only模式：与Excel保存的文件一样使用共享字符串表并写入工作表尺寸
+    workbook = Workbook()
+    workbook.active.title = "汇总"
+    for sheet_no in range(1, sheets + 1):
+        sheet = workbook.create_sheet(f"测试{sheet_no:03d}店")
+        header = ["序号", "类别", "指标", "目标"]
+        for day in range(1, days + 1):
+            header += [f"{day}日是否超过黄线", f"{day}日数据", f"{day}日整改计划", None, None, None]
+        sheet.append(header)
+        # 指标行随机分布在说明行之间，指标顺序每个工作表不同
+        metric_rows = dict(zip(rng.sample(range(rows), len(metrics)), rng.sample(metrics, len(metrics))))
+        for row_no in range(rows):
+            metric = metric_rows.get(row_no)
+            row = [row_no + 1, "运营" if metric else "说明", metric or f"备注{row_no}", rng.choice(["≤3%", 95, None])]
+            for day in range(days):
+                value = rng.choice([f"{rng.uniform(0, 100):.2f}%", round(rng.uniform(0, 5), 2), rng.randint(0, 50),
+                                    -rng.randint(1, 9), float(rng.randint(0, 9)), "N/A", "#DIV/0!", None])
+                row += [rng.choice(["是", "否"]), value, rng.choice(["", "已整改", None]), None, None, None]
+            sheet.append(row[:DAY_START_COL + days * DAY_GROUP_SIZE])
+    workbook.save(path)
+
+
+def legacy_extract_metrics(reader, df, dates):
+    """逐行逐列扫描的参考实现，用于校验结果一致"""
+    import pandas as pd
+
+    metrics_data = {}
+    for metric_name in reader.metrics_names:
+        found = None
+        for idx, row in df.iterrows():
+            for cell_value in row:
+                if not pd.isna(cell_value) and metric_name in str(cell_value).strip():
+                    found = idx
+                    break
+            if found is not None:
+                break
+        if found is None:
+            continue
+        row_data = df.iloc[found]
+        daily_data = {}
+        for i, date in enumerate(dates):
+            data_col = 4 + i * 6
+            if data_col < len(row_data) and not pd.isna(row_data.iloc[data_col]):
+                daily_data[date] = reader._parse_data_value(row_data.iloc[data_col])
+            else:
+                daily_data[date] = None
+        metrics_data[metric_name] = {
+            "metric_name": metric_name,
+            "daily_data": daily_data,
+            "total_days": len([v for v in daily_data.values() if v is not None]),
+            "row_index": found
+        }
+    return metrics_data
+
+
+def _peak_memory_mb(func) -> float:
+    """执行func期间Python分配内存的峰值（MB）"""
+    tracemalloc.start()
+    try:
+        func()
+        return round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmark(path: str, memory: bool = False, workers: int = None) -> dict:
+    import pandas as pd
+    from loguru import logger
+    from backend.constants.field_config import EXCEL_METRICS_MAPPING
+    from backend.utils.excel_reader import StoreMetricsReader
+
+    # 压测时不输出每个指标的日志
+    logger.remove()
+
+    reader = StoreMetricsReader(path, metrics_names=list(EXCEL_METRICS_MAPPING.keys()), workers=1)
+
+    def read_with_pandas():
+        return pd.read_excel(path, sheet_name=None, engine='openpyxl')
+
+    started = time.perf_counter()
+    workbook = read_with_pandas()
+    parse_seconds = time.perf_counter() - started
+    store_sheets = {name: df for name, df in workbook.items() if "店" in name}
+
+    started = time.perf_counter()
+    legacy = {name: legacy_extract_metrics(reader, df, reader._extract_dates(df)) for name, df in store_sheets.items()}
+    legacy_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    indexed = {name: reader._extract_metrics_data(df, name) for name, df in store_sheets.items()}
+    indexed_seconds = time.perf_counter() - started
+
+    # read_excel流式读取的结果应与DataFrame方式的门店信息和指标数据一致
+    started = time.perf_counter()
+    streamed = reader.read_excel()
+    streaming_seconds = time.perf_counter() - started
+    pandas_stores = [reader._extract_store_info(name, df) for name, df in store_sheets.items()]
+    streaming_identical = streamed.get("stores") == pandas_stores and streamed.get("data") == indexed
+
+    # 多进程并行解析（不受最少工作表数限制），结果应与串行解析一致
+    os.environ['KSX_EXCEL_PARALLEL_MIN_SHEETS'] = '2'
+    parallel_reader = StoreMetricsReader(path, metrics_names=reader.metrics_names,
+                                         workers=workers or min(os.cpu_count() or 1, 8))
+    started = time.perf_counter()
+    parallel = parallel_reader.read_excel()
+    parallel_seconds = time.perf_counter() - started
+    parallel_identical = parallel.get("stores") == streamed.get("stores") and parallel.get("data") == streamed.get("data")
+
+    report = {
+        "sheets": len(store_sheets),
+        "metrics": len(reader.metrics_names),
+        "identical": legacy == indexed and streaming_identical and parallel_identical,
+        "workers": parallel_reader._parallel_workers(len(store_sheets)),
+        "timings": {
+            "read_excel": round(parse_seconds, 3),
+            "legacy_scan": round(legacy_seconds, 3),
+            "indexed": round(indexed_seconds, 3),
+            "pandas_total": round(parse_seconds + indexed_seconds, 3),
+            "streaming_total": round(streaming_seconds, 3),
+            "parallel_total": round(parallel_seconds, 3),
+        },
+        "speedup": round(legacy_seconds / indexed_seconds, 1) if indexed_seconds else None,
+        "streaming_speedup": round((parse_seconds + indexed_seconds) / streaming_seconds, 1) if streaming_seconds else None,
+        "parallel_speedup": round(streaming_seconds / parallel_seconds, 1) if parallel_seconds else None,
+    }
+    if memory:
+        del workbook, store_sheets
+        report["peak_memory_mb"] = {
+            "pandas": _peak_memory_mb(read_with_pandas),
+            "streaming": _peak_memory_mb(reader.read_excel),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='门店指标Excel读取压测')
+    parser.add_argument('--sheets', type=int, default=100, help='门店工作表数量')
+    parser.add_argument('--rows', type=int, default=60, help='每个工作表的行数（需不少于指标数量）')
+    parser.add_argument('--days', type=int, default=31, help='每个工作表的天数')
+    parser.add_argument('--file', type=str, help='使用已有的工作簿，不生成测试文件')
+    parser.add_argument('--output', type=str, help='结果写入的JSON文件')
+    parser.add_argument('--memory', action='store_true', help='统计pandas和流式读取的内存峰值（较慢）')
+    parser.add_argument('--workers', type=int, help='并行解析的进程数，默认为CPU核数（最多8个）')
+    args = parser.parse_args()
+
+    path = args.file
+    if not path:
+        path = os.path.join(tempfile.mkdtemp(prefix="ksx-excel-benchmark-"), "benchmark.xlsx")
+        started = time.perf_counter()
+        generate_workbook(path, args.sheets, args.rows, args.days)
+        print(f"测试工作簿已生成: {path}（{time.perf_counter() - started:.1f}s）")
+
+    report = run_benchmark(path, memory=args.memory, workers=args.workers)
+    report["file"] = path
+    print(f"Benchmark Result: {json.dumps(report, ensure_ascii=False)}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    sys.exit(0 if report["identical"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,21 +2,88 @@
 Excel文件内容读取器
 专门处理门店激励数据的Excel文件格式
 """
+import os
+import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple, Union
 from loguru import logger
 import re
 
 from backend.constants.field_config import EXCEL_METRICS_MAPPING, get_excel_metric_key
+from backend.utils.excel_stream import DAY_START_COL, DAY_GROUP_SIZE, StoreSheet, StreamingWorkbook
 from services.config_database_manager import config_db_manager
 from datetime import datetime
 
+# 拼接单元格文本时使用的分隔符，指标名称中不会出现
+_CELL_SEPARATOR = '\x00'
+
+# 开启并行解析（KSX_EXCEL_WORKERS大于1）后，门店工作表数量达到该值时才使用多进程，较小的文件串行解析更快（省去启动进程的开销）
+PARALLEL_MIN_SHEETS = 40
+
+
+class MetricRowIndex:
+    """
+    工作表的指标定位索引
+
+    一次性收集工作表中所有文本单元格（按行优先顺序，与逐行逐列扫描的顺序一致），
+    拼接成一个字符串；查找指标时只做一次子串搜索，再用偏移量数组二分定位到单元格，
+    代替对每个指标逐行逐列扫描
+
+    也可以传入流式读取的StoreSheet，此时只在标签列中查找，日期数据列依次排列
+    """
+
+    def __init__(self, df):
+        if isinstance(df, StoreSheet):
+            self.values = df.values
+            self._day_step = 1
+        else:
+            self.values = df.to_numpy(dtype=object)
+            self._day_step = DAY_GROUP_SIZE
+        if self.values.size:
+            is_text = np.frompyfunc(lambda value: isinstance(value, str), 1, 1)(self.values).astype(bool)
+        else:
+            is_text = np.zeros(self.values.shape, dtype=bool)
+        # np.nonzero按行优先顺序返回坐标
+        self._rows, self._cols = np.nonzero(is_text)
+        texts = [self.values[row, col].strip() for row, col in zip(self._rows, self._cols)]
+        self._text = _CELL_SEPARATOR.join(texts)
+        lengths = np.fromiter((len(text) + 1 for text in texts), dtype=np.int64, count=len(texts))
+        self._starts = np.concatenate(([0], np.cumsum(lengths)[:-1])) if len(texts) else lengths
+
+    def locate(self, metric_name: str) -> Optional[Tuple[int, int]]:
+        """返回第一个包含指标名称的单元格的 (行, 列)，未找到时返回None"""
+        if metric_name.isascii() or _CELL_SEPARATOR in metric_name:
+            # 纯ASCII的名称可能出现在数字等非文本单元格的字符串形式中，按原方式逐个单元格比较
+            return self._scan(metric_name)
+        position = self._text.find(metric_name)
+        if position < 0:
+            return None
+        cell = int(np.searchsorted(self._starts, position, side='right')) - 1
+        return int(self._rows[cell]), int(self._cols[cell])
+
+    def _scan(self, metric_name: str) -> Optional[Tuple[int, int]]:
+        for row_idx in range(self.values.shape[0]):
+            for col_idx, cell_value in enumerate(self.values[row_idx]):
+                if not pd.isna(cell_value) and metric_name in str(cell_value).strip():
+                    return row_idx, col_idx
+        return None
+
+    def day_values(self, row_idx: int, day_count: int) -> List[Any]:
+        """
+        取出指标行前day_count天的数据列（步长切片），超出表格范围的日期为None
+        """
+        values = list(self.values[row_idx, DAY_START_COL::self._day_step][:day_count])
+        return values + [None] * (day_count - len(values))
+
 
 class StoreMetricsReader:
     """门店指标数据读取器"""
     
-    def __init__(self, file_path: str, reading_mode: str = "full", target_month: str = None):
+    def __init__(self, file_path: str, reading_mode: str = "full", target_month: str = None,
+                 metrics_names: List[str] = None, workers: int = None):
         """
         初始化门店指标读取器
         
@@ -24,15 +91,22 @@ class StoreMetricsReader:
             file_path: Excel文件路径
             reading_mode: 读取模式 ("full" 全量, "incremental" 增量)
             target_month: 目标月份 (格式：2025-09)，用于增量读取时确定数据库月份
+            metrics_names: 需要提取的指标，默认从配置表读取
+            workers: 并行解析的进程数，默认读取环境变量 KSX_EXCEL_WORKERS，未设置时为1（串行解析）。
+                     启动进程和回传结果的开销较大，需先用excel_benchmark确认本机并行确有加速再开启
         """
         self.file_path = Path(file_path)
         self.workbook = None
         self.store_data = {}
         self.reading_mode = reading_mode
         self.target_month = target_month
+        self.workers = workers or int(os.environ.get('KSX_EXCEL_WORKERS', 0)) or 1
         
-        # 从配置表获取需要提取的指标
-        self._load_metrics_config()
+        if metrics_names is not None:
+            self.metrics_names = list(metrics_names)
+        else:
+            # 从配置表获取需要提取的指标
+            self._load_metrics_config()
     
     def _load_metrics_config(self):
         """从配置表加载指标配置"""
@@ -157,34 +231,40 @@ class StoreMetricsReader:
                     "message": f"文件不存在: {self.file_path}"
                 }
             
-            # 读取Excel文件的所有工作表
-            self.workbook = pd.read_excel(self.file_path, sheet_name=None, engine='openpyxl')
-            
-            if not self.workbook:
-                return {
-                    "success": False,
-                    "message": "Excel文件中没有找到工作表"
-                }
+            # 以只读方式流式读取，不包含"店"字的工作表不会被解析
+            with StreamingWorkbook(self.file_path) as workbook:
+                sheet_names = workbook.sheetnames
+                if not sheet_names:
+                    return {
+                        "success": False,
+                        "message": "Excel文件中没有找到工作表"
+                    }
+                
+                logger.info(f"发现 {len(sheet_names)} 个工作表")
+                
+                # 过滤工作表：只处理包含"店"字的工作表（每个工作表对应一个门店）
+                store_sheet_names = []
+                for sheet_name in sheet_names:
+                    if "店" not in sheet_name:
+                        logger.info(f"跳过工作表 {sheet_name}（不包含'店'字）")
+                        continue
+                    store_sheet_names.append(sheet_name)
+                
+                workers = self._parallel_workers(len(store_sheet_names))
+                if workers <= 1:
+                    results = [self._read_store_sheet(workbook, sheet_name) for sheet_name in store_sheet_names]
             
-            logger.info(f"发现 {len(self.workbook)} 个工作表")
+            if workers > 1:
+                results = self._read_sheets_parallel(store_sheet_names, workers)
             
-            # 处理每个工作表（每个工作表对应一个门店）
+            # 按工作表顺序合并结果
             stores = []
             store_data = {}
-            
-            for sheet_name, df in self.workbook.items():
-                logger.info(f"处理工作表: {sheet_name}")
-                
-                # 过滤工作表：只处理包含"店"字的工作表
-                if "店" not in sheet_name:
-                    logger.info(f"跳过工作表 {sheet_name}（不包含'店'字）")
-                    continue
-                
-                # 提取门店信息
-                store_info = self._extract_store_info(sheet_name, df)
-                if store_info:
+            for result in results:
+                if result:
+                    store_info, metrics_data = result
                     stores.append(store_info)
-                    store_data[store_info['name']] = self._extract_metrics_data(df, store_info['name'])
+                    store_data[store_info['name']] = metrics_data
             
             # 更新门店数据跟踪信息
             self._update_store_tracking(store_data)
@@ -204,7 +284,73 @@ class StoreMetricsReader:
                 "message": f"读取Excel文件失败: {str(e)}"
             }
     
-    def _extract_store_info(self, sheet_name: str, df: pd.DataFrame) -> Optional[Dict[str, Any]]:
+    def _read_store_sheet(self, workbook: StreamingWorkbook, sheet_name: str) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """读取一个门店工作表，返回 (门店信息, 指标数据)，提取门店信息失败时返回None"""
+        logger.info(f"处理工作表: {sheet_name}")
+        sheet = workbook.read_sheet(sheet_name)
+        
+        # 提取门店信息
+        store_info = self._extract_store_info(sheet_name, sheet)
+        if not store_info:
+            return None
+        return store_info, self._extract_metrics_data(sheet, store_info['name'])
+    
+    def _parallel_workers(self, sheet_count: int) -> int:
+        """
+        实际使用的并行进程数，未开启并行或工作表较少时为1（串行）
+
+        打包后的应用中子进程依赖入口处的multiprocessing.freeze_support()
+        （desktop/ksx_desktop_app.py和desktop/ksx_desktop_app_windows.py）
+        """
+        min_sheets = int(os.environ.get('KSX_EXCEL_PARALLEL_MIN_SHEETS', PARALLEL_MIN_SHEETS))
+        if self.workers <= 1 or sheet_count < max(min_sheets, 2):
+            return 1
+        return min(self.workers, sheet_count)
+    
+    def _read_sheets_parallel(self, sheet_names: List[str], workers: int) -> List[Optional[Tuple[Dict[str, Any], Dict[str, Any]]]]:
+        """
+        多进程并行解析门店工作表：每个进程以只读方式打开工作簿，处理轮流分到的一部分工作表，
+        结果按原工作表顺序返回；进程池不可用时退回串行解析
+        """
+        chunks = [sheet_names[i::workers] for i in range(workers)]
+        logger.info(f"使用 {workers} 个进程并行解析 {len(sheet_names)} 个门店工作表")
+        try:
+            results = {}
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(_read_sheets_in_worker, str(self.file_path), chunk, self.reading_mode,
+                                    self.target_month, self.metrics_names)
+                    for chunk in chunks
+                ]
+                for chunk, future in zip(chunks, futures):
+                    results.update(zip(chunk, future.result()))
+            return [results[sheet_name] for sheet_name in sheet_names]
+        except (BrokenProcessPool, OSError) as e:
+            logger.warning(f"并行解析失败，改为串行解析: {e}")
+            with StreamingWorkbook(self.file_path) as workbook:
+                return [self._read_store_sheet(workbook, sheet_name) for sheet_name in sheet_names]
+    
+    def read_excel_cached(self) -> Dict[str, Any]:
+        """
+        读取Excel文件内容，同一文件（路径、大小、修改时间）和读取参数的结果从工作簿缓存返回
+
+        增量模式不使用缓存：读取结果取决于config.db中各门店的最新日期，且每次读取都要更新门店跟踪记录
+
+        返回的结果由多个请求共享，调用方不应修改
+        """
+        from backend.utils.workbook_cache import workbook_cache
+        
+        if self.reading_mode == "incremental":
+            return self.read_excel()
+        try:
+            key = workbook_cache.make_key(self.file_path, self.reading_mode, self.target_month,
+                                          tuple(self.metrics_names))
+        except OSError:
+            # 文件不存在等情况交给read_excel返回错误信息
+            return self.read_excel()
+        return workbook_cache.get_or_load(key, self.read_excel)
+    
+    def _extract_store_info(self, sheet_name: str, df: Union[pd.DataFrame, StoreSheet]) -> Optional[Dict[str, Any]]:
         """提取门店信息"""
         try:
             # 提取日期信息
@@ -226,7 +372,7 @@ class StoreMetricsReader:
             logger.warning(f"提取门店信息失败: {sheet_name}, 错误: {e}")
             return None
     
-    def _extract_metrics_data(self, df: pd.DataFrame, store_name: str = None) -> Dict[str, Any]:
+    def _extract_metrics_data(self, df: Union[pd.DataFrame, StoreSheet], store_name: str = None) -> Dict[str, Any]:
         """提取指标数据（包含所有日期的数据）"""
         try:
             # 首先提取日期信息
@@ -238,9 +384,12 @@ class StoreMetricsReader:
             # 根据读取模式过滤日期
             filtered_dates = self._filter_dates_by_mode(dates, store_name)
             
+            # 每个工作表只建立一次指标定位索引
+            index = MetricRowIndex(df)
+            
             # 查找指标数据
             for metric_name in self.metrics_names:
-                metric_data = self._find_metric_data_with_dates(df, metric_name, filtered_dates)
+                metric_data = self._find_metric_data_with_dates(df, metric_name, filtered_dates, index)
                 if metric_data:
                     metrics_data[metric_name] = metric_data
             
@@ -250,19 +399,15 @@ class StoreMetricsReader:
             logger.error(f"提取指标数据失败: {e}")
             return {}
     
-    def _extract_dates(self, df: pd.DataFrame) -> List[str]:
+    def _extract_dates(self, df: Union[pd.DataFrame, StoreSheet]) -> List[str]:
         """提取日期信息（基于Excel结构分析）"""
         try:
             dates = []
             
             # 根据分析，数据结构是每6列代表一天
             # 从第4列开始，每6列为一组
-            start_col = 4  # 第4列开始
-            group_size = 6  # 每6列为一组
-            
-            # 计算有多少天
             total_cols = len(df.columns)
-            max_days = (total_cols - start_col) // group_size
+            max_days = (total_cols - DAY_START_COL) // DAY_GROUP_SIZE
             
             # 生成日期列表
             for day in range(1, max_days + 1):
@@ -275,21 +420,17 @@ class StoreMetricsReader:
             logger.error(f"提取日期失败: {e}")
             return []
     
-    def _find_metric_data_with_dates(self, df: pd.DataFrame, metric_name: str, dates: List[str]) -> Optional[Dict[str, Any]]:
-        """查找特定指标的所有日期数据"""
+    def _find_metric_data_with_dates(self, df: pd.DataFrame, metric_name: str, dates: List[str],
+                                     index: MetricRowIndex = None) -> Optional[Dict[str, Any]]:
+        """查找特定指标的所有日期数据（index为该工作表的指标定位索引，未传入时临时建立）"""
         try:
-            # 在DataFrame中查找包含指标名称的行
-            for idx, row in df.iterrows():
-                for col_idx, cell_value in enumerate(row):
-                    if pd.isna(cell_value):
-                        continue
-                    
-                    cell_str = str(cell_value).strip()
-                    
-                    # 检查是否包含指标名称
-                    if metric_name in cell_str:
-                        # 找到指标行，提取该行所有日期的数据
-                        return self._extract_metric_row_with_dates(df, idx, dates, metric_name)
+            index = index or MetricRowIndex(df)
+            
+            # 查找第一个包含指标名称的单元格
+            location = index.locate(metric_name)
+            if location is not None:
+                # 找到指标行，提取该行所有日期的数据
+                return self._extract_metric_row_with_dates(df, location[0], dates, metric_name, index)
             
             logger.warning(f"未找到指标: {metric_name}")
             return None
@@ -298,33 +439,18 @@ class StoreMetricsReader:
             logger.error(f"查找指标数据失败: {metric_name}, 错误: {e}")
             return None
     
-    def _extract_metric_row_with_dates(self, df: pd.DataFrame, row_idx: int, dates: List[str], metric_name: str) -> Dict[str, Any]:
+    def _extract_metric_row_with_dates(self, df: pd.DataFrame, row_idx: int, dates: List[str], metric_name: str,
+                                       index: MetricRowIndex = None) -> Dict[str, Any]:
         """提取指标行的所有日期数据"""
         try:
-            row_data = df.iloc[row_idx]
-            daily_data = {}
-            
-            # 根据Excel结构，每6列代表一天的数据
-            # 第4列开始，每6列为一组：是否超过黄线、数据、整改计划 + 3个空列
-            start_col = 4  # 第4列开始
-            group_size = 6  # 每6列为一组
+            index = index or MetricRowIndex(df)
             
-            # 提取每个日期的数据
-            for i, date in enumerate(dates):
-                # 计算该日期对应的列索引
-                base_col = start_col + i * group_size
-                
-                # 数据列是每组的第1列（base_col）
-                data_col = base_col
-                
-                if data_col < len(row_data):
-                    data_value = row_data.iloc[data_col]
-                    if not pd.isna(data_value):
-                        daily_data[date] = self._parse_data_value(data_value)
-                    else:
-                        daily_data[date] = None
-                else:
-                    daily_data[date] = None
+            # 根据Excel结构，每6列代表一天的数据，一次取出该行所有日期的数据列
+            day_values = index.day_values(row_idx, len(dates))
+            daily_data = {
+                date: None if pd.isna(data_value) else self._parse_data_value(data_value)
+                for date, data_value in zip(dates, day_values)
+            }
             
             logger.info(f"指标 {metric_name} 提取到 {len(daily_data)} 天的数据")
             
@@ -339,21 +465,13 @@ class StoreMetricsReader:
             logger.error(f"提取指标行数据失败: {metric_name}, 错误: {e}")
             return {}
     
-    def _find_metric_data(self, df: pd.DataFrame, metric_name: str) -> Optional[Dict[str, Any]]:
+    def _find_metric_data(self, df: pd.DataFrame, metric_name: str, index: MetricRowIndex = None) -> Optional[Dict[str, Any]]:
         """查找特定指标的数据"""
         try:
-            # 在DataFrame中查找包含指标名称的行
-            for idx, row in df.iterrows():
-                for col_idx, cell_value in enumerate(row):
-                    if pd.isna(cell_value):
-                        continue
-                    
-                    cell_str = str(cell_value).strip()
-                    
-                    # 检查是否包含指标名称
-                    if metric_name in cell_str:
-                        # 找到指标行，提取相关数据
-                        return self._extract_metric_row_data(df, idx, col_idx, metric_name)
+            location = (index or MetricRowIndex(df)).locate(metric_name)
+            if location is not None:
+                # 找到指标行，提取相关数据
+                return self._extract_metric_row_data(df, location[0], location[1], metric_name)
             
             logger.warning(f"未找到指标: {metric_name}")
             return None
@@ -478,3 +596,11 @@ class StoreMetricsReader:
         except Exception as e:
             logger.error(f"获取门店汇总失败: {e}")
             return {"total_stores": 0, "stores": []}
+
+
+def _read_sheets_in_worker(file_path: str, sheet_names: List[str], reading_mode: str, target_month: Optional[str],
+                           metrics_names: List[str]) -> List[Optional[Tuple[Dict[str, Any], Dict[str, Any]]]]:
+    """在并行解析的工作进程中读取一组门店工作表"""
+    reader = StoreMetricsReader(file_path, reading_mode, target_month, metrics_names=metrics_names, workers=1)
+    with StreamingWorkbook(file_path) as workbook:
+        return [reader._read_store_sheet(workbook, sheet_name) for sheet_name in sheet_names]
@@ -0,0 +1,308 @@
+"""
+门店激励Excel的流式读取
+使用openpyxl只读模式（read_only=True, data_only=True）逐行读取工作簿，代替pandas.read_excel：
+
+- 先按名称筛选工作表，不包含"店"字的汇总表等不会被解析
+- 每行只保留前面的标签列和每个6列日期组中的数据列，其余列只用于计算表格宽度
+- 读到最后一个有内容的行为止，不会构造整个工作表的DataFrame
+
+单元格取值与pandas.read_excel(engine='openpyxl')保持一致：第一行作为表头，
+空字符串和"NA"、"#N/A"等视为空值，整数值的浮点数转为整数，全为数字的列中有空值或小数时整列转为浮点数，
+因此指标定位和数据解析的结果与原来的DataFrame方式相同
+"""
+import re
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from loguru import logger
+
+# 每日数据的列布局：第4列开始，每6列为一天（是否超过黄线、数据、整改计划 + 3个空列），数据列为每组第1列
+DAY_START_COL = 4
+DAY_GROUP_SIZE = 6
+
+# pandas.read_excel默认视为空值的字符串
+_NA_STRINGS = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+])
+# Excel错误值（#DIV/0!等），pandas读取为空值
+_ERROR_CODES = frozenset(['#NULL!', '#DIV/0!', '#VALUE!', '#REF!', '#NAME?', '#NUM!', '#N/A', '#GETTING_DATA'])
+
+_public_fallback_logged = False
+
+_NUMERIC_TEXT = re.compile(r'^\s*[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?\s*$')
+_INTEGER_TEXT = re.compile(r'^\s*[-+]?\d+\s*$')
+
+
+class StoreSheet:
+    """
+    流式读取的门店工作表
+
+    values只包含标签列和各日期的数据列（不含表头行）：前DAY_START_COL列为标签列，
+    之后每列依次为第1天、第2天……的数据列；total_rows/total_columns与DataFrame的行列数一致
+    """
+
+    def __init__(self, name: str, columns: List[Any], values: np.ndarray, total_rows: int, total_columns: int):
+        self.name = name
+        self.columns = columns
+        self.values = values
+        self.total_rows = total_rows
+        self.total_columns = total_columns
+
+    def __len__(self) -> int:
+        return self.total_rows
+
+    @property
+    def empty(self) -> bool:
+        return self.total_rows == 0 or self.total_columns == 0
+
+
+def _log_public_fallback(error: Exception):
+    """openpyxl内部解析器不可用时提示一次（改用公开的iter_rows，结果相同但较慢）"""
+    global _public_fallback_logged
+    if not _public_fallback_logged:
+        _public_fallback_logged = True
+        logger.warning(f"当前openpyxl版本不支持直接解析工作表XML，改用iter_rows读取: {error}")
+
+
+def _convert_value(value):
+    """单元格取值转换：错误值、空值字符串视为None，整数值的浮点数转为整数"""
+    if value is None:
+        return None
+    if type(value) is str:
+        return None if value in _NA_STRINGS or value in _ERROR_CODES else value
+    if type(value) is float and value.is_integer():
+        return int(value)
+    return value
+
+
+def _infer_column(values: List[Any]) -> List[Any]:
+    """
+    按pandas的类型推断处理一列数据：非空值全部是数字（或数字形式的文本）时整列转为数值，
+    有空值或小数时转为浮点数；否则保持原值
+    """
+    has_na = False
+    has_float = False
+    for value in values:
+        if value is None:
+            has_na = True
+        elif type(value) is float:
+            has_float = True
+        elif type(value) is int:
+            continue
+        elif type(value) is str and _NUMERIC_TEXT.match(value):
+            has_float = has_float or not _INTEGER_TEXT.match(value)
+        else:
+            return values
+    convert = float if has_na or has_float else int
+    return [None if value is None else convert(value) for value in values]
+
+
+def column_names(header: List[Any], total_columns: int = None) -> List[Any]:
+    """
+    表头行转为与pandas一致的列名：空单元格为"Unnamed: 列号"，重复的列名加".1"、".2"后缀，
+    不足total_columns列时补齐
+    """
+    # 表头不做空值字符串转换（与pandas一致，"NA"等仍作为列名）
+    header = [None if value == "" else _convert_value(value) if type(value) is float else value
+              for value in header]
+    header += [None] * ((total_columns or 0) - len(header))
+    names = []
+    counts: Dict[Any, int] = {}
+    for col_idx, value in enumerate(header):
+        name = f"Unnamed: {col_idx}" if value is None else value
+        count = counts.get(name, 0)
+        while count > 0:
+            counts[name] = count + 1
+            name = f"{name}.{count}"
+            count = counts.get(name, 0)
+        counts[name] = count + 1
+        names.append(name)
+    return names
+
+
+class StreamingWorkbook:
+    """
+    以只读方式打开的工作簿，按需流式读取工作表
+
+    用法:
+        with StreamingWorkbook(path) as workbook:
+            for name in workbook.sheetnames:
+                sheet = workbook.read_sheet(name)
+    """
+
+    def __init__(self, file_path, label_columns: int = DAY_START_COL):
+        from openpyxl import load_workbook
+
+        self.file_path = Path(file_path)
+        self.label_columns = label_columns
+        self._workbook = load_workbook(self.file_path, read_only=True, data_only=True, keep_links=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if self._workbook is not None:
+            self._workbook.close()
+            self._workbook = None
+
+    @property
+    def sheetnames(self) -> List[str]:
+        return list(self._workbook.sheetnames)
+
+    def store_sheet_names(self, sheet_filter: Callable[[str], bool] = None) -> List[str]:
+        """按名称筛选需要解析的工作表，默认只保留包含"店"字的工作表"""
+        sheet_filter = sheet_filter or (lambda name: "店" in name)
+        return [name for name in self._workbook.sheetnames if sheet_filter(name)]
+
+    def _keep_column(self, col_idx: int) -> bool:
+        """是否需要取值的列（从0开始）：标签列和每个日期组的数据列"""
+        if col_idx < self.label_columns:
+            return True
+        return col_idx >= DAY_START_COL and (col_idx - DAY_START_COL) % DAY_GROUP_SIZE == 0
+
+    def iter_rows(self, sheet_name: str, label_only: bool = False):
+        """
+        逐行读取工作表，label_only为True时除表头行外只取标签列的值
+
+        Yields:
+            (width, row): 同_iter_rows
+        """
+        keep_column = (lambda col_idx: col_idx < self.label_columns) if label_only else self._keep_column
+        return self._iter_rows(self._workbook[sheet_name], keep_column)
+
+    def _iter_rows(self, worksheet, keep_column: Callable[[int], bool] = None):
+        """
+        逐行读取工作表（不使用工作表记录的尺寸，以实际内容为准）
+
+        默认直接解析工作表XML：表头行和keep_column选中的列（默认为标签列和数据列）的单元格交给openpyxl转换取值
+        （共享字符串、日期、错误值等），其余单元格只判断是否为空，用于计算行宽。
+        这依赖openpyxl的内部解析器（pyproject中限定为3.1.x），当前版本不提供时改用公开的iter_rows
+
+        Yields:
+            (width, row): 去掉行尾空单元格后的宽度，长度为width的取值列表（不需要取值的列为None）
+        """
+        keep_column = keep_column or self._keep_column
+        try:
+            from openpyxl.worksheet._reader import WorkSheetParser
+
+            workbook = self._workbook
+            source = worksheet._get_source()
+        except (ImportError, AttributeError) as e:
+            _log_public_fallback(e)
+            return self._iter_rows_public(worksheet, keep_column)
+        try:
+            parser = WorkSheetParser(source, workbook.shared_strings, data_only=True, epoch=workbook.epoch,
+                                     date_formats=workbook._date_formats,
+                                     timedelta_formats=workbook._timedelta_formats)
+        except (AttributeError, TypeError) as e:
+            source.close()
+            _log_public_fallback(e)
+            return self._iter_rows_public(worksheet, keep_column)
+        return self._iter_rows_parsed(source, parser, keep_column)
+
+    def _iter_rows_parsed(self, source, parser, keep_column: Callable[[int], bool]):
+        """逐行解析工作表XML，结果同_iter_rows"""
+        from openpyxl.utils.cell import column_index_from_string
+        from openpyxl.worksheet._reader import CELL_TAG, INLINE_STRING, ROW_TAG, VALUE_TAG
+        from openpyxl.xml.functions import iterparse
+
+        shared_strings = self._workbook.shared_strings
+        with source:
+            row_counter = 0
+            for _, element in iterparse(source):
+                if element.tag != ROW_TAG:
+                    continue
+                row_number = int(element.get('r') or row_counter + 1)
+                # XML中省略的空行
+                for _ in range(row_counter + 1, row_number):
+                    yield 0, []
+                row_counter = row_number
+
+                width = 0
+                col_number = 0
+                values = {}
+                for cell in element:
+                    if cell.tag != CELL_TAG:
+                        continue
+                    coordinate = cell.get('r')
+                    col_number = column_index_from_string(coordinate.rstrip('0123456789')) if coordinate else col_number + 1
+                    if row_number == 1 or keep_column(col_number - 1):
+                        parser.row_counter, parser.col_counter = row_number, col_number - 1
+                        value = parser.parse_cell(cell)['value']
+                        values[col_number - 1] = value
+                        filled = value is not None and value != ""
+                    else:
+                        data_type = cell.get('t', 'n')
+                        if data_type == 'inlineStr':
+                            child = cell.find(INLINE_STRING)
+                            filled = child is not None and any(child.itertext())
+                        else:
+                            text = cell.findtext(VALUE_TAG)
+                            filled = bool(text) and not (data_type == 's' and shared_strings[int(text)] == "")
+                    if filled:
+                        width = col_number
+                element.clear()
+
+                row = [None] * width
+                for col_idx, value in values.items():
+                    if col_idx < width:
+                        row[col_idx] = value
+                yield width, row
+
+    @staticmethod
+    def _iter_rows_public(worksheet, keep_column: Callable[[int], bool]):
+        """使用openpyxl公开的iter_rows逐行读取，结果同_iter_rows（所有单元格都会转换取值，较慢）"""
+        # 只读工作表会按记录的尺寸补齐行尾，宽度按最后一个非空单元格计算
+        worksheet.reset_dimensions()
+        for row_number, cells in enumerate(worksheet.iter_rows(values_only=True), start=1):
+            width = 0
+            for col_idx, value in enumerate(cells):
+                if value is not None and value != "":
+                    width = col_idx + 1
+            yield width, [value if row_number == 1 or keep_column(col_idx) else None
+                          for col_idx, value in enumerate(cells[:width])]
+
+    def read_sheet(self, sheet_name: str, max_rows: int = None) -> StoreSheet:
+        """
+        流式读取一个工作表的标签列和数据列
+
+        Args:
+            sheet_name: 工作表名称
+            max_rows: 最多读取的数据行数（不含表头），None表示读到最后一个有内容的行
+        """
+        label_columns = self.label_columns
+        header: Optional[list] = None
+        rows: List[list] = []
+        total_columns = 0
+        total_rows = 0
+        for width, row in self._iter_rows(self._workbook[sheet_name]):
+            if header is None:
+                header = row[:width]
+                total_columns = width
+                continue
+            if width:
+                total_columns = max(total_columns, width)
+                total_rows = len(rows) + 1
+            rows.append(row[:label_columns] + row[DAY_START_COL:width:DAY_GROUP_SIZE] if width else ())
+            if max_rows is not None and len(rows) >= max_rows:
+                break
+        # 去掉末尾的空行
+        del rows[total_rows:]
+
+        day_count = len(range(DAY_START_COL, total_columns, DAY_GROUP_SIZE))
+        width = min(label_columns, total_columns) + day_count
+        values = np.full((total_rows, width), None, dtype=object)
+        if total_rows and width:
+            columns = [[None] * total_rows for _ in range(width)]
+            for row_idx, row in enumerate(rows):
+                for col_idx, value in enumerate(row[:width]):
+                    columns[col_idx][row_idx] = _convert_value(value)
+            for col_idx, column in enumerate(columns):
+                values[:, col_idx] = _infer_column(column)
+
+        return StoreSheet(sheet_name, column_names(header or [], total_columns), values, total_rows, total_columns)
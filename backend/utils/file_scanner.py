@@ -4,6 +4,9 @@
 """
 import os
 import sys
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
 from typing import List, Dict, Optional
 from loguru import logger
@@ -11,6 +14,15 @@ from loguru import logger
 from backend.constants.field_config import EXCEL_METRICS_MAPPING
 from services.config_database_manager import config_db_manager
 
+# 验证Excel文件的时间限制（秒）和抽样检查的门店工作表数量
+VALIDATION_BUDGET_SECONDS = 2.0
+VALIDATION_SAMPLE_SHEETS = 3
+# 按文件身份缓存的验证结论数量
+VALIDATION_CACHE_SIZE = 32
+
+_validation_cache: "OrderedDict[tuple, Dict[str, any]]" = OrderedDict()
+_validation_lock = threading.Lock()
+
 
 def _get_target_metrics() -> List[str]:
     """获取需要检查的指标列表"""
@@ -182,10 +194,71 @@ def get_excel_file_info(file_path: str) -> Dict[str, any]:
         }
 
 
+def _sample_sheets(store_sheets: List[str], sample_size: int) -> List[str]:
+    """均匀抽取需要检查的门店工作表（总是包含第一个）"""
+    if len(store_sheets) <= sample_size:
+        return list(store_sheets)
+    step = (len(store_sheets) - 1) / (sample_size - 1) if sample_size > 1 else 0
+    return list(dict.fromkeys(store_sheets[round(i * step)] for i in range(sample_size)))
+
+
+def _scan_sheet_labels(workbook, sheet_name: str, target_metrics: List[str], deadline: float) -> Dict[str, any]:
+    """
+    流式读取工作表的表头和标签列，找齐所有指标或超过截止时间时停止
+
+    Returns:
+        Dict: {"header", "width", "rows", "found", "complete"}
+    """
+    header = []
+    width = 0
+    rows = 0
+    found = set()
+    remaining = list(target_metrics)
+    complete = True
+    for row_number, (row_width, row) in enumerate(workbook.iter_rows(sheet_name, label_only=True), 1):
+        if row_number == 1:
+            header = row
+            width = row_width
+            continue
+        if row_width:
+            width = max(width, row_width)
+            rows = row_number - 1
+        for value in row:
+            if value is None:
+                continue
+            cell_str = str(value).strip()
+            for metric in [metric for metric in remaining if metric in cell_str]:
+                found.add(metric)
+                remaining.remove(metric)
+        if not remaining and rows:
+            break
+        if time.monotonic() > deadline:
+            complete = False
+            break
+    return {"header": header, "width": width, "rows": rows, "found": found, "complete": complete}
+
+
+def _validation_cache_key(file_path: str, target_metrics: List[str]):
+    from backend.utils.workbook_cache import file_identity
+    return file_identity(file_path) + (tuple(target_metrics),)
+
+
+def _cache_validation(key, result: Dict[str, any]):
+    with _validation_lock:
+        _validation_cache[key] = result
+        _validation_cache.move_to_end(key)
+        while len(_validation_cache) > VALIDATION_CACHE_SIZE:
+            _validation_cache.popitem(last=False)
+
+
 def validate_excel_file(file_path: str) -> Dict[str, any]:
     """
     验证Excel文件是否有效且符合门店激励数据格式
     
+    只读取工作表名称和抽样门店工作表的表头、标签列（只读流式模式），找齐指标即停止；
+    总耗时不超过 KSX_VALIDATE_BUDGET_SECONDS 秒，超时时按已检查的部分给出结论。
+    完整检查的结论按文件身份（路径、大小、修改时间）缓存，文件未修改时直接返回
+    
     Args:
         file_path: Excel文件路径
         
@@ -193,7 +266,7 @@ def validate_excel_file(file_path: str) -> Dict[str, any]:
         Dict: 验证结果
     """
     try:
-        import pandas as pd
+        from backend.utils.excel_stream import StreamingWorkbook, column_names
         
         path = Path(file_path)
         if not path.exists():
@@ -202,88 +275,66 @@ def validate_excel_file(file_path: str) -> Dict[str, any]:
                 "message": f"文件不存在: {file_path}"
             }
         
+        # 获取需要检查的指标列表
+        target_metrics = _get_target_metrics()
+        
+        cache_key = _validation_cache_key(file_path, target_metrics)
+        with _validation_lock:
+            cached = _validation_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Excel文件验证结果缓存命中: {file_path}")
+            return dict(cached)
+        
+        started = time.monotonic()
+        deadline = started + float(os.environ.get('KSX_VALIDATE_BUDGET_SECONDS', VALIDATION_BUDGET_SECONDS))
+        
         # 尝试读取Excel文件
         try:
-            # 读取所有工作表
-            workbook = pd.read_excel(file_path, sheet_name=None, engine='openpyxl')
-            
-            if not workbook:
-                return {
-                    "success": False,
-                    "message": "Excel文件中没有找到工作表"
-                }
-            
-            # 检查是否有包含"店"字的工作表
-            store_sheets = [name for name in workbook.keys() if "店" in name]
-            
-            if not store_sheets:
-                return {
-                    "success": False,
-                    "message": "Excel文件中没有找到包含'店'字的工作表，请确保文件格式正确"
-                }
-            
-            # 检查第一个门店工作表的格式
-            first_sheet = store_sheets[0]
-            df = workbook[first_sheet]
-            
-            # 检查基本格式要求
-            if df.empty:
-                return {
-                    "success": False,
-                    "message": f"工作表 '{first_sheet}' 为空"
-                }
-            
-            # 检查是否有足够的列（至少应该有日期列）
-            if len(df.columns) < 10:
-                return {
-                    "success": False,
-                    "message": f"工作表 '{first_sheet}' 列数不足，可能不是正确的门店激励数据格式"
-                }
-            
-            # 获取需要检查的指标列表
-            target_metrics = _get_target_metrics()
-            
-            found_metrics = 0
-            for metric in target_metrics:
-                # 在DataFrame中查找包含指标名称的单元格
-                metric_found = False
-                for idx, row in df.iterrows():
-                    for col_idx, cell_value in enumerate(row):
-                        if pd.isna(cell_value):
-                            continue
-                        cell_str = str(cell_value).strip()
-                        if metric in cell_str:
-                            found_metrics += 1
-                            metric_found = True
-                            break
-                    if metric_found:
+            # 以只读方式打开，只解析抽样门店工作表的表头和标签列
+            with StreamingWorkbook(file_path) as workbook:
+                if not workbook.sheetnames:
+                    result = {
+                        "success": False,
+                        "message": "Excel文件中没有找到工作表"
+                    }
+                    _cache_validation(cache_key, result)
+                    return result
+                
+                # 检查是否有包含"店"字的工作表
+                store_sheets = workbook.store_sheet_names()
+                
+                if not store_sheets:
+                    result = {
+                        "success": False,
+                        "message": "Excel文件中没有找到包含'店'字的工作表，请确保文件格式正确"
+                    }
+                    _cache_validation(cache_key, result)
+                    return result
+                
+                # 第一个门店工作表用于检查格式，其余抽样工作表只检查指标
+                first_sheet = store_sheets[0]
+                sample = _sample_sheets(store_sheets, VALIDATION_SAMPLE_SHEETS)
+                scans = {}
+                for sheet_name in sample:
+                    scans[sheet_name] = _scan_sheet_labels(workbook, sheet_name, target_metrics, deadline)
+                    if time.monotonic() > deadline:
                         break
             
-            # 更宽松的验证逻辑：允许部分匹配
-            if found_metrics == 0:
-                return {
-                    "success": False,
-                    "message": f"工作表 '{first_sheet}' 中没有找到预期的指标数据，请检查文件格式是否正确"
-                }
-            
-            # 如果找到的指标数量较少，给出警告但不阻止处理
-            if found_metrics < 3:
-                logger.warning(f"工作表 '{first_sheet}' 中只找到 {found_metrics} 个指标，可能不是完整的门店激励数据")
-                return {
-                    "success": True,
-                    "message": f"文件验证通过，但只找到 {found_metrics} 个指标，建议检查数据完整性",
-                    "columns": list(df.columns),
-                    "rows_preview": len(df)
-                }
+            complete = len(scans) == len(sample) and all(scan["complete"] for scan in scans.values())
+            first = scans[first_sheet]
+            found_metrics = len(set().union(*(scan["found"] for scan in scans.values())))
+            for sheet_name, scan in scans.items():
+                if scan["complete"] and not scan["found"]:
+                    logger.warning(f"抽样检查的工作表 '{sheet_name}' 中没有找到预期的指标")
             
-            return {
-                "success": True,
-                "message": f"Excel文件格式验证通过，发现 {len(store_sheets)} 个门店工作表，{found_metrics} 个指标",
-                "store_sheets": store_sheets,
-                "metrics_found": found_metrics,
-                "columns": list(df.columns) if not df.empty else [],
-                "rows_preview": len(df)
-            }
+            result = _validation_verdict(first_sheet, first, store_sheets, found_metrics, complete,
+                                         column_names(first["header"], first["width"]))
+            seconds = time.monotonic() - started
+            if complete:
+                _cache_validation(cache_key, result)
+            else:
+                logger.warning(f"Excel文件验证超过时间限制（{seconds:.1f}s），只检查了部分内容: {file_path}")
+            return dict(result)
             
         except Exception as e:
             return {
@@ -294,7 +345,7 @@ def validate_excel_file(file_path: str) -> Dict[str, any]:
     except ImportError:
         return {
             "success": False,
-            "message": "缺少pandas库，无法验证Excel文件"
+            "message": "缺少openpyxl库，无法验证Excel文件"
         }
     except Exception as e:
         logger.error(f"验证Excel文件失败: {file_path}, 错误: {e}")
@@ -302,3 +353,59 @@ def validate_excel_file(file_path: str) -> Dict[str, any]:
             "success": False,
             "message": f"验证Excel文件失败: {str(e)}"
         }
+
+
+def _validation_verdict(first_sheet: str, first: Dict[str, any], store_sheets: List[str], found_metrics: int,
+                        complete: bool, columns: List) -> Dict[str, any]:
+    """根据第一个门店工作表的格式和找到的指标数量给出验证结论"""
+    # 检查基本格式要求（超时时尚未读到数据行不视为空表）
+    if first["width"] == 0 or (first["rows"] == 0 and first["complete"]):
+        return {
+            "success": False,
+            "message": f"工作表 '{first_sheet}' 为空"
+        }
+    
+    # 检查是否有足够的列（至少应该有日期列）
+    if first["width"] < 10:
+        return {
+            "success": False,
+            "message": f"工作表 '{first_sheet}' 列数不足，可能不是正确的门店激励数据格式"
+        }
+    
+    if not complete:
+        # 超时未检查完时不阻止处理，读取时会再次查找指标
+        return {
+            "success": True,
+            "message": f"文件较大，已在时间限制内检查部分内容，发现 {len(store_sheets)} 个门店工作表，{found_metrics} 个指标",
+            "store_sheets": store_sheets,
+            "metrics_found": found_metrics,
+            "columns": columns,
+            "rows_preview": first["rows"],
+            "partial": True
+        }
+    
+    # 更宽松的验证逻辑：允许部分匹配
+    if found_metrics == 0:
+        return {
+            "success": False,
+            "message": f"工作表 '{first_sheet}' 中没有找到预期的指标数据，请检查文件格式是否正确"
+        }
+    
+    # 如果找到的指标数量较少，给出警告但不阻止处理
+    if found_metrics < 3:
+        logger.warning(f"工作表 '{first_sheet}' 中只找到 {found_metrics} 个指标，可能不是完整的门店激励数据")
+        return {
+            "success": True,
+            "message": f"文件验证通过，但只找到 {found_metrics} 个指标，建议检查数据完整性",
+            "columns": columns,
+            "rows_preview": first["rows"]
+        }
+    
+    return {
+        "success": True,
+        "message": f"Excel文件格式验证通过，发现 {len(store_sheets)} 个门店工作表，{found_metrics} 个指标",
+        "store_sheets": store_sheets,
+        "metrics_found": found_metrics,
+        "columns": columns,
+        "rows_preview": first["rows"]
+    }
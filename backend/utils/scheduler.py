@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+定时同步调度模块
+按config.db中的sync_schedules规则（cron表达式）定时向同步任务队列提交爬取任务，
+例如每天早上同步前一天、每周复核最近7天，让用户打开看板前数据已经就绪
+
+- 每次计算下次运行时间时加入随机延迟（jitter_seconds），避免总在同一时刻访问上游
+- 落在跳过窗口（skip_windows，如上游高峰时段）内的运行推迟到窗口结束
+- 下次运行时间和上次运行结果保存在config.db中，应用重启后继续；
+  应用关闭期间错过的运行在启动后补跑一次
+"""
+
+import asyncio
+import os
+import random
+from datetime import datetime, timedelta, time as dt_time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# 尝试导入loguru，如果失败则使用标准logging
+try:
+    from loguru import logger
+except ImportError:
+    import logging
+    logger = logging.getLogger(__name__)
+
+from services.config_database_manager import config_db_manager
+
+# 调度循环的最长休眠时间（秒），规则被修改后最迟在这个时间内生效
+SCHEDULER_POLL_SECONDS = 60
+
+SCHEDULE_KINDS = ('sync', 'batch', 'plan')
+
+
+class CronExpression:
+    """
+    五段式cron表达式：分 时 日 月 周
+
+    每段支持 *、数字、列表（1,3,5）、范围（1-5）和步长（*/15、0-30/10）；
+    周的取值为0-7，0和7都表示周日。日和周都不是*时，满足其一即可（与cron一致）
+    """
+
+    FIELD_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression: str):
+        self.expression = expression.strip()
+        parts = self.expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"cron表达式应包含5段（分 时 日 月 周）: {expression}")
+        fields = [self._parse_field(part, low, high) for part, (low, high) in zip(parts, self.FIELD_RANGES)]
+        self.minutes, self.hours, self.days, self.months, weekdays = fields
+        # cron的周日为0（或7），转换为datetime.weekday()的6
+        self.weekdays = {(value - 1) % 7 for value in weekdays}
+        self.any_day = parts[2] == '*'
+        self.any_weekday = parts[4] == '*'
+
+    @staticmethod
+    def _parse_field(part: str, low: int, high: int) -> Set[int]:
+        values = set()
+        for item in part.split(','):
+            step = 1
+            if '/' in item:
+                item, step_text = item.split('/', 1)
+                step = int(step_text)
+                if step <= 0:
+                    raise ValueError(f"cron步长必须大于0: {part}")
+            if item == '*':
+                start, end = low, high
+            elif '-' in item:
+                start_text, end_text = item.split('-', 1)
+                start, end = int(start_text), int(end_text)
+            else:
+                start = int(item)
+                end = high if step > 1 else start
+            if start < low or end > high or start > end:
+                raise ValueError(f"cron字段超出范围 {low}-{high}: {part}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def matches_day(self, day) -> bool:
+        if day.month not in self.months:
+            return False
+        day_ok = day.day in self.days
+        weekday_ok = day.weekday() in self.weekdays
+        if self.any_day:
+            return weekday_ok
+        if self.any_weekday:
+            return day_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, moment: datetime) -> datetime:
+        """严格晚于moment的下一个触发时间（精确到分钟）"""
+        start = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        hours = sorted(self.hours)
+        minutes = sorted(self.minutes)
+        day = start.date()
+        # 最多向后查找约5年，覆盖2月29日这类规则
+        for _ in range(366 * 5):
+            if self.matches_day(day):
+                for hour in hours:
+                    for minute in minutes:
+                        candidate = datetime.combine(day, dt_time(hour, minute))
+                        if candidate >= start:
+                            return candidate
+            day += timedelta(days=1)
+        raise ValueError(f"cron表达式没有可用的触发时间: {self.expression}")
+
+
+def parse_skip_windows(windows: List[str]) -> List[Tuple[dt_time, dt_time]]:
+    """解析跳过窗口，如 "09:00-12:00"；结束早于开始表示跨过午夜"""
+    parsed = []
+    for window in windows or []:
+        start_text, end_text = window.split('-', 1)
+        start = datetime.strptime(start_text.strip(), '%H:%M').time()
+        end = datetime.strptime(end_text.strip(), '%H:%M').time()
+        parsed.append((start, end))
+    return parsed
+
+
+def skip_window_end(moment: datetime, windows: List[Tuple[dt_time, dt_time]]) -> Optional[datetime]:
+    """moment落在某个跳过窗口内时返回该窗口的结束时间，否则返回None"""
+    current = moment.time()
+    for start, end in windows:
+        if start <= end:
+            if start <= current < end:
+                return datetime.combine(moment.date(), end)
+        elif current >= start:
+            return datetime.combine(moment.date() + timedelta(days=1), end)
+        elif current < end:
+            return datetime.combine(moment.date(), end)
+    return None
+
+
+def validate_schedule(schedule: Dict[str, Any]):
+    """检查规则是否可用，不可用时抛出ValueError"""
+    CronExpression(schedule['cron'])
+    parse_skip_windows(schedule.get('skip_windows'))
+    if schedule.get('kind') not in SCHEDULE_KINDS:
+        raise ValueError(f"不支持的任务类型: {schedule.get('kind')}，可选: {', '.join(SCHEDULE_KINDS)}")
+    if schedule.get('start_offset_days', 0) < schedule.get('end_offset_days', 0):
+        raise ValueError("开始日期偏移天数不能小于结束日期偏移天数")
+
+
+def next_run_time(schedule: Dict[str, Any], after: datetime) -> datetime:
+    """
+    计算规则的下次运行时间：cron触发时间 + 随机延迟，落在跳过窗口内时推迟到窗口结束
+    """
+    run_at = CronExpression(schedule['cron']).next_after(after)
+    jitter = schedule.get('jitter_seconds') or 0
+    if jitter > 0:
+        run_at += timedelta(seconds=random.uniform(0, jitter))
+    windows = parse_skip_windows(schedule.get('skip_windows'))
+    # 相邻或重叠的窗口需要连续推迟
+    for _ in range(len(windows)):
+        window_end = skip_window_end(run_at, windows)
+        if window_end is None:
+            break
+        run_at = window_end
+    return run_at.replace(microsecond=0)
+
+
+def schedule_job_params(schedule: Dict[str, Any], today=None) -> Dict[str, Any]:
+    """按规则的日期偏移生成同步任务参数"""
+    today = today or datetime.now().date()
+    start_date = (today - timedelta(days=schedule['start_offset_days'])).strftime('%Y-%m-%d')
+    end_date = (today - timedelta(days=schedule['end_offset_days'])).strftime('%Y-%m-%d')
+    if schedule['kind'] == 'sync':
+        return {'date': start_date}
+    params = {'start_date': start_date, 'end_date': end_date}
+    if schedule['kind'] == 'batch':
+        params['resume'] = True
+    return params
+
+
+class SyncScheduler:
+    """在应用的事件循环中运行的定时同步调度器"""
+
+    def __init__(self, poll_seconds: int = SCHEDULER_POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._watchers: Set[asyncio.Task] = set()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """启动调度循环（设置环境变量 KSX_SCHEDULER=0 可关闭）"""
+        if os.environ.get('KSX_SCHEDULER', '1') == '0':
+            logger.info("定时同步已通过 KSX_SCHEDULER=0 关闭")
+            return
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._loop())
+        logger.info("定时同步调度器已启动")
+
+    def reload(self):
+        """规则被修改后立即重新计算"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def stop(self):
+        tasks = [task for task in [self._task, *self._watchers] if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._watchers.clear()
+
+    async def _loop(self):
+        while True:
+            try:
+                delay = self.tick(datetime.now())
+            except Exception as e:
+                logger.error(f"定时同步调度异常: {e}")
+                delay = self.poll_seconds
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def tick(self, now: datetime) -> float:
+        """
+        提交到期的规则并安排下次运行
+
+        Returns:
+            float: 距下一次检查的秒数
+        """
+        next_check = now + timedelta(seconds=self.poll_seconds)
+        for schedule in config_db_manager.get_sync_schedules(enabled_only=True):
+            try:
+                next_run_at = self._due_time(schedule, now)
+            except ValueError as e:
+                logger.warning(f"定时同步规则 {schedule['name']} 无效，已跳过: {e}")
+                continue
+            if next_run_at <= now:
+                if now - next_run_at > timedelta(minutes=1):
+                    logger.info(f"补跑应用关闭期间错过的定时同步: {schedule['name']}（原定 {next_run_at}）")
+                self.run_schedule(schedule, now)
+                next_run_at = next_run_time(schedule, now)
+                config_db_manager.update_sync_schedule_state(schedule['id'], next_run_at=next_run_at.isoformat())
+            next_check = min(next_check, next_run_at)
+        return max((next_check - now).total_seconds(), 1)
+
+    def _due_time(self, schedule: Dict[str, Any], now: datetime) -> datetime:
+        """规则保存的下次运行时间，没有时计算并保存"""
+        if schedule.get('next_run_at'):
+            try:
+                return datetime.fromisoformat(schedule['next_run_at'])
+            except ValueError:
+                pass
+        validate_schedule(schedule)
+        next_run_at = next_run_time(schedule, now)
+        config_db_manager.update_sync_schedule_state(schedule['id'], next_run_at=next_run_at.isoformat())
+        logger.info(f"定时同步 {schedule['name']} 下次运行时间: {next_run_at}")
+        return next_run_at
+
+    def run_schedule(self, schedule: Dict[str, Any], now: datetime = None):
+        """立即把规则对应的同步任务提交到任务队列，返回任务"""
+        from backend.utils.sync_jobs import sync_job_manager
+
+        now = now or datetime.now()
+        params = schedule_job_params(schedule, now.date())
+        job = sync_job_manager.submit(schedule['kind'], params)
+        logger.info(f"定时同步 {schedule['name']} 已提交任务 {job.job_id}: {schedule['kind']} {params}")
+        config_db_manager.update_sync_schedule_state(
+            schedule['id'], last_run_at=now.isoformat(timespec='seconds'), last_job_id=job.job_id,
+            last_status=job.status, last_message=None
+        )
+        watcher = asyncio.create_task(self._record_result(schedule, job))
+        self._watchers.add(watcher)
+        watcher.add_done_callback(self._watchers.discard)
+        return job
+
+    async def _record_result(self, schedule: Dict[str, Any], job):
+        """任务结束后保存结果"""
+        await job.done.wait()
+        config_db_manager.update_sync_schedule_state(
+            schedule['id'], last_status=job.status, last_message=job.message
+        )
+        logger.info(f"定时同步 {schedule['name']} 的任务 {job.job_id} 结束: {job.status} {job.message}")
+
+
+# 全局定时同步调度器
+sync_scheduler = SyncScheduler()
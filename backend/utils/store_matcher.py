@@ -0,0 +1,145 @@
+"""
+门店名称匹配器
+将Excel中的门店名称解析为数据库中的门店（MDShow），每次对比只建立一次索引：
+
+- 预先清理所有数据库门店名称，精确匹配直接查哈希表
+- 包含匹配用二元字符索引生成候选，再确认包含关系
+- 相似度匹配用单字符倒排索引计算每个候选相似度的上界，只对上界可能超过当前最优结果的候选
+  计算SequenceMatcher相似度
+
+匹配规则和结果与逐个比较所有门店相同（精确 > 包含 > 相似度 > 0.6，同分取靠前的门店）。
+包含匹配和相似度匹配的结果保存到config.db，再次导入同名门店时直接使用，不再做模糊匹配
+"""
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from typing import Callable, Dict, List, Optional, Tuple
+
+from services.config_database_manager import config_db_manager
+
+# 相似度匹配的最低相似度
+SIMILARITY_THRESHOLD = 0.6
+# 超过该长度的名称不枚举子串，包含匹配退回逐个比较
+_MAX_SUBSTRING_LENGTH = 64
+
+
+class StoreNameMatcher:
+    """基于预处理索引的门店名称匹配器"""
+
+    def __init__(self, store_names: List[str], clean: Callable[[str], str], use_memo: bool = True):
+        """
+        Args:
+            store_names: 数据库中的门店名称（MDShow原值），顺序决定同等匹配时的优先级
+            clean: 名称清理函数，Excel门店名称和数据库门店名称使用同一规则
+            use_memo: 是否使用并保存config.db中的匹配结果
+        """
+        self.store_names = list(store_names)
+        self.clean = clean
+        self.use_memo = use_memo
+        self._name_set = set(self.store_names)
+        self._cleaned = [clean(name) for name in self.store_names]
+
+        # 清理后的名称 -> 门店序号（按原顺序）
+        self._exact: Dict[str, List[int]] = defaultdict(list)
+        # 二元字符 -> 包含该二元字符的门店序号（升序）
+        self._bigrams: Dict[str, List[int]] = defaultdict(list)
+        # 单个字符 -> [(门店序号, 出现次数)]
+        self._chars: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for idx, cleaned in enumerate(self._cleaned):
+            self._exact[cleaned].append(idx)
+            for bigram in dict.fromkeys(cleaned[i:i + 2] for i in range(len(cleaned) - 1)):
+                self._bigrams[bigram].append(idx)
+            for char, count in Counter(cleaned).items():
+                self._chars[char].append((idx, count))
+
+        self._memo = config_db_manager.get_store_name_mappings() if use_memo else {}
+
+    def match(self, excel_store_name: str) -> Tuple[List[str], Optional[str], Optional[float]]:
+        """
+        匹配Excel门店名称
+
+        Returns:
+            (数据库门店名称列表, 匹配方式, 相似度)：匹配方式为 exact / contains / similarity，
+            来自config.db时为 memo:contains 等；未匹配时返回 ([], None, None)
+        """
+        clean_excel_name = self.clean(excel_store_name)
+
+        # 策略1: 精确匹配（总是以当前门店列表为准）
+        exact = self._exact.get(clean_excel_name)
+        if exact:
+            return [self.store_names[idx] for idx in exact], "exact", None
+
+        # 之前导入时保存的模糊匹配结果，匹配到的门店仍然存在时直接使用
+        memo = self._memo.get(excel_store_name)
+        if memo and memo['db_store_names'] and all(name in self._name_set for name in memo['db_store_names']):
+            return list(memo['db_store_names']), f"memo:{memo['match_type']}", memo.get('similarity')
+
+        # 策略2: 包含匹配（取第一个）
+        idx = self._first_containing(clean_excel_name)
+        if idx is not None:
+            return self._remember(excel_store_name, [self.store_names[idx]], "contains", None)
+
+        # 策略3: 相似度匹配（只在前面策略都失败时使用）
+        idx, similarity = self._best_similar(clean_excel_name)
+        if idx is not None:
+            return self._remember(excel_store_name, [self.store_names[idx]], "similarity", similarity)
+
+        return [], None, None
+
+    def _remember(self, excel_store_name: str, names: List[str], match_type: str,
+                  similarity: Optional[float]) -> Tuple[List[str], str, Optional[float]]:
+        if self.use_memo:
+            config_db_manager.save_store_name_mapping(excel_store_name, names, match_type, similarity)
+            self._memo[excel_store_name] = {'db_store_names': names, 'match_type': match_type,
+                                            'similarity': similarity}
+        return names, match_type, similarity
+
+    def _first_containing(self, clean_excel_name: str) -> Optional[int]:
+        """第一个与Excel名称互相包含的门店序号"""
+        length = len(clean_excel_name)
+        if length < 2 or length > _MAX_SUBSTRING_LENGTH:
+            for idx, cleaned in enumerate(self._cleaned):
+                if clean_excel_name in cleaned or cleaned in clean_excel_name:
+                    return idx
+            return None
+
+        candidates = []
+        # 数据库名称包含Excel名称：候选必须包含Excel名称的所有二元字符
+        postings = [self._bigrams.get(clean_excel_name[i:i + 2]) for i in range(length - 1)]
+        if all(postings):
+            postings.sort(key=len)
+            common = set(postings[0]).intersection(*postings[1:])
+            candidates.extend(idx for idx in common if clean_excel_name in self._cleaned[idx])
+        # Excel名称包含数据库名称：数据库名称是Excel名称的某个子串（含空串）
+        for start in range(length + 1):
+            for end in range(start, length + 1):
+                indices = self._exact.get(clean_excel_name[start:end])
+                if indices:
+                    candidates.append(indices[0])
+        return min(candidates) if candidates else None
+
+    def _best_similar(self, clean_excel_name: str) -> Tuple[Optional[int], Optional[float]]:
+        """
+        相似度最高（且超过阈值）的门店序号和相似度
+
+        SequenceMatcher的匹配字符数不超过两个名称共同字符的数量，
+        因此 2 * 共同字符数 / 总长度 是相似度的上界，按上界从高到低计算，上界不可能超过当前最优时停止
+        """
+        common: Dict[int, int] = defaultdict(int)
+        for char, count in Counter(clean_excel_name).items():
+            for idx, db_count in self._chars.get(char, ()):
+                common[idx] += min(count, db_count)
+
+        length = len(clean_excel_name)
+        bounds = sorted(
+            ((2 * shared / (length + len(self._cleaned[idx])), idx) for idx, shared in common.items()),
+            key=lambda item: (-item[0], item[1])
+        )
+        best_idx, best_similarity = None, 0.0
+        for bound, idx in bounds:
+            if bound <= SIMILARITY_THRESHOLD or bound < best_similarity:
+                break
+            similarity = SequenceMatcher(None, clean_excel_name, self._cleaned[idx]).ratio()
+            if similarity > SIMILARITY_THRESHOLD and (
+                    similarity > best_similarity or (similarity == best_similarity and idx < best_idx)):
+                best_idx, best_similarity = idx, similarity
+        return best_idx, (best_similarity if best_idx is not None else None)
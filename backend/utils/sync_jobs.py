@@ -0,0 +1,485 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+同步任务管理
+提交同步请求后立即返回任务ID，任务在后台由固定数量的工作协程依次执行；
+相同参数的进行中任务会被合并。任务状态由爬虫事件（见 services/crawler/core/events.py）
+实时更新，可轮询查询或通过SSE订阅
+
+开发环境中每个任务运行一个爬虫子进程，stdout/stderr只转发到日志，只保留最后几十行
+用于出错时的提示；打包环境中在当前进程中运行爬虫，事件直接交给任务状态
+"""
+
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.crawler.core.events import EventChannel, events
+
+# 尝试导入loguru，如果失败则使用标准logging
+try:
+    from loguru import logger
+except ImportError:
+    import logging
+    logger = logging.getLogger(__name__)
+
+# 项目根目录（开发环境中爬虫子进程的工作目录）
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 保留的已结束任务数量
+MAX_FINISHED_JOBS = 50
+# 出错时附带的输出行数
+OUTPUT_TAIL_LINES = 30
+# 同时执行的同步任务数，可通过环境变量 KSX_SYNC_WORKERS 修改
+DEFAULT_SYNC_WORKERS = 1
+
+
+class SyncJobState:
+    """同步任务状态，由爬虫事件实时更新"""
+
+    def __init__(self, kind: str, params: Dict[str, Any] = None):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.params = params or {}
+        self.status = 'queued'
+        self.phase: Optional[str] = None
+        self.message = ''
+        self.pid: Optional[int] = None
+        self.page = 0
+        self.total_pages = 0
+        self.records = 0
+        self.dates_done: Dict[str, Dict[str, Any]] = {}
+        self.errors: List[Dict[str, Any]] = []
+        self.plan: Optional[Dict[str, Any]] = None
+        self.summary: Optional[Dict[str, Any]] = None
+        self.created_at = datetime.now().isoformat()
+        self.started_at: Optional[str] = None
+        self.updated_at = self.created_at
+        self.finished_at: Optional[str] = None
+        self.coalesced = 0  # 被合并到该任务的重复请求数
+        self.outcome: Optional[Dict[str, Any]] = None
+        # 收到plan事件时置位，按计划爬取时接口只等待计划生成
+        self.plan_ready = asyncio.Event()
+        self.done = asyncio.Event()
+        # SSE订阅者，每个订阅者一个队列
+        self._subscribers: List[asyncio.Queue] = []
+
+    @property
+    def active(self) -> bool:
+        return self.status in ('queued', 'running')
+
+    def subscribe(self) -> asyncio.Queue:
+        """订阅任务事件，任务结束时队列中会收到 {'event': 'finished'}"""
+        queue = asyncio.Queue()
+        self._subscribers.append(queue)
+        if not self.active:
+            queue.put_nowait({'event': 'finished', 'job': self.to_dict()})
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+
+    def _publish(self, event: Dict[str, Any]):
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+
+    def mark_running(self):
+        self.status = 'running'
+        self.started_at = self.updated_at = datetime.now().isoformat()
+        self._publish({'event': 'started', 'job_id': self.job_id})
+
+    def apply_event(self, event: Dict[str, Any]):
+        """根据一个爬虫事件更新状态"""
+        kind = event.get('event')
+        self.updated_at = datetime.now().isoformat()
+        self._publish(event)
+        if kind == 'progress':
+            self.phase = event.get('phase')
+            self.message = event.get('message', '')
+        elif kind == 'page_done':
+            self.page = event.get('page', self.page)
+            self.total_pages = event.get('total_pages') or self.total_pages
+            self.records = event.get('records', self.records)
+        elif kind == 'date_done':
+            self.dates_done[event.get('date') or 'default'] = {
+                'records': event.get('records', 0),
+                'saved': event.get('saved', 0)
+            }
+        elif kind == 'error':
+            self.errors.append({k: v for k, v in event.items() if k != 'event'})
+            self.message = event.get('message', '')
+        elif kind == 'plan':
+            self.plan = event.get('plan')
+            self.plan_ready.set()
+        elif kind == 'summary':
+            self.summary = {k: v for k, v in event.items() if k not in ('event', 'ts')}
+            self.message = self.summary.get('message', '')
+        else:
+            logger.debug(f"忽略未知的爬虫事件: {kind}")
+
+    def finish(self, result: Dict[str, Any]):
+        """记录任务结束"""
+        self.outcome = dict(result, job_id=self.job_id)
+        self.status = 'succeeded' if result.get('success') else 'failed'
+        self.message = result.get('message', self.message)
+        self.finished_at = datetime.now().isoformat()
+        self.updated_at = self.finished_at
+        # 没有输出计划就结束了，唤醒等待计划的接口
+        self.plan_ready.set()
+        self.done.set()
+        self._publish({'event': 'finished', 'job': self.to_dict()})
+
+    def result(self) -> Dict[str, Any]:
+        """
+        根据最终结果事件生成接口返回值 {"success", "message", "total", "report"}
+
+        没有产生结果事件（进程崩溃等）时返回失败，错误信息取最后一个错误事件
+        """
+        summary = self.summary
+        if summary is None:
+            last_error = self.errors[-1]['message'] if self.errors else '爬虫没有返回结果'
+            return {"success": False, "message": last_error, "total": 0, "report": None}
+
+        message = summary.get('message', '')
+        if summary.get('success'):
+            if '数据已是最新状态' in message or '无新记录' in message:
+                message = "数据已是最新"
+        elif any(e.get('error_type') == 'NO_DATA_FOR_DATE' for e in self.errors):
+            message = "当前同步日期没有数据"
+        elif self.errors:
+            message = self.errors[-1].get('message') or message
+        return {
+            "success": bool(summary.get('success')),
+            "message": message,
+            "total": summary.get('total', 0) or 0,
+            "report": summary.get('report')
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """任务状态（用于接口返回）"""
+        return {
+            'job_id': self.job_id,
+            'kind': self.kind,
+            'params': self.params,
+            'status': self.status,
+            'phase': self.phase,
+            'message': self.message,
+            'pid': self.pid,
+            'page': self.page,
+            'total_pages': self.total_pages,
+            'records': self.records,
+            'dates_done': self.dates_done,
+            'errors': self.errors,
+            'plan': self.plan,
+            'summary': self.summary,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'updated_at': self.updated_at,
+            'finished_at': self.finished_at,
+            'coalesced': self.coalesced,
+            'result': self.outcome,
+        }
+
+
+def crawler_command(*args: str, script: str = "main.py") -> List[str]:
+    """构建开发环境下运行爬虫脚本（services/crawler/下的main.py或worker.py）的命令，优先使用uv"""
+    crawler_script = os.path.join(project_root, "services", "crawler", script)
+    if shutil.which("uv"):
+        cmd = ["uv", "run", "python", crawler_script]
+    else:
+        cmd = ["python", crawler_script]
+    cmd.extend(args)
+    return cmd
+
+
+def crawler_env() -> Dict[str, str]:
+    """爬虫子进程的环境变量，让爬虫使用主应用的数据库目录"""
+    from services.database_manager import get_database_dir
+    env = os.environ.copy()
+    env['KSX_DATABASE_DIR'] = get_database_dir()
+    return env
+
+
+def _pump_output(stream, tail: deque, is_stderr: bool):
+    """把子进程输出转发到日志，只保留最后几行（在线程中执行）"""
+    for raw in iter(stream.readline, b''):
+        line = raw.decode('utf-8', errors='ignore').strip()
+        if not line:
+            continue
+        tail.append(line)
+        if not is_stderr:
+            logger.info(f"爬虫输出: {line}")
+        elif "ERROR" in line:
+            logger.error(f"爬虫错误: {line}")
+        elif "WARNING" in line:
+            logger.warning(f"爬虫警告: {line}")
+        else:
+            logger.info(f"爬虫信息: {line}")
+    stream.close()
+
+
+async def run_crawler_process(cmd: List[str], job: SyncJobState, env: Dict[str, str], cwd: str = None) -> Dict[str, Any]:
+    """
+    运行爬虫子进程，增量读取事件更新任务状态，直到进程结束
+
+    使用线程读取管道（而不是asyncio子进程），Windows的SelectorEventLoop下同样可用
+
+    Returns:
+        Dict[str, Any]: {"success", "message", "total", "report"}
+    """
+    loop = asyncio.get_running_loop()
+    channel = EventChannel()
+    env = dict(env)
+    env.update(channel.env)
+
+    try:
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=cwd,
+            env=env,
+            **channel.popen_kwargs
+        )
+    except Exception:
+        channel.close()
+        raise
+    channel.child_started()
+    job.pid = process.pid
+    logger.info(f"爬虫进程已启动，任务 {job.job_id}，进程ID: {process.pid}")
+
+    tail = deque(maxlen=OUTPUT_TAIL_LINES)
+
+    def on_event(event: Dict[str, Any]):
+        loop.call_soon_threadsafe(job.apply_event, event)
+
+    readers = asyncio.gather(
+        asyncio.to_thread(channel.read, on_event),
+        asyncio.to_thread(_pump_output, process.stdout, tail, False),
+        asyncio.to_thread(_pump_output, process.stderr, tail, True),
+    )
+    try:
+        return_code = await asyncio.to_thread(process.wait)
+    except asyncio.CancelledError:
+        # 应用退出时结束爬虫进程
+        logger.warning(f"任务 {job.job_id} 被取消，结束爬虫进程 {process.pid}")
+        process.terminate()
+        raise
+    await readers
+    # 让读取线程投递的事件全部处理完
+    await asyncio.sleep(0)
+
+    result = job.result()
+    if job.summary is None:
+        output = '\n'.join(tail)
+        logger.error(f"爬虫进程异常结束，返回码: {return_code}\n{output}")
+        result['message'] = f"爬虫执行失败（返回码: {return_code}）: {result['message']}"
+    return result
+
+
+def _log_frozen_environment():
+    """打包环境中记录模块路径信息，并确保MEIPASS在sys.path中"""
+    logger.info(f" 当前工作目录: {os.getcwd()}")
+    logger.info(f" sys.executable: {sys.executable}")
+    logger.info(f" hasattr(sys, '_MEIPASS'): {hasattr(sys, '_MEIPASS')}")
+    if not hasattr(sys, '_MEIPASS'):
+        return
+    logger.info(f" sys._MEIPASS: {sys._MEIPASS}")
+    if sys._MEIPASS not in sys.path:
+        sys.path.insert(0, sys._MEIPASS)
+        logger.info(f" 已添加MEIPASS到sys.path: {sys._MEIPASS}")
+    crawler_path = os.path.join(sys._MEIPASS, 'services', 'crawler')
+    logger.info(f" crawler目录存在: {os.path.exists(crawler_path)}")
+
+
+async def run_crawler_in_process(job: SyncJobState, worker=None) -> Dict[str, Any]:
+    """
+    打包环境：在当前进程中执行爬虫（避免子进程问题），事件直接交给任务状态
+
+    事件回调保存在上下文变量中，多个任务并行时互不干扰
+
+    Args:
+        worker: 进程内的常驻爬虫（services.crawler.worker.CrawlerWorker），复用已登录的浏览器；
+                None表示每个任务启动新的浏览器
+    """
+    from services.database_manager import get_database_dir
+    os.environ['KSX_DATABASE_DIR'] = get_database_dir()
+    _log_frozen_environment()
+
+    from services.crawler import main as crawler_main
+    params = job.params
+    token = events.set_sink(job.apply_event)
+    try:
+        if worker is not None:
+            await worker.run_job(job.kind, params)
+        elif job.kind == 'sync':
+            await crawler_main.main(params.get('date'))
+        elif job.kind == 'plan':
+            await crawler_main.main_plan(params['start_date'], params.get('end_date'), execute=True)
+        else:
+            await crawler_main.main_range(params['start_date'], params.get('end_date'), resume=params.get('resume', False))
+    finally:
+        events.reset_sink(token)
+    return job.result()
+
+
+def job_command(job: SyncJobState) -> List[str]:
+    """开发环境中任务对应的爬虫命令行"""
+    params = job.params
+    if job.kind == 'sync':
+        return crawler_command("--date", params['date']) if params.get('date') else crawler_command()
+    args = ["--start-date", params['start_date']]
+    if params.get('end_date'):
+        args.extend(["--end-date", params['end_date']])
+    if job.kind == 'plan':
+        args.extend(["--plan", "--execute"])
+    elif params.get('resume'):
+        args.append("--resume")
+    return crawler_command(*args)
+
+
+async def run_job(job: SyncJobState, worker=None) -> Dict[str, Any]:
+    """
+    执行一个同步任务
+
+    打包环境在当前进程中执行；开发环境交给常驻爬虫工作进程，未启用时每个任务启动一个爬虫子进程
+    """
+    if getattr(sys, 'frozen', False):
+        logger.info(f"打包环境：在当前进程中执行任务 {job.job_id}")
+        return await run_crawler_in_process(job, worker)
+    if worker is not None:
+        return await worker.run(job)
+    cmd = job_command(job)
+    logger.info(f"执行爬虫命令: {' '.join(cmd)}")
+    return await run_crawler_process(cmd, job, crawler_env(), cwd=project_root)
+
+
+class SyncJobManager:
+    """同步任务队列：合并重复请求，由固定数量的工作协程执行"""
+
+    def __init__(self, workers: int = None):
+        self.workers = workers or int(os.environ.get('KSX_SYNC_WORKERS', DEFAULT_SYNC_WORKERS))
+        self.jobs: "OrderedDict[str, SyncJobState]" = OrderedDict()
+        self._active: Dict[Tuple, SyncJobState] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        # 每个工作协程对应一个常驻爬虫（开发环境为工作进程，打包环境为进程内实例）
+        self._crawler_workers: Dict[int, Any] = {}
+
+    def _crawler_worker(self, index: int):
+        """工作协程使用的常驻爬虫，未启用时返回None"""
+        from services.crawler.worker import CrawlerWorker, load_worker_config
+
+        if not load_worker_config().get('enabled', True):
+            return None
+        if index not in self._crawler_workers:
+            if getattr(sys, 'frozen', False):
+                self._crawler_workers[index] = CrawlerWorker()
+            else:
+                from backend.utils.crawler_worker import CrawlerWorkerClient
+                self._crawler_workers[index] = CrawlerWorkerClient(index)
+        return self._crawler_workers[index]
+
+    @staticmethod
+    def job_key(kind: str, params: Dict[str, Any]) -> Tuple:
+        """合并重复请求使用的键：任务类型和日期范围等参数"""
+        return (kind,) + tuple(sorted((k, v) for k, v in params.items() if v is not None))
+
+    def _ensure_workers(self):
+        """第一次提交任务时在当前事件循环中启动工作协程"""
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._worker_tasks = [task for task in self._worker_tasks if not task.done()]
+        while len(self._worker_tasks) < self.workers:
+            self._worker_tasks.append(asyncio.create_task(self._worker(len(self._worker_tasks) + 1)))
+
+    def submit(self, kind: str, params: Dict[str, Any] = None) -> SyncJobState:
+        """
+        提交同步任务
+
+        相同类型和参数的任务仍在排队或执行时，直接返回该任务（coalesced计数加一）
+        """
+        params = params or {}
+        key = self.job_key(kind, params)
+        existing = self._active.get(key)
+        if existing is not None and existing.active:
+            existing.coalesced += 1
+            logger.info(f"合并重复的同步请求到任务 {existing.job_id}: {kind} {params}")
+            return existing
+
+        job = SyncJobState(kind, params)
+        self.jobs[job.job_id] = job
+        self._active[key] = job
+        self._prune()
+        self._ensure_workers()
+        self._queue.put_nowait((key, job))
+        logger.info(f"同步任务已加入队列: {job.job_id} {kind} {params}")
+        return job
+
+    def _prune(self):
+        """只保留最近的已结束任务"""
+        finished = [job_id for job_id, job in self.jobs.items() if not job.active]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    async def _worker(self, index: int):
+        while True:
+            key, job = await self._queue.get()
+            try:
+                job.mark_running()
+                logger.info(f"工作协程{index}开始执行任务 {job.job_id}")
+                result = await run_job(job, self._crawler_worker(index))
+            except asyncio.CancelledError:
+                job.finish({"success": False, "message": "任务已取消", "total": 0})
+                raise
+            except Exception as e:
+                logger.error(f"同步任务 {job.job_id} 执行异常: {e}")
+                result = {"success": False, "message": f"爬虫执行失败: {e}", "total": 0}
+            finally:
+                if self._active.get(key) is job:
+                    del self._active[key]
+                self._queue.task_done()
+            job.finish(result)
+            logger.info(f"同步任务 {job.job_id} 结束: {job.message}")
+
+    def get(self, job_id: str) -> Optional[SyncJobState]:
+        return self.jobs.get(job_id)
+
+    def list(self) -> List[SyncJobState]:
+        """任务列表（最近的在前）"""
+        return list(reversed(self.jobs.values()))
+
+    def worker_status(self) -> List[Dict[str, Any]]:
+        """常驻爬虫的状态（已执行任务数、浏览器启动次数、内存等）"""
+        result = []
+        for index, worker in sorted(self._crawler_workers.items()):
+            if hasattr(worker, 'alive'):
+                result.append(dict(worker.status, index=index, alive=worker.alive,
+                                   pid=worker.process.pid if worker.process else None))
+            else:
+                result.append(dict(worker.status(), index=index, alive=True))
+        return result
+
+    async def shutdown(self):
+        """停止工作协程并关闭常驻爬虫（应用退出时调用）"""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        for worker in self._crawler_workers.values():
+            try:
+                await worker.close()
+            except Exception as e:
+                logger.warning(f"关闭常驻爬虫失败: {e}")
+        self._crawler_workers = {}
+
+
+# 全局同步任务管理器
+sync_job_manager = SyncJobManager()
@@ -0,0 +1,218 @@
+"""
+导入工作簿解析结果缓存
+按文件身份（路径、大小、修改时间）和读取参数缓存StoreMetricsReader.read_excel的结果，
+在界面上逐个点开门店、指标时不再重复解析整个工作簿；文件被修改后自动失效
+
+内存中按最近使用顺序（LRU）保留，超过条目数或内存上限时淘汰最久未使用的结果；
+开启落盘（KSX_WORKBOOK_CACHE_SPILL=1）时，解析结果同时压缩写入SQLite，
+从内存中淘汰或进程重启后再次访问时从磁盘读回，省去重新解析
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from loguru import logger
+
+# 内存中最多缓存的工作簿数量和总大小（按序列化后的字节数估算）
+DEFAULT_MAX_ENTRIES = 8
+DEFAULT_MAX_MB = 256
+# 落盘缓存的总大小上限
+DEFAULT_SPILL_MAX_MB = 1024
+
+
+def file_identity(file_path: str) -> Tuple[str, int, int]:
+    """文件身份：绝对路径、大小、修改时间（纳秒），文件不存在时抛出OSError"""
+    path = Path(file_path).resolve()
+    stat = path.stat()
+    return str(path), stat.st_size, stat.st_mtime_ns
+
+
+class WorkbookCache:
+    """进程内共享的工作簿解析结果缓存（线程安全）"""
+
+    def __init__(self, max_entries: int = None, max_mb: float = None, spill_dir: str = None,
+                 spill_max_mb: float = None):
+        """
+        Args:
+            max_entries: 内存中最多缓存的结果数
+            max_mb: 内存中缓存结果的总大小上限（MB）
+            spill_dir: 落盘目录，None表示不落盘
+            spill_max_mb: 落盘缓存的总大小上限（MB）
+        """
+        self.max_entries = max_entries or int(os.environ.get('KSX_WORKBOOK_CACHE_ENTRIES', DEFAULT_MAX_ENTRIES))
+        self.max_bytes = int((max_mb or float(os.environ.get('KSX_WORKBOOK_CACHE_MB', DEFAULT_MAX_MB))) * 1024 * 1024)
+        self.spill_max_bytes = int((spill_max_mb or DEFAULT_SPILL_MAX_MB) * 1024 * 1024)
+        self.spill_path = os.path.join(spill_dir, "workbook_cache.db") if spill_dir else None
+        self._entries: "OrderedDict[Tuple, Tuple[Dict[str, Any], int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.spill_hits = 0
+        self.misses = 0
+        if self.spill_path:
+            self._init_spill()
+
+    def _init_spill(self):
+        try:
+            os.makedirs(os.path.dirname(self.spill_path), exist_ok=True)
+            with sqlite3.connect(self.spill_path) as conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS workbook_cache (
+                        cache_key TEXT PRIMARY KEY,
+                        file_path TEXT NOT NULL,
+                        file_size INTEGER NOT NULL,
+                        file_mtime INTEGER NOT NULL,
+                        payload BLOB NOT NULL,
+                        size INTEGER NOT NULL,
+                        last_used REAL NOT NULL
+                    )
+                """)
+        except Exception as e:
+            logger.warning(f"工作簿缓存落盘初始化失败，只使用内存缓存: {e}")
+            self.spill_path = None
+
+    @staticmethod
+    def make_key(file_path: str, reading_mode: str = "full", target_month: str = None, variant: Any = None) -> Tuple:
+        """
+        缓存键：文件身份 + 读取模式 + 目标月份 + 其他影响结果的参数（如提取的指标列表）
+        """
+        return file_identity(file_path) + (reading_mode, target_month, variant)
+
+    def get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+        payload = self._spill_get(key)
+        if payload is None:
+            return None
+        result = pickle.loads(zlib.decompress(payload))
+        with self._lock:
+            self.spill_hits += 1
+        self._store(key, result, len(payload))
+        return result
+
+    def put(self, key: Tuple, result: Dict[str, Any]):
+        """缓存解析结果（结果由调用方共享，不应被修改）"""
+        payload = zlib.compress(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL), 1)
+        self._store(key, result, len(payload), payload)
+
+    def _store(self, key: Tuple, result: Dict[str, Any], size: int, payload: bytes = None):
+        evicted_paths = []
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (result, size)
+            self._bytes += size
+            while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                evicted_key, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                evicted_paths.append(evicted_key[0])
+        if payload is not None and self.spill_path:
+            # 新结果同时写入磁盘，进程重启后仍可使用
+            self._spill_put(key, payload)
+        for evicted_path in evicted_paths:
+            logger.info(f"工作簿缓存已满，淘汰: {evicted_path}")
+
+    def _spill_key(self, key: Tuple) -> str:
+        return repr(key)
+
+    def _spill_get(self, key: Tuple) -> Optional[bytes]:
+        if not self.spill_path:
+            return None
+        try:
+            with sqlite3.connect(self.spill_path) as conn:
+                row = conn.execute("SELECT payload FROM workbook_cache WHERE cache_key = ?",
+                                   (self._spill_key(key),)).fetchone()
+                if row:
+                    conn.execute("UPDATE workbook_cache SET last_used = ? WHERE cache_key = ?",
+                                 (time.time(), self._spill_key(key)))
+                return row[0] if row else None
+        except Exception as e:
+            logger.warning(f"读取工作簿落盘缓存失败: {e}")
+            return None
+
+    def _spill_put(self, key: Tuple, payload: bytes):
+        try:
+            with sqlite3.connect(self.spill_path) as conn:
+                # 同一文件的旧版本（大小或修改时间不同）不会再被访问，直接删除
+                conn.execute("DELETE FROM workbook_cache WHERE file_path = ? AND (file_size != ? OR file_mtime != ?)",
+                             key[:3])
+                conn.execute("""
+                    INSERT OR REPLACE INTO workbook_cache
+                    (cache_key, file_path, file_size, file_mtime, payload, size, last_used)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, (self._spill_key(key),) + tuple(key[:3]) + (payload, len(payload), time.time()))
+                # 超过总大小上限时删除最久未使用的结果
+                total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM workbook_cache").fetchone()[0]
+                if total > self.spill_max_bytes:
+                    for cache_key, size in conn.execute(
+                            "SELECT cache_key, size FROM workbook_cache ORDER BY last_used").fetchall():
+                        if total <= self.spill_max_bytes or cache_key == self._spill_key(key):
+                            break
+                        conn.execute("DELETE FROM workbook_cache WHERE cache_key = ?", (cache_key,))
+                        total -= size
+        except Exception as e:
+            logger.warning(f"写入工作簿落盘缓存失败: {e}")
+
+    def get_or_load(self, key: Tuple, loader: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        返回缓存的结果，未缓存时调用loader解析；只缓存成功的结果
+        """
+        result = self.get(key)
+        if result is not None:
+            logger.info(f"工作簿缓存命中: {key[0]}")
+            return result
+        with self._lock:
+            self.misses += 1
+        started = time.perf_counter()
+        result = loader()
+        if result.get("success"):
+            self.put(key, result)
+            logger.info(f"工作簿解析完成并缓存: {key[0]}（{time.perf_counter() - started:.2f}s）")
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.spill_path:
+            try:
+                with sqlite3.connect(self.spill_path) as conn:
+                    conn.execute("DELETE FROM workbook_cache")
+            except Exception as e:
+                logger.warning(f"清空工作簿落盘缓存失败: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "memory_mb": round(self._bytes / 1024 / 1024, 2),
+                "max_entries": self.max_entries,
+                "max_mb": round(self.max_bytes / 1024 / 1024, 2),
+                "spill_enabled": bool(self.spill_path),
+                "hits": self.hits,
+                "spill_hits": self.spill_hits,
+                "misses": self.misses,
+            }
+
+
+def _default_spill_dir() -> Optional[str]:
+    """开启落盘时使用数据库目录下的cache子目录"""
+    if os.environ.get('KSX_WORKBOOK_CACHE_SPILL', '0') != '1':
+        return None
+    from services.database_manager import get_database_dir
+    return os.path.join(get_database_dir(), "cache")
+
+
+# 全局工作簿缓存
+workbook_cache = WorkbookCache(spill_dir=_default_spill_dir())
@@ -1,5 +1,6 @@
 import sys
 import os
+import multiprocessing
 import subprocess
 import time
 import socket
@@ -1332,4 +1333,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # 打包后的应用中，并行解析Excel的子进程由此进入工作进程逻辑，而不是再启动一个桌面应用
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
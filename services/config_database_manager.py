@@ -112,6 +112,70 @@ class ConfigDatabaseManager:
                     )
                 """)
                 
+                # 创建爬取状态表（断点续爬）
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS crawl_state (
+                        run_id TEXT PRIMARY KEY,
+                        mode TEXT NOT NULL,                 -- range: 日期范围一次搜索；batch: 按日期逐个爬取
+                        start_date TEXT NOT NULL,
+                        end_date TEXT NOT NULL,
+                        last_page INTEGER DEFAULT 0,        -- 最后一个已完整入库的页码
+                        total_pages INTEGER DEFAULT 0,
+                        records_by_date TEXT DEFAULT '{}',  -- JSON格式：{日期: {records, saved, upstream_total, complete}}
+                        status TEXT NOT NULL DEFAULT 'running',  -- running / failed / completed
+                        message TEXT,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_crawl_state_range ON crawl_state(mode, start_date, end_date)")
+                
+                # 创建定时同步规则表（表已存在时不再写入默认规则，用户删除的规则不会在下次启动时恢复）
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sync_schedules'")
+                seed_schedules = cursor.fetchone() is None
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS sync_schedules (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        name TEXT UNIQUE NOT NULL,
+                        cron TEXT NOT NULL,                  -- 分 时 日 月 周，如 "30 6 * * *"
+                        kind TEXT NOT NULL DEFAULT 'sync',   -- sync: 单日；batch: 日期范围；plan: 只爬取缺失或有变化的日期
+                        start_offset_days INTEGER NOT NULL DEFAULT 1,  -- 开始日期 = 今天 - N天
+                        end_offset_days INTEGER NOT NULL DEFAULT 1,    -- 结束日期 = 今天 - N天
+                        jitter_seconds INTEGER NOT NULL DEFAULT 0,     -- 在触发时间后随机延迟0~N秒
+                        skip_windows TEXT DEFAULT '[]',      -- JSON格式：["09:00-12:00"]，落在窗口内时推迟到窗口结束
+                        enabled BOOLEAN DEFAULT TRUE,
+                        last_run_at TEXT,
+                        next_run_at TEXT,
+                        last_job_id TEXT,
+                        last_status TEXT,
+                        last_message TEXT,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+                # 创建门店名称匹配结果表（Excel门店 -> 数据库门店，导入对比时免去重复的模糊匹配）
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS store_name_mappings (
+                        excel_store_name TEXT PRIMARY KEY,
+                        db_store_names TEXT NOT NULL,        -- JSON格式：匹配到的数据库门店名称（MDShow原值）
+                        match_type TEXT NOT NULL,            -- contains: 包含匹配；similarity: 相似度匹配
+                        similarity REAL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+                
+                # 默认规则（只在新建规则表时写入）：每天早上同步前一天，每周一凌晨复核最近7天
+                if seed_schedules:
+                    cursor.executemany("""
+                        INSERT OR IGNORE INTO sync_schedules
+                        (name, cron, kind, start_offset_days, end_offset_days, jitter_seconds)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    """, [
+                        ("每日同步前一天", "30 6 * * *", "sync", 1, 1, 1200),
+                        ("每周复核最近7天", "0 3 * * 1", "plan", 7, 1, 1800),
+                    ])
+                
                 conn.commit()
                 logger.info("配置数据库初始化完成")
                 
@@ -453,6 +517,446 @@ class ConfigDatabaseManager:
             logger.error(f"获取门店跟踪信息失败: {e}")
             return []
     
+    def create_crawl_run(self, mode: str, start_date: str, end_date: str) -> Optional[str]:
+        """
+        创建爬取运行记录
+        
+        Args:
+            mode: 爬取模式 (range / batch)
+            start_date: 开始日期
+            end_date: 结束日期
+            
+        Returns:
+            Optional[str]: 运行ID，失败时返回None
+        """
+        try:
+            import uuid
+            
+            run_id = uuid.uuid4().hex[:12]
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO crawl_state (run_id, mode, start_date, end_date)
+                    VALUES (?, ?, ?, ?)
+                """, (run_id, mode, start_date, end_date))
+                conn.commit()
+                logger.info(f"创建爬取运行记录: {run_id} ({mode} {start_date} ~ {end_date})")
+                return run_id
+                
+        except Exception as e:
+            logger.error(f"创建爬取运行记录失败: {e}")
+            return None
+    
+    def update_crawl_checkpoint(self, run_id: str, last_page: int = None, total_pages: int = None,
+                                records_by_date: Dict[str, Any] = None, status: str = None,
+                                message: str = None) -> bool:
+        """
+        更新爬取检查点，未传入的字段保持不变
+        
+        Args:
+            run_id: 运行ID
+            last_page: 最后一个已完整入库的页码
+            total_pages: 总页数
+            records_by_date: 按日期统计的记录数
+            status: 运行状态 (running / failed / completed)
+            message: 状态说明
+            
+        Returns:
+            bool: 是否成功更新
+        """
+        try:
+            import json
+            
+            updates = []
+            params = []
+            for column, value in (("last_page", last_page), ("total_pages", total_pages),
+                                  ("status", status), ("message", message)):
+                if value is not None:
+                    updates.append(f"{column} = ?")
+                    params.append(value)
+            if records_by_date is not None:
+                updates.append("records_by_date = ?")
+                params.append(json.dumps(records_by_date, ensure_ascii=False))
+            updates.append("updated_at = CURRENT_TIMESTAMP")
+            params.append(run_id)
+            
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"UPDATE crawl_state SET {', '.join(updates)} WHERE run_id = ?", params)
+                conn.commit()
+                return cursor.rowcount > 0
+                
+        except Exception as e:
+            logger.error(f"更新爬取检查点失败: {e}")
+            return False
+    
+    def _crawl_row_to_dict(self, row) -> Dict[str, Any]:
+        """将crawl_state行转换为字典"""
+        import json
+        
+        try:
+            records_by_date = json.loads(row[6]) if row[6] else {}
+        except Exception:
+            records_by_date = {}
+        return {
+            'run_id': row[0],
+            'mode': row[1],
+            'start_date': row[2],
+            'end_date': row[3],
+            'last_page': row[4] or 0,
+            'total_pages': row[5] or 0,
+            'records_by_date': records_by_date,
+            'status': row[7],
+            'message': row[8],
+            'created_at': row[9],
+            'updated_at': row[10]
+        }
+    
+    def get_crawl_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取爬取运行记录
+        
+        Args:
+            run_id: 运行ID
+            
+        Returns:
+            Optional[Dict[str, Any]]: 运行记录或None
+        """
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT run_id, mode, start_date, end_date, last_page, total_pages,
+                           records_by_date, status, message, created_at, updated_at
+                    FROM crawl_state WHERE run_id = ?
+                """, (run_id,))
+                row = cursor.fetchone()
+                return self._crawl_row_to_dict(row) if row else None
+                
+        except Exception as e:
+            logger.error(f"获取爬取运行记录失败: {e}")
+            return None
+    
+    def get_resumable_crawl_run(self, mode: str, start_date: str, end_date: str) -> Optional[Dict[str, Any]]:
+        """
+        获取同一日期范围内最近一次未完成的运行记录
+        
+        Args:
+            mode: 爬取模式 (range / batch)
+            start_date: 开始日期
+            end_date: 结束日期
+            
+        Returns:
+            Optional[Dict[str, Any]]: 运行记录或None
+        """
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT run_id, mode, start_date, end_date, last_page, total_pages,
+                           records_by_date, status, message, created_at, updated_at
+                    FROM crawl_state
+                    WHERE mode = ? AND start_date = ? AND end_date = ? AND status != 'completed'
+                    ORDER BY updated_at DESC, rowid DESC
+                    LIMIT 1
+                """, (mode, start_date, end_date))
+                row = cursor.fetchone()
+                return self._crawl_row_to_dict(row) if row else None
+                
+        except Exception as e:
+            logger.error(f"获取可续爬的运行记录失败: {e}")
+            return None
+    
+    def get_completed_crawl_dates(self, start_date: str, end_date: str) -> Dict[str, Dict[str, Any]]:
+        """
+        获取日期范围内已完成爬取的日期及其记录数（以最近一次运行为准）
+        
+        Args:
+            start_date: 开始日期
+            end_date: 结束日期
+            
+        Returns:
+            Dict[str, Dict[str, Any]]: {日期: {records, saved, upstream_total, complete}}
+        """
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT run_id, mode, start_date, end_date, last_page, total_pages,
+                           records_by_date, status, message, created_at, updated_at
+                    FROM crawl_state
+                    WHERE start_date <= ? AND end_date >= ?
+                    ORDER BY updated_at ASC, rowid ASC
+                """, (end_date, start_date))
+                
+                completed = {}
+                for row in cursor.fetchall():
+                    run = self._crawl_row_to_dict(row)
+                    for date_str, entry in run['records_by_date'].items():
+                        if start_date <= date_str <= end_date and entry.get('complete'):
+                            completed[date_str] = entry
+                return completed
+                
+        except Exception as e:
+            logger.error(f"获取已完成爬取的日期失败: {e}")
+            return {}
+    
+    def _schedule_row_to_dict(self, row) -> Dict[str, Any]:
+        """将sync_schedules行转换为字典"""
+        import json
+        
+        try:
+            skip_windows = json.loads(row[8]) if row[8] else []
+        except Exception:
+            skip_windows = []
+        return {
+            'id': row[0],
+            'name': row[1],
+            'cron': row[2],
+            'kind': row[3],
+            'start_offset_days': row[4],
+            'end_offset_days': row[5],
+            'jitter_seconds': row[6] or 0,
+            'enabled': bool(row[7]),
+            'skip_windows': skip_windows,
+            'last_run_at': row[9],
+            'next_run_at': row[10],
+            'last_job_id': row[11],
+            'last_status': row[12],
+            'last_message': row[13],
+            'created_at': row[14],
+            'updated_at': row[15]
+        }
+    
+    def get_sync_schedules(self, enabled_only: bool = False) -> List[Dict[str, Any]]:
+        """
+        获取定时同步规则
+        
+        Args:
+            enabled_only: 是否只返回启用的规则
+            
+        Returns:
+            List[Dict[str, Any]]: 规则列表
+        """
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"""
+                    SELECT id, name, cron, kind, start_offset_days, end_offset_days, jitter_seconds,
+                           enabled, skip_windows, last_run_at, next_run_at, last_job_id, last_status,
+                           last_message, created_at, updated_at
+                    FROM sync_schedules
+                    {"WHERE enabled" if enabled_only else ""}
+                    ORDER BY id
+                """)
+                return [self._schedule_row_to_dict(row) for row in cursor.fetchall()]
+                
+        except Exception as e:
+            logger.error(f"获取定时同步规则失败: {e}")
+            return []
+    
+    def get_sync_schedule(self, schedule_id: int) -> Optional[Dict[str, Any]]:
+        """获取单条定时同步规则"""
+        for schedule in self.get_sync_schedules():
+            if schedule['id'] == schedule_id:
+                return schedule
+        return None
+    
+    def save_sync_schedule(self, name: str, cron: str, kind: str = 'sync', start_offset_days: int = 1,
+                           end_offset_days: int = 1, jitter_seconds: int = 0, skip_windows: List[str] = None,
+                           enabled: bool = True, schedule_id: int = None) -> Optional[int]:
+        """
+        新增或修改定时同步规则（修改时清空下次运行时间，由调度器重新计算）
+        
+        Args:
+            name: 规则名称
+            cron: cron表达式（分 时 日 月 周）
+            kind: 任务类型 (sync / batch / plan)
+            start_offset_days: 开始日期距今天的天数
+            end_offset_days: 结束日期距今天的天数
+            jitter_seconds: 随机延迟上限（秒）
+            skip_windows: 不运行的时间窗口，如 ["09:00-12:00"]
+            enabled: 是否启用
+            schedule_id: 要修改的规则ID，None表示新增
+            
+        Returns:
+            Optional[int]: 规则ID，失败时返回None
+        """
+        try:
+            import json
+            
+            values = (name, cron, kind, start_offset_days, end_offset_days, jitter_seconds,
+                      json.dumps(skip_windows or [], ensure_ascii=False), enabled)
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                if schedule_id is None:
+                    cursor.execute("""
+                        INSERT INTO sync_schedules
+                        (name, cron, kind, start_offset_days, end_offset_days, jitter_seconds, skip_windows, enabled)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """, values)
+                    schedule_id = cursor.lastrowid
+                else:
+                    cursor.execute("""
+                        UPDATE sync_schedules
+                        SET name = ?, cron = ?, kind = ?, start_offset_days = ?, end_offset_days = ?,
+                            jitter_seconds = ?, skip_windows = ?, enabled = ?, next_run_at = NULL,
+                            updated_at = CURRENT_TIMESTAMP
+                        WHERE id = ?
+                    """, values + (schedule_id,))
+                    if cursor.rowcount == 0:
+                        logger.warning(f"定时同步规则不存在: {schedule_id}")
+                        return None
+                conn.commit()
+                logger.info(f"保存定时同步规则: {name} ({cron} {kind})")
+                return schedule_id
+                
+        except Exception as e:
+            logger.error(f"保存定时同步规则失败: {e}")
+            return None
+    
+    def update_sync_schedule_state(self, schedule_id: int, **fields) -> bool:
+        """
+        更新定时同步规则的运行状态
+        
+        Args:
+            schedule_id: 规则ID
+            **fields: last_run_at / next_run_at / last_job_id / last_status / last_message
+            
+        Returns:
+            bool: 是否成功更新
+        """
+        allowed = ('last_run_at', 'next_run_at', 'last_job_id', 'last_status', 'last_message')
+        updates = [(column, value) for column, value in fields.items() if column in allowed]
+        if not updates:
+            return False
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    f"UPDATE sync_schedules SET {', '.join(f'{column} = ?' for column, _ in updates)} WHERE id = ?",
+                    [value for _, value in updates] + [schedule_id]
+                )
+                conn.commit()
+                return cursor.rowcount > 0
+                
+        except Exception as e:
+            logger.error(f"更新定时同步规则状态失败: {e}")
+            return False
+    
+    def delete_sync_schedule(self, schedule_id: int) -> bool:
+        """
+        删除定时同步规则
+        
+        Args:
+            schedule_id: 规则ID
+            
+        Returns:
+            bool: 是否成功删除
+        """
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("DELETE FROM sync_schedules WHERE id = ?", (schedule_id,))
+                conn.commit()
+                
+                if cursor.rowcount > 0:
+                    logger.info(f"删除定时同步规则: {schedule_id}")
+                    return True
+                logger.warning(f"定时同步规则不存在: {schedule_id}")
+                return False
+                
+        except Exception as e:
+            logger.error(f"删除定时同步规则失败: {e}")
+            return False
+    
+    def get_store_name_mappings(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取所有已保存的门店名称匹配结果
+        
+        Returns:
+            Dict[str, Dict[str, Any]]: {Excel门店名称: {db_store_names, match_type, similarity, updated_at}}
+        """
+        try:
+            import json
+            
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT excel_store_name, db_store_names, match_type, similarity, updated_at
+                    FROM store_name_mappings
+                """)
+                
+                mappings = {}
+                for row in cursor.fetchall():
+                    mappings[row[0]] = {
+                        'db_store_names': json.loads(row[1]),
+                        'match_type': row[2],
+                        'similarity': row[3],
+                        'updated_at': row[4]
+                    }
+                return mappings
+                
+        except Exception as e:
+            logger.error(f"获取门店名称匹配结果失败: {e}")
+            return {}
+    
+    def save_store_name_mapping(self, excel_store_name: str, db_store_names: List[str], match_type: str,
+                                similarity: float = None) -> bool:
+        """
+        保存门店名称匹配结果
+        
+        Args:
+            excel_store_name: Excel中的门店名称
+            db_store_names: 匹配到的数据库门店名称
+            match_type: 匹配方式
+            similarity: 相似度（相似度匹配时）
+            
+        Returns:
+            bool: 是否成功保存
+        """
+        try:
+            import json
+            
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT OR REPLACE INTO store_name_mappings
+                    (excel_store_name, db_store_names, match_type, similarity, updated_at)
+                    VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                """, (excel_store_name, json.dumps(db_store_names, ensure_ascii=False), match_type, similarity))
+                conn.commit()
+                return True
+                
+        except Exception as e:
+            logger.error(f"保存门店名称匹配结果失败: {e}")
+            return False
+    
+    def delete_store_name_mappings(self, excel_store_name: str = None) -> int:
+        """
+        删除门店名称匹配结果
+        
+        Args:
+            excel_store_name: Excel中的门店名称，None表示全部删除
+            
+        Returns:
+            int: 删除的记录数
+        """
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                if excel_store_name is None:
+                    cursor.execute("DELETE FROM store_name_mappings")
+                else:
+                    cursor.execute("DELETE FROM store_name_mappings WHERE excel_store_name = ?", (excel_store_name,))
+                conn.commit()
+                logger.info(f"删除门店名称匹配结果: {cursor.rowcount} 条")
+                return cursor.rowcount
+                
+        except Exception as e:
+            logger.error(f"删除门店名称匹配结果失败: {e}")
+            return 0
+    
     def get_export_fields(self) -> List[Dict[str, Any]]:
         """
         获取所有可导出的字段列表
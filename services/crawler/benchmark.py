@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬虫压测脚本
+在后台线程中启动本地模拟KSX服务器（services/crawler/mock_server.py），以无头模式运行
+KSXCrawler完成登录、日期范围搜索、翻页和入库，输出每秒页数和每秒记录数
+
+数据库、配置数据库均写入临时目录，不影响正式数据
+
+用法:
+    python -m services.crawler.benchmark --days 3 --records-per-day 2000 --latency-ms 100
+    python -m services.crawler.benchmark --days 7 --error-rate 0.05 --output bench.json
+    python -m services.crawler.benchmark --replay capture.har   # 回放抓包，不启动浏览器和模拟服务器
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+# 添加项目根目录到路径，以便直接运行本脚本
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+
+def start_mock_server(config, host: str, port: int):
+    """在后台线程中启动模拟服务器，返回uvicorn.Server实例"""
+    import uvicorn
+    from services.crawler.mock_server import create_app
+
+    server = uvicorn.Server(uvicorn.Config(create_app(config), host=host, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+
+    deadline = time.time() + 10
+    while not server.started:
+        if time.time() > deadline or not thread.is_alive():
+            raise RuntimeError(f"模拟服务器启动失败: {host}:{port}")
+        time.sleep(0.05)
+    return server
+
+
+async def run_benchmark(start_date: str, end_date: str, login_url: str, work_dir: str) -> dict:
+    """运行一次完整的日期范围爬取并统计耗时"""
+    from services.crawler.crawler import KSXCrawler
+    from services.config_database_manager import config_db_manager
+
+    # 断点续爬状态写入临时配置数据库
+    config_db_manager.db_path = os.path.join(work_dir, "config.db")
+    config_db_manager.init_database()
+
+    crawler = KSXCrawler(headless=True, timeout=30000, login_url=login_url)
+    # 模拟数据不写入响应归档
+    crawler.response_archive = None
+
+    timings = {}
+    try:
+        started = time.perf_counter()
+        if not await crawler.start_browser():
+            return {"success": False, "message": "浏览器启动失败"}
+        timings['browser_start'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        if not await crawler.login():
+            return {"success": False, "message": "登录失败"}
+        timings['login'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        result = await crawler.full_api_data_extraction_range(start_date, end_date)
+        timings['extraction'] = time.perf_counter() - started
+    finally:
+        await crawler.close()
+
+    stats = crawler.last_ingest_stats or {}
+    extraction = timings.get('extraction') or 0
+    return {
+        "success": result.get('success', False),
+        "message": result.get('message', ''),
+        "pages": stats.get('pages', 0),
+        "records": stats.get('records', 0),
+        "saved": stats.get('saved', 0),
+        "failed_records": stats.get('failed_records', 0),
+        "timings": {name: round(seconds, 3) for name, seconds in timings.items()},
+        "phases": crawler.timer.summary(),
+        "pages_per_second": round(stats.get('pages', 0) / extraction, 2) if extraction else 0,
+        "records_per_second": round(stats.get('records', 0) / extraction, 1) if extraction else 0,
+    }
+
+
+async def run_replay_benchmark(capture_path: str, work_dir: str) -> dict:
+    """回放抓包（不启动浏览器），统计翻页、去重、入库的吞吐量"""
+    from services.crawler.crawler import KSXCrawler
+
+    crawler = KSXCrawler(headless=True, timeout=30000)
+    crawler.response_archive = None
+    try:
+        result = await crawler.replay_capture(capture_path)
+    finally:
+        await crawler.close()
+
+    details = result.get('details') or {}
+    return {
+        "success": result.get('success', False),
+        "message": result.get('message', ''),
+        "pages": details.get('pages', 0),
+        "records": details.get('records', 0),
+        "saved": details.get('saved', 0),
+        "failed_records": details.get('failed_records', 0),
+        "timings": {"replay": details.get('seconds', 0)},
+        "pages_per_second": details.get('pages_per_second', 0),
+        "records_per_second": details.get('records_per_second', 0),
+    }
+
+
+def main():
+    from services.crawler.mock_server import add_mock_arguments, config_from_args
+
+    parser = argparse.ArgumentParser(description='KSX爬虫压测（本地模拟服务器）')
+    parser.add_argument('--start-date', type=str, default='2025-09-01', help='开始日期 (YYYY-MM-DD)')
+    parser.add_argument('--days', type=int, default=1, help='爬取的天数')
+    parser.add_argument('--port', type=int, default=18900, help='模拟服务器端口')
+    parser.add_argument('--output', type=str, help='结果写入的JSON文件')
+    parser.add_argument('--replay', type=str, help='回放HAR/NDJSON抓包代替模拟服务器')
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    start = datetime.strptime(args.start_date, '%Y-%m-%d')
+    end_date = (start + timedelta(days=args.days - 1)).strftime('%Y-%m-%d')
+    mock_config = config_from_args(args)
+
+    work_dir = tempfile.mkdtemp(prefix="ksx-benchmark-")
+    # 必须在导入数据库模块之前设置，爬虫的数据库管理器单例会读取该变量
+    os.environ['KSX_DATABASE_DIR'] = os.path.join(work_dir, "database")
+
+    if args.replay:
+        report = asyncio.run(run_replay_benchmark(args.replay, work_dir))
+        report.update({"replay": args.replay, "work_dir": work_dir})
+        print(f"Benchmark Result: {json.dumps(report, ensure_ascii=False)}")
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+        sys.exit(0 if report.get('success') else 1)
+
+    server = start_mock_server(mock_config, "127.0.0.1", args.port)
+    try:
+        report = asyncio.run(run_benchmark(args.start_date, end_date, f"http://127.0.0.1:{args.port}/", work_dir))
+    finally:
+        server.should_exit = True
+
+    expected = sum(mock_config['records_per_day'] for offset in range(args.days)
+                   if (start + timedelta(days=offset)).strftime('%Y-%m-%d') not in mock_config['empty_dates'])
+    report.update({
+        "start_date": args.start_date,
+        "end_date": end_date,
+        "expected_records": expected,
+        "complete": report.get('records') == expected,
+        "mock_config": mock_config,
+        "work_dir": work_dir,
+    })
+
+    print(f"Benchmark Result: {json.dumps(report, ensure_ascii=False)}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    sys.exit(0 if report.get('success') and report['complete'] else 1)
+
+
+if __name__ == "__main__":
+    main()
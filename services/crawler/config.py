@@ -28,8 +28,8 @@ BROWSER_CONFIG = {
     'headless': False,   # 是否无头模式
     'browser_path': '../playwright-config/browsers',  # 自定义浏览器安装路径
     'viewport': {
-        'width': 1920,
-        'height': 1080
+        'width': 1366,   # 查询表单和分页控件在该尺寸下完整显示，无需1920x1080
+        'height': 768
     },
     'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
     'args': [
@@ -43,6 +43,66 @@ BROWSER_CONFIG = {
     ]
 }
 
+# 资源路由配置：爬虫只读取/UIProcessor返回的JSON，拦截无关资源以加快页面加载
+ROUTING_CONFIG = {
+    'enabled': True,  # 设为False时不拦截任何资源，本次统计作为对比基线
+    'blocked_resource_types': ['image', 'media', 'font'],  # 分页下拉菜单依赖样式定位，不拦截stylesheet
+    'allowed_hosts': ['ksx.dahuafuli.com'],  # 其他域名（统计、CDN上的第三方脚本）一律拦截
+    'block_third_party': True,
+    'cache_resource_types': ['script', 'stylesheet'],  # 跨运行缓存的静态资源类型
+    'cache_max_age_hours': 24,
+    'user_data_dir': 'browser-profile',  # 持久化目录（相对于项目根目录），存放静态资源缓存和流量统计
+    'stats_file': 'network_stats.json',
+}
+
+# 响应捕获配置：内存中只保留最近的响应摘要，完整数据交给入库流水线后即释放
+CAPTURE_CONFIG = {
+    'max_responses': 50,          # 内存中保留的响应摘要条数（环形缓冲区）
+    'spill_to_archive': False,    # 是否将原始响应写入按日期分区的压缩归档，可用 services/crawler/reingest.py 离线重新入库
+    'archive_dir': 'archive',     # 归档目录（相对于项目根目录），结构为 YYYY-MM/ksx_YYYY-MM-DD.ndjson.gz
+    'archive_keep_days': 90,      # 归档保留的天数（按数据日期），打开归档时删除更早的文件，0表示不删除
+}
+
+# 等待配置（毫秒），每个步骤独立的截止时间
+WAIT_CONFIG = {
+    'selector_timeout': 10000,            # 等待页面元素出现
+    'login_timeout': 20000,               # 登录后等待查询表单出现
+    'search_response_timeout': 20000,     # 点击搜索后等待/UIProcessor响应
+    'page_size_response_timeout': 15000,  # 修改每页数量后等待/UIProcessor响应
+    'next_page_response_timeout': 15000,  # 点击下一页后等待/UIProcessor响应
+    'reload_response_timeout': 20000,     # 刷新页面后等待/UIProcessor响应
+    'response_timeout': 15000,            # 等待响应解析完成
+}
+
+# 请求节奏配置（秒）：按/UIProcessor响应耗时和失败率调整翻页、日期之间的间隔（AIMD），
+# 失败重试使用带随机抖动的指数退避，上游持续失败时熔断暂停
+PACING_CONFIG = {
+    'min_delay': 0.0,               # 请求间隔下限，0表示上游正常时收到响应后立即发出下一个请求
+    'max_delay': 10.0,              # 请求间隔上限
+    'decrease_step': 0.2,           # 响应正常时间隔减少的秒数
+    'increase_factor': 2.0,         # 响应变慢或失败时间隔放大的倍数
+    'increase_floor': 0.5,          # 间隔为0时第一次拉长到的秒数
+    'target_latency': 3.0,          # 响应耗时超过该值视为上游吃力
+    'window': 20,                   # 计算失败率的最近请求数
+    'backoff_base': 1.0,            # 重试退避基数，第n次重试最多等待 base * 2^n 秒
+    'backoff_max': 30.0,            # 单次退避上限
+    'breaker_failures': 5,          # 连续失败多少次熔断
+    'breaker_error_rate': 0.5,      # 最近请求失败率达到该值时熔断
+    'breaker_min_samples': 10,      # 按失败率熔断所需的最少请求数
+    'breaker_cooldown': 60.0,       # 熔断后暂停的秒数
+    'breaker_max_trips': 3,         # 连续熔断多少次后停止本次爬取（可用--resume继续）
+}
+
+# 常驻爬虫工作进程配置（后端复用已启动、已登录的浏览器执行同步任务）
+WORKER_CONFIG = {
+    'enabled': True,              # 是否使用常驻工作进程，False时每个任务启动一个新的爬虫进程
+    'max_jobs': 20,               # 执行多少个任务后重启浏览器
+    'max_js_heap_mb': 512,        # 页面JS堆超过该值时重启浏览器
+    'max_rss_growth_mb': 800,     # 工作进程内存比启动时增长超过该值时退出，由后端重新启动
+    'connect_timeout': 30,        # 等待工作进程连接的超时时间（秒）
+    'shutdown_timeout': 10,       # 退出时等待工作进程关闭浏览器的时间（秒）
+}
+
 # 日志配置
 LOGGING_CONFIG = {
     'level': 'INFO',
@@ -72,6 +132,11 @@ def get_config() -> Dict[str, Any]:
         'website': WEBSITE_CONFIG,
         'login': LOGIN_CONFIG,
         'browser': BROWSER_CONFIG,
+        'routing': ROUTING_CONFIG,
+        'capture': CAPTURE_CONFIG,
+        'wait': WAIT_CONFIG,
+        'pacing': PACING_CONFIG,
+        'worker': WORKER_CONFIG,
         'logging': LOGGING_CONFIG,
         'paths': PATH_CONFIG
     }
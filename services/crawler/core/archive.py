@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+响应归档模块
+将拦截到的/UIProcessor原始响应以gzip压缩的NDJSON格式按日期分区写入磁盘，
+内存中不再保留完整数据；归档可用于离线重新入库（见 services/crawler/reingest.py）
+
+目录结构与数据库一致：
+    archive/YYYY-MM/ksx_YYYY-MM-DD.ndjson.gz
+每行是一个响应中属于该日期的部分：{url, timestamp, pageInfo, date, data}
+
+设置保留天数时，打开归档时删除数据日期早于保留期的日期文件和清空后的月份目录
+"""
+
+import asyncio
+import gzip
+import json
+import queue
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, Iterator, List
+
+# 尝试导入loguru，如果失败则使用标准logging
+try:
+    from loguru import logger
+except ImportError:
+    import logging
+    logger = logging.getLogger(__name__)
+
+
+# 没有createDateShow字段或日期无效的记录写入该分区
+UNKNOWN_DATE = 'unknown'
+
+
+def day_file_path(archive_dir, date_str: str) -> Path:
+    """返回指定日期的归档文件路径"""
+    if date_str == UNKNOWN_DATE:
+        return Path(archive_dir) / f"ksx_{UNKNOWN_DATE}.ndjson.gz"
+    return Path(archive_dir) / date_str[:7] / f"ksx_{date_str}.ndjson.gz"
+
+
+def list_day_files(archive_dir, start_date: str, end_date: str = None) -> Dict[str, Path]:
+    """
+    列出日期范围内存在的归档文件
+
+    Returns:
+        {日期: 文件路径}，按日期排序
+    """
+    end_date = end_date or start_date
+    files = {}
+    for path in sorted(Path(archive_dir).glob("*/ksx_*.ndjson.gz")):
+        date_str = path.name[len("ksx_"):-len(".ndjson.gz")]
+        if start_date <= date_str <= end_date:
+            files[date_str] = path
+    return files
+
+
+def prune_archive(archive_dir, keep_days: int, log=None) -> int:
+    """
+    删除数据日期早于今天 - keep_days 的归档文件，月份目录清空后一并删除
+
+    Returns:
+        删除的文件数
+    """
+    log = log or logger
+    cutoff = (datetime.now() - timedelta(days=keep_days)).strftime('%Y-%m-%d')
+    removed = 0
+    for path in Path(archive_dir).glob("*/ksx_*.ndjson.gz"):
+        date_str = path.name[len("ksx_"):-len(".ndjson.gz")]
+        if date_str >= cutoff:
+            continue
+        try:
+            path.unlink()
+            removed += 1
+        except OSError as e:
+            log.warning(f"删除过期归档失败 {path}: {e}")
+    for month_dir in Path(archive_dir).glob("????-??"):
+        if month_dir.is_dir() and not any(month_dir.iterdir()):
+            try:
+                month_dir.rmdir()
+            except OSError:
+                pass
+    if removed:
+        log.info(f" 已删除 {removed} 个超过 {keep_days} 天的归档文件 ({archive_dir})")
+    return removed
+
+
+def iter_archive_lines(path) -> Iterator[Dict[str, Any]]:
+    """逐行读取归档文件，跳过写入中断造成的不完整行"""
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"跳过归档中的无效行: {path}")
+    except (EOFError, OSError) as e:
+        # 进程被中断时最后一个gzip成员可能不完整，已读取的部分仍然有效
+        logger.warning(f"归档文件不完整 {path}: {e}")
+
+
+class ResponseArchive:
+    """/UIProcessor响应的压缩归档，按记录的createDateShow分区"""
+
+    def __init__(self, archive_dir: str, max_open_files: int = 16, max_pending: int = 256, keep_days: int = None,
+                 log=None):
+        """
+        初始化归档
+
+        Args:
+            archive_dir: 归档目录
+            max_open_files: 同时打开的日期文件数上限，日期范围很大时关闭最久未写入的文件
+            max_pending: 等待后台线程写入的响应数上限，磁盘跟不上时超出的响应不归档（计入dropped）
+            keep_days: 归档保留的天数（按数据日期），None表示不删除
+            log: 日志对象，默认使用模块logger
+        """
+        self.archive_dir = Path(archive_dir)
+        self.max_open_files = max_open_files
+        self.logger = log or logger
+        self._files: "OrderedDict[str, Any]" = OrderedDict()
+        self.count = 0
+        self.dates = set()
+        self.dropped = 0
+        # 序列化和gzip压缩在后台线程中执行，不占用事件循环（write在响应回调中调用）
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._thread: "threading.Thread" = None
+        if keep_days:
+            prune_archive(self.archive_dir, keep_days, log=self.logger)
+
+    @staticmethod
+    def _record_date(item: Any) -> str:
+        if isinstance(item, dict):
+            date_str = item.get('createDateShow') or ''
+            try:
+                return datetime.strptime(date_str, '%Y-%m-%d').strftime('%Y-%m-%d')
+            except ValueError:
+                pass
+        return UNKNOWN_DATE
+
+    def _get_file(self, date_str: str):
+        """获取日期分区的文件句柄（追加模式，每次打开新增一个gzip成员）"""
+        handle = self._files.get(date_str)
+        if handle is not None:
+            self._files.move_to_end(date_str)
+            return handle
+
+        if len(self._files) >= self.max_open_files:
+            _, oldest = self._files.popitem(last=False)
+            oldest.close()
+
+        path = day_file_path(self.archive_dir, date_str)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handle = gzip.open(path, 'at', encoding='utf-8')
+        self._files[date_str] = handle
+        return handle
+
+    def write(self, record: Dict[str, Any]):
+        """
+        追加一个响应（交给后台线程写入），data中的记录按日期拆分写入对应分区
+
+        在响应回调（事件循环）中调用，不会等待：待写入的响应已满时丢弃该响应并计数
+
+        Args:
+            record: {url, timestamp, pageInfo, data}
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="response-archive", daemon=True)
+            self._thread.start()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1:
+                self.logger.warning(f"⚠️ 响应归档写入跟不上，待写入的响应已达 {self._queue.maxsize} 个，之后的响应将不归档")
+
+    def _run(self):
+        """后台写入线程：按放入的顺序写入，收到None时退出"""
+        while True:
+            record = self._queue.get()
+            if record is None:
+                break
+            self._write_record(record)
+
+    def _write_record(self, record: Dict[str, Any]):
+        try:
+            groups: Dict[str, List[Any]] = {}
+            for item in record.get('data') or []:
+                groups.setdefault(self._record_date(item), []).append(item)
+
+            for date_str, items in groups.items():
+                line = dict(record, date=date_str, data=items)
+                handle = self._get_file(date_str)
+                handle.write(json.dumps(line, ensure_ascii=False, default=str))
+                handle.write('\n')
+                self.dates.add(date_str)
+            self.count += 1
+        except Exception as e:
+            self.logger.warning(f"写入响应归档失败: {e}")
+
+    def close(self):
+        """等待后台线程写完已放入的响应，关闭所有分区文件"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        while self._files:
+            _, handle = self._files.popitem(last=False)
+            try:
+                handle.close()
+            except Exception as e:
+                self.logger.warning(f"关闭响应归档失败: {e}")
+        if self.count:
+            self.logger.info(f" 响应归档完成: {self.count} 条响应写入 {len(self.dates)} 个日期分区 ({self.archive_dir})")
+            self.count = 0
+            self.dates = set()
+        if self.dropped:
+            self.logger.warning(f"⚠️ {self.dropped} 条响应因写入跟不上未归档")
+            self.dropped = 0
+
+    async def aclose(self):
+        """在线程中执行close（等待后台线程写完），不阻塞事件循环"""
+        await asyncio.to_thread(self.close)
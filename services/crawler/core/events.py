@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬虫事件协议
+爬虫进程通过单独的文件描述符（不与stdout/stderr的日志混在一起）逐行输出JSON事件，
+后端增量读取并实时更新同步任务状态，不再用正则匹配中文日志
+
+每行一个JSON对象，字段 event 表示事件类型：
+  - progress   阶段变化 {phase, message}
+  - plan       爬取计划 {plan}
+  - page_done  一页处理完成 {page, total_pages, records}
+  - date_done  一个日期完成 {date, records, saved}
+  - error      错误 {error_type, message}
+  - summary    最终结果 {success, message, total, report, ...}
+所有事件都带有 ts（Unix时间戳）
+
+父进程用 EventChannel 创建管道，通过环境变量把写端告诉爬虫进程：
+POSIX使用 KSX_EVENT_FD（文件描述符），Windows使用 KSX_EVENT_HANDLE（句柄）。
+打包环境在当前进程中运行爬虫时，用 set_sink() 直接接收事件
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional
+
+# 尝试导入loguru，如果失败则使用标准logging
+try:
+    from loguru import logger
+except ImportError:
+    import logging
+    logger = logging.getLogger(__name__)
+
+EVENT_FD_ENV = 'KSX_EVENT_FD'
+EVENT_HANDLE_ENV = 'KSX_EVENT_HANDLE'
+
+# 进程内的事件回调，保存在上下文变量中，同一进程中并行的多个爬取任务各自接收自己的事件
+_sink: ContextVar[Optional[Callable[[Dict[str, Any]], None]]] = ContextVar('ksx_event_sink', default=None)
+
+
+class EventEmitter:
+    """爬虫侧的事件输出（写入事件通道和/或进程内回调）"""
+
+    def __init__(self):
+        self._stream = None
+        self._opened = False
+        self._lock = threading.Lock()
+
+    def _open_stream(self):
+        """按环境变量打开事件通道的写端，只尝试一次"""
+        self._opened = True
+        try:
+            if os.environ.get(EVENT_HANDLE_ENV) and sys.platform == 'win32':
+                import msvcrt
+                fd = msvcrt.open_osfhandle(int(os.environ[EVENT_HANDLE_ENV]), os.O_WRONLY)
+            elif os.environ.get(EVENT_FD_ENV):
+                fd = int(os.environ[EVENT_FD_ENV])
+            else:
+                return
+            self._stream = os.fdopen(fd, 'w', encoding='utf-8', buffering=1)
+        except (OSError, ValueError) as e:
+            logger.warning(f"事件通道打开失败，不输出事件: {e}")
+            self._stream = None
+
+    def set_sink(self, sink: Callable[[Dict[str, Any]], None]):
+        """
+        为当前上下文（asyncio任务）设置事件回调，打包环境在当前进程运行爬虫时使用
+
+        Returns:
+            用于 reset_sink() 的令牌
+        """
+        return _sink.set(sink)
+
+    def reset_sink(self, token):
+        """取消 set_sink() 设置的回调"""
+        _sink.reset(token)
+
+    def emit(self, event: str, **fields) -> Dict[str, Any]:
+        """输出一个事件，事件通道不可用时静默忽略"""
+        payload = {'event': event, 'ts': round(time.time(), 3)}
+        payload.update(fields)
+
+        sink = _sink.get()
+        if sink is not None:
+            try:
+                sink(payload)
+            except Exception as e:
+                logger.warning(f"事件回调处理失败: {e}")
+
+        with self._lock:
+            if not self._opened:
+                self._open_stream()
+            if self._stream is not None:
+                try:
+                    self._stream.write(json.dumps(payload, ensure_ascii=False, default=str) + '\n')
+                except (OSError, ValueError):
+                    # 读取端已关闭，之后不再输出
+                    self._stream = None
+        return payload
+
+
+# 爬虫进程内共享的事件输出
+events = EventEmitter()
+
+
+def emit(event: str, **fields) -> Dict[str, Any]:
+    """输出一个爬虫事件"""
+    return events.emit(event, **fields)
+
+
+class EventChannel:
+    """
+    父进程侧的事件管道
+
+    用法：
+        channel = EventChannel()
+        env.update(channel.env)
+        process = subprocess.Popen(cmd, env=env, **channel.popen_kwargs)
+        channel.child_started()
+        channel.read(on_event)   # 阻塞读取，应在线程中调用
+    """
+
+    def __init__(self):
+        self.read_fd, self._write_fd = os.pipe()
+        if sys.platform == 'win32':
+            import msvcrt
+            import subprocess
+            handle = msvcrt.get_osfhandle(self._write_fd)
+            os.set_handle_inheritable(handle, True)
+            startupinfo = subprocess.STARTUPINFO()
+            startupinfo.lpAttributeList = {'handle_list': [handle]}
+            self.env = {EVENT_HANDLE_ENV: str(handle)}
+            self.popen_kwargs = {'startupinfo': startupinfo}
+        else:
+            self.env = {EVENT_FD_ENV: str(self._write_fd)}
+            self.popen_kwargs = {'pass_fds': (self._write_fd,)}
+
+    def child_started(self):
+        """子进程启动后关闭父进程持有的写端，子进程退出时读端才能读到EOF"""
+        if self._write_fd is not None:
+            os.close(self._write_fd)
+            self._write_fd = None
+
+    def close(self):
+        """子进程启动失败时释放管道"""
+        self.child_started()
+        if self.read_fd is not None:
+            os.close(self.read_fd)
+            self.read_fd = None
+
+    def read(self, on_event: Callable[[Dict[str, Any]], None]):
+        """
+        逐行读取事件并回调（阻塞，直到写端全部关闭）
+
+        无法解析的行会被跳过
+        """
+        read_fd, self.read_fd = self.read_fd, None
+        with os.fdopen(read_fd, 'r', encoding='utf-8', errors='replace') as stream:
+            for line in stream:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"跳过无效的爬虫事件: {line[:200]}")
+                    continue
+                if isinstance(event, dict) and 'event' in event:
+                    on_event(event)
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+浏览器资源路由模块
+爬虫只读取/UIProcessor返回的JSON，图片、字体、第三方统计脚本等资源都可以拦截；
+页面依赖的静态资源（JS/CSS）缓存到持久化目录，跨运行复用
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, Any
+from urllib.parse import urlparse
+
+# 尝试导入loguru，如果失败则使用标准logging
+try:
+    from loguru import logger
+except ImportError:
+    import logging
+    logger = logging.getLogger(__name__)
+
+
+# 缓存条目中不能原样回放的响应头（缓存的是解码后的内容）
+_UNCACHEABLE_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'set-cookie'}
+
+
+class ResourceRoutingPolicy:
+    """浏览器资源路由策略：拦截非必要资源，缓存静态资源，并统计节省的流量和时间"""
+
+    def __init__(self, config: Dict[str, Any] = None, base_dir: str = None, log=None):
+        """
+        初始化路由策略
+
+        Args:
+            config: 路由配置，见 config.ROUTING_CONFIG
+            base_dir: 持久化目录的根目录，user_data_dir为相对路径时以此为基准
+            log: 日志对象，默认使用模块logger
+        """
+        config = config or {}
+        self.logger = log or logger
+        self.enabled = config.get('enabled', True)
+        self.blocked_resource_types = set(config.get('blocked_resource_types', ['image', 'media', 'font']))
+        self.allowed_hosts = [host.lower() for host in config.get('allowed_hosts', [])]
+        self.block_third_party = config.get('block_third_party', True)
+        self.cache_resource_types = set(config.get('cache_resource_types', ['script', 'stylesheet']))
+        self.cache_max_age = config.get('cache_max_age_hours', 24) * 3600
+
+        user_data_dir = config.get('user_data_dir', 'browser-profile')
+        if base_dir and not os.path.isabs(user_data_dir):
+            user_data_dir = os.path.join(base_dir, user_data_dir)
+        self.user_data_dir = Path(user_data_dir)
+        self.cache_dir = self.user_data_dir / 'static-cache'
+        self.stats_file = self.user_data_dir / config.get('stats_file', 'network_stats.json')
+
+        self.reset_stats()
+
+    def reset_stats(self):
+        """重置本次爬取的统计信息"""
+        self.stats = {
+            'requests': 0,
+            'blocked': {},             # 按资源类型统计的拦截数
+            'blocked_hosts': {},       # 按域名统计的第三方拦截数
+            'network_bytes': 0,        # 实际从网络下载的字节数
+            'cache_hits': 0,
+            'cache_bytes': 0,          # 从本地缓存回放的字节数（即节省的下载量）
+            'timings': {},             # 页面加载等阶段耗时（秒）
+        }
+        self._cached_urls = set()
+        self._started = time.perf_counter()
+
+    async def attach(self, context):
+        """将路由策略挂载到浏览器上下文"""
+        if self.enabled:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            await context.route("**/*", self.handle_route)
+            self.logger.info(
+                f" 资源路由已启用: 拦截类型 {sorted(self.blocked_resource_types)}, "
+                f"允许域名 {self.allowed_hosts or '全部'}, 缓存目录 {self.cache_dir}"
+            )
+        else:
+            self.logger.info(" 资源路由未启用，仅统计网络流量（作为对比基线）")
+        context.on("requestfinished", self._on_request_finished)
+
+    def _is_allowed_host(self, url: str) -> bool:
+        """判断请求域名是否为目标站点"""
+        if not self.allowed_hosts:
+            return True
+        host = (urlparse(url).hostname or '').lower()
+        return any(host == allowed or host.endswith('.' + allowed) for allowed in self.allowed_hosts)
+
+    def block_reason(self, request) -> Optional[str]:
+        """
+        判断请求是否需要拦截
+
+        Returns:
+            拦截原因（资源类型或third-party），不需要拦截时返回None
+        """
+        url = request.url
+        if not url.startswith('http'):
+            return None
+        if self.block_third_party and not self._is_allowed_host(url):
+            return 'third-party'
+        if request.resource_type in self.blocked_resource_types:
+            return request.resource_type
+        return None
+
+    async def handle_route(self, route):
+        """context.route 的处理函数"""
+        request = route.request
+        self.stats['requests'] += 1
+        try:
+            reason = self.block_reason(request)
+            if reason:
+                self.stats['blocked'][reason] = self.stats['blocked'].get(reason, 0) + 1
+                if reason == 'third-party':
+                    host = urlparse(request.url).hostname or ''
+                    self.stats['blocked_hosts'][host] = self.stats['blocked_hosts'].get(host, 0) + 1
+                await route.abort()
+                return
+
+            if request.method == 'GET' and request.resource_type in self.cache_resource_types:
+                await self._fulfill_with_cache(route)
+                return
+
+            await route.continue_()
+        except Exception as e:
+            # 页面关闭时路由可能已失效，忽略即可
+            self.logger.debug(f"处理路由失败 {request.url}: {e}")
+
+    def _cache_paths(self, url: str):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return self.cache_dir / f"{key}.body", self.cache_dir / f"{key}.json"
+
+    def _read_cache(self, body_path: Path, meta_path: Path) -> Optional[Dict[str, Any]]:
+        """读取未过期的缓存条目（在线程中执行），返回 {'meta', 'body'}"""
+        if not (body_path.exists() and meta_path.exists()):
+            return None
+        meta = json.loads(meta_path.read_text(encoding='utf-8'))
+        if time.time() - meta.get('saved_at', 0) > self.cache_max_age:
+            return None
+        return {'meta': meta, 'body': body_path.read_bytes()}
+
+    @staticmethod
+    def _write_cache(body_path: Path, meta_path: Path, body: bytes, meta: Dict[str, Any]):
+        """写入缓存条目（在线程中执行）"""
+        body_path.write_bytes(body)
+        meta_path.write_text(json.dumps(meta, ensure_ascii=False), encoding='utf-8')
+
+    async def _fulfill_with_cache(self, route):
+        """静态资源优先从本地缓存回放，未命中时下载并写入缓存；下载失败时交给浏览器自己请求"""
+        request = route.request
+        body_path, meta_path = self._cache_paths(request.url)
+
+        try:
+            cached = await asyncio.to_thread(self._read_cache, body_path, meta_path)
+        except Exception as e:
+            cached = None
+            self.logger.debug(f"读取静态资源缓存失败 {request.url}: {e}")
+        if cached is not None:
+            meta, body = cached['meta'], cached['body']
+            await route.fulfill(status=meta.get('status', 200), headers=meta.get('headers', {}), body=body)
+            self.stats['cache_hits'] += 1
+            self.stats['cache_bytes'] += len(body)
+            self._cached_urls.add(request.url)
+            return
+
+        try:
+            response = await route.fetch()
+            body = await response.body()
+        except Exception as e:
+            # 下载失败（网络错误、超时）时不能让请求悬空，否则页面要等到导航超时
+            self.logger.debug(f"下载静态资源失败，改为直接请求 {request.url}: {e}")
+            try:
+                await route.continue_()
+            except Exception:
+                await route.abort()
+            return
+
+        if response.status == 200:
+            try:
+                headers = {k: v for k, v in response.headers.items() if k.lower() not in _UNCACHEABLE_HEADERS}
+                await asyncio.to_thread(self._write_cache, body_path, meta_path, body, {
+                    'url': request.url,
+                    'status': response.status,
+                    'headers': headers,
+                    'saved_at': time.time()
+                })
+            except Exception as e:
+                self.logger.debug(f"写入静态资源缓存失败 {request.url}: {e}")
+        await route.fulfill(response=response, body=body)
+
+    async def _on_request_finished(self, request):
+        """统计实际从网络下载的字节数"""
+        if request.url in self._cached_urls:
+            return
+        try:
+            sizes = await request.sizes()
+            self.stats['network_bytes'] += sizes.get('responseBodySize', 0) + sizes.get('responseHeadersSize', 0)
+        except Exception:
+            pass
+
+    def record_timing(self, name: str, seconds: float):
+        """记录页面加载等阶段的耗时"""
+        self.stats['timings'][name] = round(seconds, 3)
+
+    def build_report(self) -> Dict[str, Any]:
+        """
+        生成本次爬取的流量报告，并与未启用路由时记录的基线对比
+
+        Returns:
+            报告字典，包含拦截数、网络/缓存字节数、耗时以及相对基线节省的字节和时间
+        """
+        report = dict(self.stats)
+        report['mode'] = 'lean' if self.enabled else 'baseline'
+        report['duration_seconds'] = round(time.perf_counter() - self._started, 3)
+        report['blocked_total'] = sum(self.stats['blocked'].values())
+        report['finished_at'] = datetime.now().isoformat()
+
+        history = {}
+        try:
+            if self.stats_file.exists():
+                history = json.loads(self.stats_file.read_text(encoding='utf-8'))
+        except Exception:
+            history = {}
+
+        baseline = history.get('baseline')
+        if self.enabled and baseline:
+            report['bytes_saved'] = baseline.get('network_bytes', 0) - report['network_bytes']
+            baseline_load = baseline.get('timings', {}).get('login_page_load')
+            current_load = report['timings'].get('login_page_load')
+            if baseline_load is not None and current_load is not None:
+                report['login_page_load_seconds_saved'] = round(baseline_load - current_load, 3)
+        else:
+            # 没有基线时，只能统计缓存回放节省的字节数
+            report['bytes_saved'] = report['cache_bytes']
+
+        try:
+            self.user_data_dir.mkdir(parents=True, exist_ok=True)
+            history[report['mode']] = report
+            self.stats_file.write_text(json.dumps(history, ensure_ascii=False, indent=2), encoding='utf-8')
+        except Exception as e:
+            self.logger.debug(f"写入网络统计文件失败: {e}")
+
+        return report
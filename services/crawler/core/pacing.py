@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+上游请求节奏控制模块
+根据/UIProcessor响应的耗时和失败率调整请求间隔（AIMD：响应正常时逐步缩短间隔，
+变慢或失败时成倍拉长），失败重试使用带随机抖动的指数退避；连续失败或失败率过高时
+熔断，暂停爬取一段时间后试探性恢复，多次熔断仍未恢复则放弃本次运行。
+让爬取速度贴近上游能承受的上限，而不是使用固定的等待时间
+"""
+
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+# 尝试导入loguru，如果失败则使用标准logging
+try:
+    from loguru import logger
+except ImportError:
+    import logging
+    logger = logging.getLogger(__name__)
+
+
+DEFAULT_PACING_CONFIG = {
+    'min_delay': 0.0,               # 请求间隔下限（秒）
+    'max_delay': 10.0,              # 请求间隔上限（秒）
+    'decrease_step': 0.2,           # 响应正常时间隔减少的秒数（加性）
+    'increase_factor': 2.0,         # 响应变慢或失败时间隔放大的倍数（乘性）
+    'increase_floor': 0.5,          # 间隔为0时第一次拉长到的秒数
+    'target_latency': 3.0,          # 响应耗时超过该值（秒）视为上游吃力
+    'window': 20,                   # 计算失败率的最近请求数
+    'backoff_base': 1.0,            # 重试退避的基数（秒）
+    'backoff_max': 30.0,            # 单次退避上限（秒）
+    'breaker_failures': 5,          # 连续失败多少次熔断
+    'breaker_error_rate': 0.5,      # 最近请求失败率达到该值时熔断
+    'breaker_min_samples': 10,      # 按失败率熔断所需的最少请求数
+    'breaker_cooldown': 60.0,       # 熔断后暂停的秒数
+    'breaker_max_trips': 3,         # 连续熔断多少次后放弃本次运行
+}
+
+
+class UpstreamUnavailableError(Exception):
+    """上游多次熔断后仍未恢复"""
+
+
+class PacingController:
+    """按上游响应情况调整请求节奏（同一进程中的爬虫共享一个实例）"""
+
+    def __init__(self, config: Dict[str, Any] = None, log=None):
+        self.config = dict(DEFAULT_PACING_CONFIG, **(config or {}))
+        self.log = log or logger
+        self.delay = self.config['min_delay']
+        self.samples = deque(maxlen=self.config['window'])
+        self.consecutive_failures = 0
+        self.requests = 0
+        self.failures = 0
+        self.trips = 0
+        self.total_trips = 0
+        self.paused_seconds = 0.0
+        self._open_until: Optional[float] = None
+        self._half_open = False
+        self._last_request: Optional[float] = None
+
+    @property
+    def circuit_open(self) -> bool:
+        return self._open_until is not None or self._half_open
+
+    def error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for ok, _ in self.samples if not ok) / len(self.samples)
+
+    def record(self, latency: float, ok: bool):
+        """
+        记录一次/UIProcessor请求的结果并调整间隔
+
+        Args:
+            latency: 从发出操作到收到响应（或超时）的秒数
+            ok: 是否在截止时间内收到有效响应
+        """
+        config = self.config
+        self.requests += 1
+        self._last_request = time.monotonic()
+        self.samples.append((ok, latency))
+
+        if ok:
+            self.consecutive_failures = 0
+            if self._half_open:
+                self.log.info(" 上游已恢复，关闭熔断")
+                self._half_open = False
+            self.trips = 0
+        else:
+            self.failures += 1
+            self.consecutive_failures += 1
+
+        if ok and latency <= config['target_latency']:
+            self.delay = max(config['min_delay'], self.delay - config['decrease_step'])
+        else:
+            self.delay = min(config['max_delay'],
+                             max(self.delay * config['increase_factor'], config['increase_floor']))
+            self.log.info(f" 上游响应{'变慢' if ok else '失败'}（{latency:.2f}s），请求间隔调整为 {self.delay:.2f}s")
+
+        if not ok and self._open_until is None and self._should_trip():
+            self._trip()
+
+    def _should_trip(self) -> bool:
+        config = self.config
+        if self._half_open:
+            # 冷却后的试探请求失败，立即再次熔断
+            return True
+        if self.consecutive_failures >= config['breaker_failures']:
+            return True
+        return len(self.samples) >= config['breaker_min_samples'] and self.error_rate() >= config['breaker_error_rate']
+
+    def _trip(self):
+        self.trips += 1
+        self.total_trips += 1
+        self._half_open = False
+        self._open_until = time.monotonic() + self.config['breaker_cooldown']
+        self.log.warning(f"⚠️ 上游连续失败 {self.consecutive_failures} 次，失败率 {self.error_rate():.0%}，"
+                         f"熔断暂停 {self.config['breaker_cooldown']:.0f}s（第 {self.trips}/{self.config['breaker_max_trips']} 次）")
+        # 熔断后重新统计失败率，恢复后的请求不受之前失败的影响
+        self.samples.clear()
+
+    async def _sleep(self, seconds: float):
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+
+    async def _wait_circuit(self):
+        """熔断期间等待冷却结束；多次熔断仍未恢复时抛出UpstreamUnavailableError"""
+        if self._open_until is None:
+            return
+        if self.trips >= self.config['breaker_max_trips']:
+            trips, self.trips = self.trips, 0
+            # 保持熔断状态，下一次运行先等待冷却再试探
+            raise UpstreamUnavailableError(f"上游连续熔断 {trips} 次仍未恢复，停止本次爬取")
+        remaining = self._open_until - time.monotonic()
+        if remaining > 0:
+            from services.crawler.core.events import emit
+            emit('progress', phase='paused', message=f"上游请求连续失败，暂停 {remaining:.0f} 秒后重试")
+            self.paused_seconds += remaining
+            await self._sleep(remaining)
+        # 冷却结束后放行试探请求：成功则关闭熔断，失败则立即再次熔断
+        self._open_until = None
+        self._half_open = True
+
+    async def pace(self):
+        """发出下一次请求（翻页、下一个日期）前调用：等待当前间隔，熔断时等待冷却"""
+        await self._wait_circuit()
+        if self.delay > 0 and self._last_request is not None:
+            remaining = self.delay - (time.monotonic() - self._last_request)
+            await self._sleep(remaining)
+
+    def backoff_delay(self, attempt: int) -> float:
+        """第attempt次重试（从0开始）的退避时间：指数增长，取后一半区间内的随机值"""
+        ceiling = min(self.config['backoff_max'], self.config['backoff_base'] * (2 ** attempt))
+        ceiling = max(ceiling, self.delay)
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+    async def backoff(self, attempt: int) -> float:
+        """失败后重试前等待，返回等待的秒数"""
+        await self._wait_circuit()
+        seconds = self.backoff_delay(attempt)
+        self.log.info(f" 等待 {seconds:.1f} 秒后重试...")
+        await self._sleep(seconds)
+        return seconds
+
+    def summary(self) -> Dict[str, Any]:
+        """写入运行报告的节奏统计"""
+        latencies = sorted(latency for ok, latency in self.samples if ok)
+        return {
+            'delay': round(self.delay, 3),
+            'requests': self.requests,
+            'failures': self.failures,
+            'error_rate': round(self.error_rate(), 3),
+            'recent_latency_p50': round(latencies[len(latencies) // 2], 3) if latencies else None,
+            'circuit_open': self.circuit_open,
+            'breaker_trips': self.total_trips,
+            'paused_seconds': round(self.paused_seconds, 1),
+        }
+
+
+# 进程内共享的节奏控制器：同一进程中依次创建的多个爬虫（逐日批量、常驻工作进程）共用上游的状态
+_pacer: Optional[PacingController] = None
+
+
+def get_pacer(config: Dict[str, Any] = None) -> PacingController:
+    """获取共享的节奏控制器，第一次调用时按config创建"""
+    global _pacer
+    if _pacer is None:
+        _pacer = PacingController(config)
+    return _pacer
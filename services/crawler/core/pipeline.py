@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬取-入库流水线
+翻页协程只负责把每页数据放入有界队列，后台写入任务负责规范化、去重和批量入库，
+SQLite写入在线程中执行，网络请求和磁盘写入可以同时进行
+"""
+
+import asyncio
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Any, List, Optional
+
+# 尝试导入loguru，如果失败则使用标准logging
+try:
+    from loguru import logger
+except ImportError:
+    import logging
+    logger = logging.getLogger(__name__)
+
+
+# 队列结束标记
+_END_OF_STREAM = object()
+
+
+class IngestPipeline:
+    """基于有界asyncio.Queue的生产者/消费者入库流水线"""
+
+    def __init__(self,
+                 save_func: Callable[[List[Dict[str, Any]]], Dict[str, Any]],
+                 batch_size: int = 200,
+                 max_pending_pages: int = 4,
+                 max_retries: int = 3,
+                 failed_dir: str = None,
+                 on_flush: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+                 timer=None,
+                 log=None):
+        """
+        初始化流水线
+
+        Args:
+            save_func: 同步的保存函数，接收记录列表，返回 save_to_database_by_date 格式的结果
+            batch_size: 每批写入的记录数
+            max_pending_pages: 队列中最多积压的页数，队列满时翻页协程等待（背压）
+            max_retries: 每批写入失败时的最大重试次数
+            failed_dir: 重试后仍然失败的记录落盘目录，保证数据不丢失；默认为数据库目录下的failed_records
+                        （打包后的应用中当前工作目录可能不可写）
+            on_flush: 检查点回调（同步函数，在线程中执行），每批数据完整写入后以
+                      (最后一个已完整入库的页码, 统计信息) 调用，用于断点续爬
+            timer: 阶段耗时统计（PhaseTimer），记录每批写入耗时（db_write）
+            log: 日志对象，默认使用模块logger
+        """
+        self.save_func = save_func
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        if failed_dir is None:
+            from services.database_manager import get_database_dir
+            failed_dir = Path(get_database_dir()) / "failed_records"
+        self.failed_dir = Path(failed_dir)
+        self.on_flush = on_flush
+        self.timer = timer
+        self.last_flushed_page = 0
+        self._buffer_page = 0
+        self._checkpoint_frozen = False
+        self.logger = log or logger
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending_pages)
+        self.seen_ids = set()
+        self.failed_records: List[Dict[str, Any]] = []
+        self.failed_file: Optional[str] = None
+        self.stats = {
+            'pages': 0,
+            'records': 0,
+            'duplicates': 0,
+            'saved': 0,
+            'batches': 0,
+            'failed_records': 0,
+            'by_date': {},
+        }
+        self._writer: Optional[asyncio.Task] = None
+
+    def start(self):
+        """启动后台写入任务"""
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._run())
+
+    async def put_page(self, page_data: List[Dict[str, Any]], page_no: int = None):
+        """
+        放入一页数据，队列已满时等待写入任务消费
+
+        Args:
+            page_data: 当前页的记录
+            page_no: 当前页码，用于记录检查点
+
+        Raises:
+            RuntimeError: 写入任务已异常退出
+        """
+        if self._writer is not None and self._writer.done():
+            error = self._writer.exception()
+            raise RuntimeError(f"入库任务已退出: {error}")
+        await self.queue.put((page_no, list(page_data)))
+
+    async def close(self) -> Dict[str, Any]:
+        """
+        发送结束标记，等待剩余数据全部写入
+
+        Returns:
+            流水线统计信息
+        """
+        if self._writer is None:
+            return self.stats
+        if not self._writer.done():
+            await self.queue.put(_END_OF_STREAM)
+        await self._writer
+        return self.stats
+
+    def _normalize(self, page_data: List[Any]) -> List[Dict[str, Any]]:
+        """过滤非字典记录，补齐rawId，并按ID去重"""
+        records = []
+        for item in page_data:
+            if not isinstance(item, dict):
+                continue
+            raw_id = item.get('ID') or item.get('id') or item.get('rawId')
+            if raw_id:
+                if raw_id in self.seen_ids:
+                    self.stats['duplicates'] += 1
+                    continue
+                self.seen_ids.add(raw_id)
+                if 'rawId' not in item:
+                    item = dict(item, rawId=raw_id)
+            records.append(item)
+        return records
+
+    async def _run(self):
+        """写入任务主循环"""
+        buffer: List[Dict[str, Any]] = []
+        while True:
+            item = await self.queue.get()
+            batch = None
+            try:
+                if item is _END_OF_STREAM:
+                    break
+                page_no, page_data = item
+                self.stats['pages'] += 1
+                records = self._normalize(page_data)
+                self.stats['records'] += len(records)
+                buffer.extend(records)
+                if page_no:
+                    self._buffer_page = page_no
+                if len(buffer) >= self.batch_size:
+                    batch, buffer = buffer, []
+                    await self._flush(batch)
+            except Exception as e:
+                # 写入任务不能退出，否则翻页协程会在满队列上永久等待
+                self.logger.error(f"❌ 入库任务处理失败: {e}")
+                if batch:
+                    self._mark_failed(batch)
+            finally:
+                self.queue.task_done()
+
+        # 最后一批
+        try:
+            await self._flush(buffer)
+        except Exception as e:
+            self.logger.error(f"❌ 入库任务处理失败: {e}")
+            self._mark_failed(buffer)
+
+        if self.failed_records:
+            self._spill_failed_records()
+
+    def _mark_failed(self, batch: List[Dict[str, Any]]):
+        """写入过程中出错的批次计为失败记录（最后落盘），检查点不再前进"""
+        self.failed_records.extend(batch)
+        self.stats['failed_records'] = len(self.failed_records)
+        self._checkpoint_frozen = True
+
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        """写入缓冲区中的数据，全部成功时推进检查点"""
+        if batch and not await self._write_batch(batch):
+            # 有记录写入失败后检查点不再前进，续爬时从失败的位置重新开始
+            self._checkpoint_frozen = True
+        if self._checkpoint_frozen:
+            return
+        if self._buffer_page > self.last_flushed_page:
+            self.last_flushed_page = self._buffer_page
+            if self.on_flush:
+                try:
+                    await asyncio.to_thread(self.on_flush, self.last_flushed_page, self.stats)
+                except Exception as e:
+                    self.logger.warning(f"⚠️ 记录检查点失败: {e}")
+
+    async def _write_batch(self, records: List[Dict[str, Any]]) -> bool:
+        """
+        在线程中写入一批数据，失败的日期分组按指数间隔重试
+
+        Returns:
+            是否全部写入成功
+        """
+        pending = records
+        for attempt in range(self.max_retries):
+            started = time.perf_counter()
+            try:
+                result = await asyncio.to_thread(self.save_func, pending)
+            except Exception as e:
+                result = {"total_records": 0, "details": {}, "error": str(e)}
+            if self.timer:
+                self.timer.record('db_write', time.perf_counter() - started)
+
+            self.stats['batches'] += 1
+            self.stats['saved'] += result.get("total_records", 0)
+            failed_dates = set()
+            for date_str, detail in result.get("details", {}).items():
+                if detail.get("error"):
+                    failed_dates.add(date_str)
+                    continue
+                date_stats = self.stats['by_date'].setdefault(date_str, {'records': 0, 'saved': 0})
+                date_stats['records'] += detail.get("total_records", 0)
+                date_stats['saved'] += detail.get("saved_records", 0)
+
+            if result.get("error"):
+                # 整批失败，全部重试
+                retry = pending
+            else:
+                retry = [r for r in pending if r.get('createDateShow') in failed_dates]
+
+            self.logger.info(f" 入库批次完成: 写入 {result.get('total_records', 0)} 条，累计 {self.stats['saved']} 条")
+            if not retry:
+                return True
+
+            pending = retry
+            self.logger.warning(f"⚠️ {len(pending)} 条记录写入失败，第 {attempt + 1}/{self.max_retries} 次重试")
+            await asyncio.sleep(2 ** attempt)
+
+        self.failed_records.extend(pending)
+        self.stats['failed_records'] = len(self.failed_records)
+        return False
+
+    def _spill_failed_records(self):
+        """重试后仍然失败的记录写入JSON文件，便于后续补录"""
+        try:
+            self.failed_dir.mkdir(parents=True, exist_ok=True)
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            path = self.failed_dir / f"failed_records_{timestamp}.json"
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.failed_records, f, ensure_ascii=False)
+            self.failed_file = str(path)
+            self.logger.error(f"❌ {len(self.failed_records)} 条记录多次写入失败，已保存到: {path}")
+        except Exception as e:
+            self.logger.error(f"❌ 保存失败记录时出错: {e}")
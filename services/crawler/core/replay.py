@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+响应回放模块
+从HAR文件或NDJSON抓包（包括响应归档）中读取/UIProcessor响应，包装成与Playwright
+Response接口一致的对象，交给KSXCrawler._handle_response处理，
+这样翻页、去重、入库流程可以在没有浏览器的情况下运行（用于压测和问题复现）
+"""
+
+import base64
+import gzip
+import json
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional
+
+# 尝试导入loguru，如果失败则使用标准logging
+try:
+    from loguru import logger
+except ImportError:
+    import logging
+    logger = logging.getLogger(__name__)
+
+
+class _ReplayRequest:
+    """回放请求，只提供爬虫用到的属性"""
+
+    def __init__(self, post_data: Optional[str]):
+        self.post_data = post_data
+
+    @property
+    def post_data_json(self) -> Any:
+        if not self.post_data:
+            return None
+        try:
+            return json.loads(self.post_data)
+        except json.JSONDecodeError:
+            return None
+
+
+class ReplayResponse:
+    """回放响应，实现_handle_response用到的Response接口（url、status、request、json()、text()）"""
+
+    def __init__(self, url: str, status: int, body: str, post_data: Optional[str] = None):
+        self.url = url
+        self.status = status
+        self._body = body
+        self.request = _ReplayRequest(post_data)
+
+    async def json(self) -> Any:
+        return json.loads(self._body)
+
+    async def text(self) -> str:
+        return self._body
+
+    def page_info(self) -> Dict[str, Any]:
+        """响应中的分页信息，无法解析时返回空字典"""
+        try:
+            body = json.loads(self._body)
+        except json.JSONDecodeError:
+            return {}
+        return (body.get('pageInfo') or {}) if isinstance(body, dict) else {}
+
+
+def _open_text(path: Path):
+    if path.suffix == '.gz':
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def _load_har(path: Path) -> Iterator[ReplayResponse]:
+    """读取HAR文件中的/UIProcessor响应"""
+    with _open_text(path) as f:
+        har = json.load(f)
+    for entry in har.get('log', {}).get('entries', []):
+        request = entry.get('request', {})
+        response = entry.get('response', {})
+        url = request.get('url', '')
+        if "/UIProcessor" not in url:
+            continue
+        content = response.get('content', {})
+        body = content.get('text') or ''
+        if content.get('encoding') == 'base64':
+            body = base64.b64decode(body).decode('utf-8', errors='replace')
+        post_data = (request.get('postData') or {}).get('text')
+        yield ReplayResponse(url, response.get('status', 200), body, post_data)
+
+
+def _load_ndjson(path: Path) -> Iterator[ReplayResponse]:
+    """
+    读取NDJSON抓包，每行支持两种格式：
+      - 响应归档格式 {url, pageInfo, data, ...}
+      - 原始响应格式 {url, status, body, postData}，body可以是字符串或JSON对象
+    """
+    with _open_text(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"跳过抓包中的无效行: {path}")
+                continue
+            url = item.get('url') or '/UIProcessor'
+            if "/UIProcessor" not in url:
+                continue
+            if 'body' in item:
+                body = item['body']
+                if not isinstance(body, str):
+                    body = json.dumps(body, ensure_ascii=False)
+            else:
+                body = json.dumps({
+                    'success': True,
+                    'data': item.get('data') or [],
+                    'pageInfo': item.get('pageInfo') or {}
+                }, ensure_ascii=False)
+            post_data = item.get('postData')
+            if post_data is not None and not isinstance(post_data, str):
+                post_data = json.dumps(post_data, ensure_ascii=False)
+            yield ReplayResponse(url, item.get('status', 200), body, post_data)
+
+
+def load_capture(path) -> List[ReplayResponse]:
+    """
+    读取抓包文件中的/UIProcessor响应（按抓包顺序）
+
+    Args:
+        path: .har / .har.gz / .ndjson / .ndjson.gz / .jsonl 文件
+
+    Returns:
+        回放响应列表
+    """
+    path = Path(path)
+    name = path.name.lower()
+    if name.endswith('.har') or name.endswith('.har.gz'):
+        return list(_load_har(path))
+    return list(_load_ndjson(path))
+
+
+def split_sequences(responses: List[ReplayResponse]) -> List[List[ReplayResponse]]:
+    """
+    按查询拆分响应：每个pageNo=1的响应开始一次新的翻页序列
+
+    搜索后修改每页数量时会连续出现两个第一页响应，前一个（hasMore=true且没有后续页）
+    已被后一个取代，直接丢弃
+    """
+    sequences: List[List[ReplayResponse]] = []
+    for response in responses:
+        page_no = response.page_info().get('pageNo')
+        if page_no in (1, '1') or not sequences:
+            if sequences and len(sequences[-1]) == 1 and sequences[-1][0].page_info().get('hasMore'):
+                sequences.pop()
+            sequences.append([response])
+        else:
+            sequences[-1].append(response)
+    return sequences
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+阶段耗时统计模块
+记录爬取各阶段（启动浏览器、登录、搜索、翻页响应、入库等）的耗时，
+生成包含每个阶段p50/p95的JSON运行报告
+"""
+
+import json
+import math
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+# 尝试导入loguru，如果失败则使用标准logging
+try:
+    from loguru import logger
+except ImportError:
+    import logging
+    logger = logging.getLogger(__name__)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """最近秩法计算百分位数（sorted_values需已排序且非空）"""
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+class PhaseTimer:
+    """按阶段收集耗时样本"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """开始新的一次运行"""
+        self.samples: Dict[str, List[float]] = {}
+        self.started_at = datetime.now()
+        self._started = time.perf_counter()
+
+    def record(self, phase: str, seconds: float):
+        """记录一个阶段的一次耗时（秒）"""
+        self.samples.setdefault(phase, []).append(seconds)
+
+    @contextmanager
+    def span(self, phase: str):
+        """统计with块的耗时，异常退出时同样记录"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - started)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """
+        每个阶段的统计信息
+
+        Returns:
+            {阶段: {count, total, p50, p95, max}}，时间单位为秒
+        """
+        result = {}
+        for phase, values in self.samples.items():
+            ordered = sorted(values)
+            result[phase] = {
+                'count': len(ordered),
+                'total': round(sum(ordered), 3),
+                'p50': round(percentile(ordered, 50), 3),
+                'p95': round(percentile(ordered, 95), 3),
+                'max': round(ordered[-1], 3),
+            }
+        return result
+
+    def build_report(self, **extra) -> Dict[str, Any]:
+        """
+        生成运行报告
+
+        Args:
+            **extra: 附加到报告中的信息（如爬取结果、日期范围）
+        """
+        report = {
+            'started_at': self.started_at.isoformat(),
+            'finished_at': datetime.now().isoformat(),
+            'duration_seconds': round(time.perf_counter() - self._started, 3),
+            'phases': self.summary(),
+        }
+        report.update(extra)
+        return report
+
+
+def save_report(report: Dict[str, Any], report_dir) -> Optional[str]:
+    """将运行报告写入 report_dir/run_report_<时间戳>.json，返回文件路径"""
+    try:
+        report_dir = Path(report_dir)
+        report_dir.mkdir(parents=True, exist_ok=True)
+        path = report_dir / f"run_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        path.write_text(json.dumps(report, ensure_ascii=False, indent=2, default=str), encoding='utf-8')
+        return str(path)
+    except Exception as e:
+        logger.warning(f"写入运行报告失败: {e}")
+        return None
@@ -9,9 +9,12 @@ import asyncio
 import json
 import csv
 import subprocess
+import time
+from collections import deque
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+from urllib.parse import urlparse
 # 尝试导入Playwright，如果失败则提供友好的错误信息
 try:
     from playwright.async_api import async_playwright, Browser, Page, BrowserContext, Response
@@ -124,12 +127,34 @@ if not ensure_browser_environment():
 sys.path.append(project_root)
 from services.database_manager import get_db_manager
 from services.config_database_manager import config_db_manager
+from services.crawler.core.network import ResourceRoutingPolicy
+from services.crawler.core.pipeline import IngestPipeline
+from services.crawler.core.archive import ResponseArchive
+from services.crawler.core.replay import load_capture, split_sequences
+from services.crawler.core.timing import PhaseTimer, save_report
+from services.crawler.core.events import emit
+from services.crawler.core.pacing import get_pacer, UpstreamUnavailableError
+
+
+def load_crawler_config(name: str, default: Any = None) -> Any:
+    """智能导入爬虫配置项，支持开发环境和生产环境"""
+    try:
+        try:
+            from . import config as crawler_config
+        except ImportError:
+            try:
+                from services.crawler import config as crawler_config
+            except ImportError:
+                import config as crawler_config
+        return getattr(crawler_config, name, default)
+    except ImportError:
+        return default
 
 
 class KSXCrawler:
     """KSX网站爬虫类 - API版本"""
     
-    def __init__(self, headless: bool = False, timeout: int = None, target_date: str = None):
+    def __init__(self, headless: bool = False, timeout: int = None, target_date: str = None, login_url: str = None):
         """
         初始化爬虫
         
@@ -137,6 +162,8 @@ class KSXCrawler:
             headless: 是否无头模式运行浏览器
             timeout: 超时时间（毫秒），如果为None则从配置文件读取
             target_date: 目标日期 (YYYY-MM-DD)，如果为None则使用默认日期
+            login_url: 登录页面地址，如果为None则依次读取环境变量KSX_LOGIN_URL和配置文件
+                       （本地模拟服务器、压测时使用）
         """
         # 声明全局变量
         global async_playwright, Browser, Page, BrowserContext, Response, PlaywrightTimeoutError, PLAYWRIGHT_AVAILABLE
@@ -178,7 +205,9 @@ class KSXCrawler:
         self._setup_browser_environment()
         
         # 登录信息
-        self.login_url = "https://ksx.dahuafuli.com:8306/"
+        website_config = load_crawler_config('WEBSITE_CONFIG', {}) or {}
+        self.login_url = (login_url or os.environ.get('KSX_LOGIN_URL')
+                          or website_config.get('login_url', "https://ksx.dahuafuli.com:8306/"))
         # 从配置文件读取用户名和密码
         try:
             # 尝试不同的导入方式
@@ -198,11 +227,264 @@ class KSXCrawler:
             self.username = "fsrm001"
             self.password = "fsrm001"
         
-        # 网络请求数据存储
-        self.api_responses = []
+        # 各步骤的等待截止时间
+        self.wait_config = dict(load_crawler_config('WAIT_CONFIG', {}) or {})
+
+        # 浏览器上下文配置：较小的视口，拦截非必要资源
+        browser_config = load_crawler_config('BROWSER_CONFIG', {}) or {}
+        self.viewport = browser_config.get('viewport', {'width': 1366, 'height': 768})
+        # 登录页面所在域名始终允许访问（使用本地模拟服务器时为127.0.0.1）
+        routing_config = dict(load_crawler_config('ROUTING_CONFIG', {}) or {})
+        login_host = urlparse(self.login_url).hostname
+        if login_host and routing_config.get('allowed_hosts') and login_host not in routing_config['allowed_hosts']:
+            routing_config['allowed_hosts'] = list(routing_config['allowed_hosts']) + [login_host]
+        self.routing_policy = ResourceRoutingPolicy(
+            routing_config,
+            base_dir=project_root,
+            log=self.logger
+        )
+        self.network_report = None
+
+        # 网络请求数据存储：api_responses只保留最近响应的摘要（环形缓冲区），
+        # 完整数据只存在于current_page_data中，交给调用方后即释放
+        capture_config = load_crawler_config('CAPTURE_CONFIG', {}) or {}
+        self.api_responses = deque(maxlen=capture_config.get('max_responses', 50))
         self.current_page_data = None
         self.page_info = None
-        
+        self.response_archive = None
+        if capture_config.get('spill_to_archive', False):
+            archive_dir = capture_config.get('archive_dir', 'archive')
+            if not os.path.isabs(archive_dir):
+                archive_dir = os.path.join(project_root, archive_dir)
+            self.response_archive = ResponseArchive(archive_dir, keep_days=capture_config.get('archive_keep_days'),
+                                                     log=self.logger)
+
+        # 最近一次分批保存的入库统计
+        self.last_ingest_stats = None
+
+        # 由_handle_response在收到/UIProcessor响应后触发，替代固定时长的sleep和轮询
+        self._response_event = asyncio.Event()
+        self._last_response_error = None
+
+        # 回放模式下待注入的抓包响应（见replay_capture）
+        self._replay_responses = None
+
+        # 断点续爬时直接跳到检查点之后的页：不为None时/UIProcessor请求体中的pageNo被改写为该页码
+        self._forced_page_no = None
+
+        # 各阶段耗时，用于生成运行报告
+        self.timer = PhaseTimer()
+        self.run_report = None
+
+        # 是否已登录（常驻工作进程复用浏览器时用于跳过登录）
+        self.logged_in = False
+
+        # 请求节奏控制：按/UIProcessor响应耗时和失败率调整间隔，同一进程中的爬虫共享
+        self.pacer = self.shared_pacer()
+
+    @staticmethod
+    def shared_pacer():
+        """进程内共享的请求节奏控制器（见 config.PACING_CONFIG）"""
+        return get_pacer(load_crawler_config('PACING_CONFIG', {}) or {})
+
+    def begin_run(self):
+        """复用已启动的浏览器执行新的爬取任务前，清空上一次任务的状态"""
+        self.timer.reset()
+        self.run_report = None
+        self.last_ingest_stats = None
+        self.target_date = None
+        self._reset_page_state()
+
+    async def end_run(self):
+        """复用浏览器时每个任务结束后调用：写完响应归档，输出本次的网络统计"""
+        if self.context:
+            self._log_network_report()
+        if self.response_archive:
+            await self.response_archive.aclose()
+
+    def is_browser_alive(self) -> bool:
+        """浏览器和页面是否仍然可用"""
+        try:
+            return bool(self.browser and self.browser.is_connected() and self.page and not self.page.is_closed())
+        except Exception:
+            return False
+
+    async def is_session_valid(self) -> bool:
+        """已登录的会话是否仍然有效（查询表单可见且没有回到登录页）"""
+        if not self.logged_in or not self.is_browser_alive():
+            return False
+        try:
+            if await self.page.is_visible('input[name="userId"]'):
+                return False
+            return (await self.page.is_visible('button.lb-LBObjectParameterFormExpandButton-root')
+                    or await self.page.is_visible('input.lb-LBDatePicker-input[type="text"]'))
+        except Exception:
+            return False
+
+    async def js_heap_mb(self) -> float:
+        """页面的JS堆占用（MB），用于判断是否需要重启浏览器"""
+        try:
+            used = await self.page.evaluate("() => performance.memory ? performance.memory.usedJSHeapSize : 0")
+            return round((used or 0) / 1024 / 1024, 1)
+        except Exception:
+            return 0.0
+
+    def _wait_timeout(self, key: str, default: int) -> int:
+        """获取指定步骤的等待时间（毫秒）"""
+        return self.wait_config.get(key, default)
+
+    def _reset_page_state(self):
+        """清空当前页响应状态，准备接收下一次/UIProcessor响应"""
+        self.current_page_data = None
+        self.page_info = None
+        self._last_response_error = None
+        self._response_event.clear()
+
+    @staticmethod
+    def _find_page_no(payload: Any) -> Optional[int]:
+        """在/UIProcessor请求体中查找pageNo字段"""
+        if isinstance(payload, dict):
+            for key, value in payload.items():
+                if key == 'pageNo':
+                    try:
+                        return int(value)
+                    except (TypeError, ValueError):
+                        return None
+                found = KSXCrawler._find_page_no(value)
+                if found is not None:
+                    return found
+        elif isinstance(payload, list):
+            for value in payload:
+                found = KSXCrawler._find_page_no(value)
+                if found is not None:
+                    return found
+        return None
+
+    @staticmethod
+    def _replace_page_no(payload: Any, page_no: int) -> bool:
+        """把请求体中的pageNo字段改为指定页码，返回是否找到该字段"""
+        if isinstance(payload, dict):
+            for key, value in payload.items():
+                if key == 'pageNo':
+                    payload[key] = page_no if isinstance(value, int) else str(page_no)
+                    return True
+                if KSXCrawler._replace_page_no(value, page_no):
+                    return True
+        elif isinstance(payload, list):
+            for value in payload:
+                if KSXCrawler._replace_page_no(value, page_no):
+                    return True
+        return False
+
+    async def _route_page_no(self, route):
+        """断点续爬时改写翻页请求的页码，使下一页请求直接取得检查点之后的页"""
+        try:
+            request = route.request
+            page_no = self._forced_page_no
+            content_type = (request.headers or {}).get('content-type', '')
+            if page_no is not None and 'json' in content_type:
+                payload = request.post_data_json
+                if self._find_page_no(payload) not in (None, page_no) and self._replace_page_no(payload, page_no):
+                    await route.continue_(post_data=json.dumps(payload, ensure_ascii=False))
+                    return
+        except Exception as e:
+            self.logger.warning(f"⚠️ 改写翻页请求页码失败: {e}")
+        await route.continue_()
+
+    def _is_page_response(self, response: Response, page_no: Optional[int] = None) -> bool:
+        """判断响应是否为指定页码的/UIProcessor响应"""
+        if "/UIProcessor" not in response.url:
+            return False
+        if page_no is None:
+            return True
+        try:
+            request_page_no = self._find_page_no(response.request.post_data_json)
+        except Exception:
+            request_page_no = None
+        # 请求体中没有页码时无法在此过滤，交给_wait_for_page_data按pageInfo校验；
+        # 页码被_route_page_no改写过时请求对象中可能仍是原页码，同样交给pageInfo校验
+        return request_page_no is None or request_page_no == page_no or self._forced_page_no == page_no
+
+    async def _wait_for_page_data(self, timeout: float, page_no: Optional[int] = None) -> bool:
+        """
+        等待_handle_response解析出当前页数据
+
+        Args:
+            timeout: 最长等待时间（秒）
+            page_no: 期望的页码，收到其他页码的响应时继续等待
+
+        Returns:
+            bool: 是否在截止时间前获取到数据
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            if self.current_page_data is not None and self.page_info is not None:
+                current_page_no = self.page_info.get('pageNo')
+                if page_no is None or current_page_no is None or current_page_no == page_no:
+                    return True
+                self.logger.warning(f"⚠️ 收到第 {current_page_no} 页的响应，继续等待第 {page_no} 页")
+                self._reset_page_state()
+            elif self._last_response_error:
+                return False
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(self._response_event.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return False
+            self._response_event.clear()
+
+    async def _perform_and_wait_response(self, action, timeout: int, page_no: Optional[int] = None,
+                                         step: str = "", restore_on_timeout: bool = False,
+                                         phase: str = "response") -> bool:
+        """
+        执行页面操作并等待对应的/UIProcessor响应
+
+        Args:
+            action: 触发请求的异步操作，如按钮的click
+            timeout: 该步骤的截止时间（毫秒）
+            page_no: 期望的页码，None表示不按页码过滤
+            step: 步骤名称，用于日志
+            restore_on_timeout: 超时时是否恢复操作前的页面数据（操作可能不会触发请求）
+            phase: 计入运行报告的阶段名称
+
+        Returns:
+            bool: 是否在截止时间内收到并解析了响应
+        """
+        previous_state = (self.current_page_data, self.page_info)
+        self._reset_page_state()
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            async with self.page.expect_response(
+                lambda response: self._is_page_response(response, page_no),
+                timeout=timeout
+            ) as response_info:
+                await action()
+            await response_info.value
+            # expect_response在_handle_response解析完成前就会返回，继续等待解析结果
+            remaining = max(timeout / 1000 - (loop.time() - started), 1)
+            received = await self._wait_for_page_data(remaining, page_no)
+        except PlaywrightTimeoutError:
+            received = False
+        elapsed = loop.time() - started
+        self.timer.record(phase, elapsed)
+        # 操作可能不触发请求（restore_on_timeout）时，超时不计为上游失败
+        if received or not restore_on_timeout:
+            self.pacer.record(elapsed, received)
+
+        if received:
+            self.logger.info(f" {step}响应耗时 {loop.time() - started:.2f}s")
+            return True
+
+        self.logger.warning(f"⏰ {step}等待/UIProcessor响应超时 ({timeout}ms)")
+        if restore_on_timeout and self.current_page_data is None:
+            self.current_page_data, self.page_info = previous_state
+        return False
+
     def _setup_logging(self):
         """配置日志系统 - 使用loguru或标准logging"""
         if LOGGER_AVAILABLE:
@@ -383,22 +665,33 @@ class KSXCrawler:
                                 self.logger.info(f" 成功获取数据: {len(data)} 条记录")
                                 self.logger.info(f" 分页信息: {page_info}")
                                 
-                                # 存储数据
+                                # 存储数据：当前页完整数据 + 响应摘要
                                 self.current_page_data = data
                                 self.page_info = page_info
                                 self.api_responses.append({
                                     'url': response.url,
-                                    'data': data,
+                                    'records': len(data),
                                     'pageInfo': page_info,
                                     'timestamp': datetime.now()
                                 })
+                                
+                                # 可选：完整响应写入压缩归档
+                                if self.response_archive:
+                                    self.response_archive.write({
+                                        'url': response.url,
+                                        'timestamp': datetime.now().isoformat(),
+                                        'pageInfo': page_info,
+                                        'data': data
+                                    })
                             else:
                                 self.logger.warning(f"❌ UIProcessor请求失败: {response_data}")
+                                self._last_response_error = "UIProcessor请求失败"
                         else:
                             self.logger.warning(f"⚠️ 意外的响应格式: {response_data}")
                             
                     except Exception as e:
                         self.logger.error(f"❌ 解析UIProcessor响应失败: {e}")
+                        self._last_response_error = f"解析UIProcessor响应失败: {e}"
                         # 尝试获取文本内容
                         try:
                             text_content = await response.text()
@@ -407,12 +700,19 @@ class KSXCrawler:
                             pass
                 else:
                     self.logger.warning(f"⚠️ UIProcessor请求状态码: {response.status}")
+                    self._last_response_error = f"UIProcessor请求状态码: {response.status}"
+
+                # 通知等待中的步骤（成功或失败都唤醒，失败时可以立即重试）
+                self._response_event.set()
                     
         except Exception as e:
             self.logger.error(f"❌ 处理响应时出错: {e}")
     
     async def start_browser(self):
-        """启动浏览器"""
+        """启动浏览器（已启动且可用时直接返回）"""
+        if self.is_browser_alive():
+            return True
+        browser_started = time.perf_counter()
         try:
             logger.info(f" 调试：开始启动浏览器，无头模式: {self.headless}")
             
@@ -518,13 +818,17 @@ class KSXCrawler:
             
             # 创建上下文
             self.context = await self.browser.new_context(
-                viewport={'width': 1920, 'height': 1080},
+                viewport=self.viewport,
                 user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
             )
             
             if not self.context:
                 raise Exception("浏览器上下文创建失败")
             
+            # 挂载资源路由策略（拦截图片/字体/第三方请求，缓存静态资源）
+            self.routing_policy.reset_stats()
+            await self.routing_policy.attach(self.context)
+            
             # 创建页面
             self.page = await self.context.new_page()
             if not self.page:
@@ -536,6 +840,7 @@ class KSXCrawler:
             # 设置网络请求拦截
             await self._setup_request_interception()
             
+            self.timer.record('browser_start', time.perf_counter() - browser_started)
             logger.info("浏览器启动成功")
             return True
             
@@ -561,8 +866,11 @@ class KSXCrawler:
             self.logger.info("正在导航到登录页面...")
             self.logger.info(f"正在访问登录页面: {self.login_url}")
             
+            load_started = time.perf_counter()
             await self.page.goto(self.login_url)
             await self.page.wait_for_load_state('networkidle')
+            self.routing_policy.record_timing('login_page_load', time.perf_counter() - load_started)
+            self.timer.record('login_page_load', time.perf_counter() - load_started)
             
             self.logger.info("成功访问登录页面")
             return True
@@ -619,9 +927,16 @@ class KSXCrawler:
             await elements['login_button'].click()
             self.logger.info("点击登录按钮")
             
-            # 等待页面响应
+            # 等待页面响应，以查询表单的展开按钮出现作为页面加载完成的标志
             await self.page.wait_for_load_state('networkidle')
-            await asyncio.sleep(3)  # 额外等待确保页面完全加载
+            try:
+                await self.page.wait_for_selector(
+                    'button.lb-LBObjectParameterFormExpandButton-root',
+                    state='visible',
+                    timeout=self._wait_timeout('login_timeout', 20000)
+                )
+            except PlaywrightTimeoutError:
+                self.logger.warning("⏰ 登录后等待查询表单超时")
             
             return True
             
@@ -632,8 +947,7 @@ class KSXCrawler:
     async def verify_login_success(self) -> bool:
         """验证登录是否成功 - 简化版本，直接返回True"""
         try:
-            # 等待一下让页面加载
-            await asyncio.sleep(2)
+            # 页面加载已在perform_login中通过元素状态等待完成
             self.logger.info("跳过登录验证，假设登录成功")
             return True
         except Exception as e:
@@ -643,6 +957,10 @@ class KSXCrawler:
     async def login(self) -> bool:
         """完整的登录流程"""
         try:
+            if await self.is_session_valid():
+                self.logger.info("会话仍然有效，跳过登录")
+                return True
+            self.logged_in = False
             self.logger.info("开始登录流程...")
             
             # 检查浏览器是否已启动，如果没有则启动
@@ -661,11 +979,13 @@ class KSXCrawler:
             
             # 执行登录
             self.logger.info("正在执行登录操作...")
-            if not await self.perform_login(elements):
-                return False
+            with self.timer.span('login_submit'):
+                if not await self.perform_login(elements):
+                    return False
             
             # 验证登录结果
             login_success = await self.verify_login_success()
+            self.logged_in = login_success
             
             self.logger.info("登录流程完成")
             return login_success
@@ -689,19 +1009,26 @@ class KSXCrawler:
         try:
             self.logger.info("正在设置日期并执行搜索...")
             
-            # 点击展开按钮
-            self.logger.info("正在查找并点击展开按钮...")
-            expand_button = await self.page.wait_for_selector('button.lb-LBObjectParameterFormExpandButton-root', timeout=10000)
-            if not expand_button:
-                self.logger.error("未找到展开按钮")
-                return False
-            
-            await expand_button.click()
-            self.logger.info("点击展开按钮成功")
-            await asyncio.sleep(1)  # 等待展开动画完成
+            # 点击展开按钮（同一会话中连续搜索时表单已展开，再次点击会收起表单）
+            if await self.page.is_visible('input.lb-LBDatePicker-input[type="text"]'):
+                self.logger.info("查询表单已展开，无需点击展开按钮")
+            else:
+                self.logger.info("正在查找并点击展开按钮...")
+                expand_button = await self.page.wait_for_selector('button.lb-LBObjectParameterFormExpandButton-root', timeout=10000)
+                if not expand_button:
+                    self.logger.error("未找到展开按钮")
+                    return False
+                
+                await expand_button.click()
+                self.logger.info("点击展开按钮成功")
             
-            # 查找所有日期输入框
+            # 查找所有日期输入框（等待展开动画完成、输入框可见）
             self.logger.info("正在查找日期输入框...")
+            await self.page.wait_for_selector(
+                'input.lb-LBDatePicker-input[type="text"]',
+                state='visible',
+                timeout=self._wait_timeout('selector_timeout', 10000)
+            )
             date_inputs = await self.page.query_selector_all('input.lb-LBDatePicker-input[type="text"]')
             if not date_inputs or len(date_inputs) < 2:
                 self.logger.error(f"未找到足够的日期输入框，找到 {len(date_inputs) if date_inputs else 0} 个")
@@ -757,33 +1084,19 @@ class KSXCrawler:
                 self.logger.error("未找到搜索按钮")
                 return False
             
-            await search_button.click()
+            # 点击搜索按钮并等待搜索结果的/UIProcessor响应
             self.logger.info("点击搜索按钮")
-            
-            # 等待搜索结果，增加等待时间
-            try:
-                await self.page.wait_for_load_state('networkidle', timeout=20000)
-                self.logger.info(" 页面网络空闲状态达到")
-            except Exception as e:
-                self.logger.warning(f"等待网络空闲超时: {e}")
-            
-            await asyncio.sleep(3)  # 增加等待时间
+            await self._perform_and_wait_response(
+                search_button.click,
+                timeout=self._wait_timeout('search_response_timeout', 20000),
+                step="搜索",
+                phase="search_response"
+            )
             
             # 修改每页显示数量为最大值（可选）
             if change_page_size:
                 await self.change_page_size_to_max()
             
-            # 检查页面是否还在加载
-            try:
-                await self.page.wait_for_load_state('domcontentloaded', timeout=5000)
-                self.logger.info(" 页面DOM内容已加载")
-            except Exception as e:
-                self.logger.warning(f"等待DOM加载超时: {e}")
-            
-            # 等待API响应数据
-            self.logger.info("等待API响应数据...")
-            await asyncio.sleep(5)  # 给API响应更多时间
-            
             # 检查当前页面URL
             current_url = self.page.url
             self.logger.info(f" 当前页面URL: {current_url}")
@@ -805,45 +1118,47 @@ class KSXCrawler:
             self.logger.error(f"设置日期并搜索失败: {e}")
             return False
     
-    async def extract_data_from_api(self) -> dict:
-        """从拦截的API响应中提取数据"""
+    async def extract_data_from_api(self, page_no: int = None) -> dict:
+        """
+        从拦截的API响应中提取数据
+        
+        Args:
+            page_no: 期望的页码，为None时接受任意页码的响应
+        """
         try:
             self.logger.info("正在等待API响应数据...")
             
-            # 等待API响应数据，增加等待时间
-            max_wait_time = 15  # 增加等待时间到15秒
-            wait_interval = 0.5  # 每0.5秒检查一次
-            waited_time = 0
-            
-            while waited_time < max_wait_time:
-                # 添加调试信息
-                if waited_time % 3 == 0:  # 每3秒打印一次状态
-                    self.logger.info(f" 等待API数据中... ({waited_time:.1f}s/{max_wait_time}s)")
-                    self.logger.info(f" 当前状态: current_page_data={self.current_page_data is not None}, page_info={self.page_info is not None}")
+            # 等待_handle_response的事件通知，而不是定时轮询
+            max_wait_time = self._wait_timeout('response_timeout', 15000) / 1000
+            if await self._wait_for_page_data(max_wait_time, page_no):
+                self.logger.info(f" 获取到API数据: {len(self.current_page_data)} 条记录")
+                self.logger.info(f" 分页信息: {self.page_info}")
                 
-                if self.current_page_data is not None and self.page_info is not None:
-                    self.logger.info(f" 获取到API数据: {len(self.current_page_data)} 条记录")
-                    self.logger.info(f" 分页信息: {self.page_info}")
-                    
-                    # 检查total是否为0，如果是则表示当前日期没有数据
-                    if self.page_info.get('total', 0) == 0:
-                        self.logger.info(" API返回total=0，当前日期没有业务数据")
-                        return {
-                            'data': [],
-                            'pageInfo': self.page_info,
-                            'success': True,
-                            'no_data': True,  # 标记为没有数据，而不是失败
-                            'message': '当前日期没有业务数据'
-                        }
-                    
+                # 检查total是否为0，如果是则表示当前日期没有数据
+                if self.page_info.get('total', 0) == 0:
+                    self.logger.info(" API返回total=0，当前日期没有业务数据")
                     return {
-                        'data': self.current_page_data,
+                        'data': [],
                         'pageInfo': self.page_info,
-                        'success': True
+                        'success': True,
+                        'no_data': True,  # 标记为没有数据，而不是失败
+                        'message': '当前日期没有业务数据'
                     }
                 
-                await asyncio.sleep(wait_interval)
-                waited_time += wait_interval
+                return {
+                    'data': self.current_page_data,
+                    'pageInfo': self.page_info,
+                    'success': True
+                }
+            
+            if self._last_response_error:
+                self.logger.warning(f"❌ API响应错误: {self._last_response_error}")
+                return {
+                    'data': [],
+                    'pageInfo': {},
+                    'success': False,
+                    'error': self._last_response_error
+                }
             
             # 如果超时，检查是否有部分数据
             if self.current_page_data is not None:
@@ -871,40 +1186,63 @@ class KSXCrawler:
                 'error': str(e)
             }
     
-    async def extract_all_pages_data_from_api(self, max_pages: int = 20, batch_save: bool = False, batch_size: int = 200) -> list:
+    async def extract_all_pages_data_from_api(self, max_pages: int = 20, batch_save: bool = False, batch_size: int = 200,
+                                              start_page: int = 1, on_checkpoint=None) -> list:
         """使用API数据提取所有页面数据
         
         Args:
             max_pages: 最大页数限制，默认20页，日期范围爬取时可以设置更大的值
-            batch_save: 是否启用分批保存，默认False
+            batch_save: 是否启用分批保存，默认False。启用时每页数据放入入库流水线，
+                由后台任务去重并批量写入，翻页与写库同时进行，返回值为空列表，
+                保存结果见 self.last_ingest_stats
             batch_size: 分批保存的大小，默认200条
+            start_page: 从第几页开始处理数据（断点续爬）。处理完第1页（获取总页数）后，
+                下一次翻页请求的pageNo被改写为start_page，直接跳到该页，之后每次翻页都按页码改写，
+                不再逐页点击之前已入库的页
+            on_checkpoint: 分批保存时的检查点回调，见 IngestPipeline 的 on_flush 参数
+        
+        是否正常翻到最后一页记录在 self.last_extraction_complete 中
         """
+        pipeline = None
+        jump_pages = False
+        self.last_ingest_stats = None
+        self.last_extraction_complete = False
+        self.last_total_pages = 0
         try:
             self.logger.info(" 开始基于API的数据提取...")
             # print(" 开始基于API的数据提取...")
             all_data = []
             current_page = 1
-            total_saved = 0  # 记录已保存的总数
             total_pages = 0
             total_records = 0
             seen_ids = set()  # 用于检查重复数据
             
+            if batch_save:
+                pipeline = IngestPipeline(self._save_records_by_date, batch_size=batch_size,
+                                          on_flush=on_checkpoint, timer=self.timer, log=self.logger)
+                pipeline.start()
+            
+            # 断点续爬：拦截/UIProcessor请求改写页码（回放模式下按抓包顺序逐页注入，不能跳页）
+            jump_pages = start_page > 2 and self._replay_responses is None and self.page is not None
+            if jump_pages:
+                await self.page.route("**/UIProcessor*", self._route_page_no)
+            
             while True:
                 self.logger.info(f" 正在处理第 {current_page} 页...")
+                page_started = time.perf_counter()
                 
                 # 如果不是第一页，需要点击下一页
                 if current_page > 1:
-                    # 清空之前的数据（只在翻页时清空）
-                    self.current_page_data = None
-                    self.page_info = None
-                    
-                    click_result = await self.click_next_page_api()
+                    if jump_pages:
+                        self._forced_page_no = current_page
+                    click_result = await self.click_next_page_api(expected_page=current_page)
                     if not click_result:
                         self.logger.info(" 已到达最后一页，停止数据提取")
+                        self.last_extraction_complete = True
                         break
                     
                     # 等待并获取API数据，增加重试机制
-                    api_result = await self.extract_data_from_api_with_retry()
+                    api_result = await self.extract_data_from_api_with_retry(page_no=current_page)
                 else:
                     # 第一页使用已有的数据
                     if self.current_page_data is not None and self.page_info is not None:
@@ -930,10 +1268,15 @@ class KSXCrawler:
                     total_records = page_info.get('total', 0)
                     page_size = page_info.get('pageSize', 50)
                     total_pages = (total_records + page_size - 1) // page_size
+                    self.last_total_pages = total_pages
                     self.logger.info(f" 数据统计: 总计 {total_records} 条记录，每页 {page_size} 条，共 {total_pages} 页")
                 
                 # 检查数据是否重复
-                if page_data:
+                if current_page < start_page:
+                    # 断点续爬：该页数据已在上次运行中入库
+                    self.current_page_data = None
+                    self.logger.info(f" 第 {current_page} 页已在上次运行中入库，跳过")
+                elif page_data:
                     new_count = 0
                     for item in page_data:
                         item_id = item.get('ID')
@@ -945,38 +1288,37 @@ class KSXCrawler:
                         self.logger.warning(f"⚠️ 第 {current_page} 页: 所有数据都是重复的，停止提取")
                         break
                     
-                    all_data.extend(page_data)
-                    self.logger.info(f" 第 {current_page} 页: 新增 {len(page_data)} 条记录（其中 {new_count} 条新数据），累计 {len(all_data)} 条")
-                    
-                    # 分批保存逻辑
-                    if batch_save and len(all_data) >= batch_size:
-                        self.logger.info(f" 达到分批保存阈值 ({batch_size} 条)，开始保存数据...")
-                        try:
-                            # 保存当前批次的数据
-                            batch_result = await self.save_to_database_by_date(all_data)
-                            saved_count = batch_result.get("total_records", 0)
-                            total_saved += saved_count
-                            self.logger.info(f" 分批保存完成: 保存了 {saved_count} 条记录，累计保存 {total_saved} 条")
-                            
-                            # 清空已保存的数据，继续下一批
-                            all_data = []
-                        except Exception as e:
-                            self.logger.error(f" 分批保存失败: {e}")
-                            # 保存失败时不中断，继续爬取
+                    if pipeline:
+                        # 放入入库队列，队列满时在此等待写入任务（背压）
+                        with self.timer.span('queue_wait'):
+                            await pipeline.put_page(page_data, page_no=current_page)
+                        page_count = len(page_data)
+                        # 数据已交给入库流水线，释放对当前页数据的引用
+                        self.current_page_data = None
+                        api_result = page_data = None
+                        self.logger.info(f" 第 {current_page} 页: 新增 {page_count} 条记录（其中 {new_count} 条新数据），已提交入库")
+                    else:
+                        all_data.extend(page_data)
+                        self.logger.info(f" 第 {current_page} 页: 新增 {len(page_data)} 条记录（其中 {new_count} 条新数据），累计 {len(all_data)} 条")
                 else:
                     self.logger.warning(f"⚠️ 第 {current_page} 页: 没有数据")
+                    self.last_extraction_complete = True
                     break
                 
+                emit('page_done', page=current_page, total_pages=total_pages, records=len(seen_ids))
+                
                 # 检查是否还有更多页
                 has_more = page_info.get('hasMore', False)
                 if not has_more:
                     self.logger.info(" 根据API返回的hasMore=false，已到达最后一页")
+                    self.last_extraction_complete = True
                     break
                 
                 # 检查当前页号是否超过总页数
                 current_page_no = page_info.get('pageNo', current_page)
                 if current_page_no >= total_pages:
                     self.logger.info(f" 当前页号 {current_page_no} 已达到总页数 {total_pages}，停止提取")
+                    self.last_extraction_complete = True
                     break
                 
                 # 安全检查：避免无限循环
@@ -984,32 +1326,51 @@ class KSXCrawler:
                     self.logger.info(f" 达到最大页数限制 ({current_page})，停止提取")
                     break
                 
-                current_page += 1
+                self.timer.record('page', time.perf_counter() - page_started)
+                if jump_pages and current_page < start_page:
+                    self.logger.info(f" 第 2~{start_page - 1} 页已在上次运行中入库，直接跳到第 {start_page} 页")
+                    current_page = start_page
+                else:
+                    current_page += 1
                 
-                # 页面间等待，增加等待时间
-                await asyncio.sleep(3)
-            
-            # 保存剩余的数据（如果有的话）
-            if batch_save and all_data:
-                self.logger.info(f" 保存剩余数据 ({len(all_data)} 条)...")
-                try:
-                    batch_result = await self.save_to_database_by_date(all_data)
-                    saved_count = batch_result.get("total_records", 0)
-                    total_saved += saved_count
-                    self.logger.info(f" 剩余数据保存完成: 保存了 {saved_count} 条记录")
-                except Exception as e:
-                    self.logger.error(f" 剩余数据保存失败: {e}")
-            
-            if batch_save:
-                self.logger.info(f" 数据提取完成！总计获取 {len(seen_ids)} 条唯一记录，累计保存 {total_saved} 条记录")
+                # 翻页间隔由节奏控制器按上游响应情况调整，上游正常时收到响应后立即翻页
+                await self.pacer.pace()
+            
+            if pipeline:
+                # 等待队列中剩余的数据全部写入
+                self.logger.info(" 等待入库队列写入剩余数据...")
+                self.last_ingest_stats = await pipeline.close()
+                pipeline = None
+                stats = self.last_ingest_stats
+                self.logger.info(f" 数据提取完成！总计获取 {len(seen_ids)} 条唯一记录，累计保存 {stats['saved']} 条记录")
+                if stats['failed_records']:
+                    self.logger.error(f"❌ {stats['failed_records']} 条记录写入失败")
             else:
                 self.logger.info(f" 数据提取完成！总计获取 {len(all_data)} 条记录，唯一记录 {len(seen_ids)} 条")
             
             return all_data
             
+        except UpstreamUnavailableError as e:
+            # 已入库的数据保留，检查点之后的页可用--resume继续
+            self.logger.error(f"❌ {e}")
+            emit('error', error_type='UPSTREAM_UNAVAILABLE', message=str(e))
+            return all_data
         except Exception as e:
             self.logger.error(f"❌ API数据提取过程出错: {e}")
             return []
+        finally:
+            if jump_pages:
+                self._forced_page_no = None
+                try:
+                    await self.page.unroute("**/UIProcessor*", self._route_page_no)
+                except Exception as e:
+                    self.logger.warning(f"⚠️ 取消翻页请求改写失败: {e}")
+            # 异常退出时也要把已提交的数据写完
+            if pipeline:
+                try:
+                    self.last_ingest_stats = await pipeline.close()
+                except Exception as e:
+                    self.logger.error(f"❌ 入库队列收尾失败: {e}")
     
     async def change_page_size_to_max(self) -> bool:
         """修改每页显示数量为最大值"""
@@ -1025,7 +1386,9 @@ class KSXCrawler:
             # 点击页码选择器
             await page_size_changer.click()
             self.logger.info("点击页码选择器")
-            await asyncio.sleep(1.5)  # 等待下拉菜单显示（增加等待时间）
+            
+            # 等待下拉菜单选项可见
+            await self.page.wait_for_selector('.lb-LBPopper-sizer ul li', state='visible', timeout=5000)
             
             # 查找下拉菜单容器
             popper_sizer = await self.page.wait_for_selector('.lb-LBPopper-sizer', timeout=5000)
@@ -1045,19 +1408,17 @@ class KSXCrawler:
                 self.logger.warning("未找到下拉菜单中的li元素")
                 return False
             
-            # 点击最后一个li元素（通常是最大值）
+            # 点击最后一个li元素（通常是最大值），并等待新页面大小的/UIProcessor响应
+            # 已经是最大值时可能不会发出请求，此时保留原有的第一页数据
             last_li = li_elements[-1]
-            await last_li.click()
             self.logger.info("点击最后一个选项，修改每页显示数量")
-            
-            # 等待页面更新（增加等待时间）
-            await asyncio.sleep(3)
-            
-            # 等待网络请求完成
-            try:
-                await self.page.wait_for_load_state('networkidle', timeout=15000)
-            except Exception as e:
-                self.logger.warning(f"等待网络空闲超时: {e}")
+            await self._perform_and_wait_response(
+                last_li.click,
+                timeout=self._wait_timeout('page_size_response_timeout', 15000),
+                step="修改每页显示数量",
+                restore_on_timeout=True,
+                phase="page_size_response"
+            )
             
             self.logger.info("✅ 每页显示数量修改成功")
             return True
@@ -1066,8 +1427,17 @@ class KSXCrawler:
             self.logger.error(f"❌ 修改每页显示数量失败: {e}")
             return False
 
-    async def click_next_page_api(self) -> bool:
-        """点击下一页（用于API数据提取）"""
+    async def click_next_page_api(self, expected_page: int = None) -> bool:
+        """
+        点击下一页（用于API数据提取）
+        
+        Args:
+            expected_page: 下一页的页码，用于过滤/UIProcessor响应
+        """
+        if self._replay_responses is not None:
+            # 回放模式：下一页即抓包中的下一个响应，抓包结束视为最后一页
+            return await self._replay_next_response()
+        
         try:
             self.logger.info(" 正在点击下一页...")
             
@@ -1103,44 +1473,37 @@ class KSXCrawler:
                 self.logger.warning("❌ 下一页按钮不可见")
                 return False
             
-            # 点击下一页
-            await next_button.click()
+            # 点击下一页并等待该页的/UIProcessor响应
+            # 超时时不视为失败，由extract_data_from_api_with_retry继续等待或重试
+            await self._perform_and_wait_response(
+                next_button.click,
+                timeout=self._wait_timeout('next_page_response_timeout', 15000),
+                page_no=expected_page,
+                step=f"第 {expected_page} 页" if expected_page else "下一页",
+                phase="next_page_response"
+            )
             self.logger.info(" 成功点击下一页")
             
-            # 等待页面更新，增加等待时间
-            await asyncio.sleep(3)
-            
-            # 等待网络请求完成
-            try:
-                await self.page.wait_for_load_state('networkidle', timeout=10000)
-            except Exception as e:
-                self.logger.warning(f"等待网络空闲超时: {e}")
-            
-            self.logger.info(" 页面更新完成，准备获取下一页数据")
-            
             return True
             
         except Exception as e:
             self.logger.error(f"❌ 点击下一页失败: {e}")
             return False
     
-    async def extract_data_from_api_with_retry(self, max_retries: int = 3) -> dict:
-        """带重试机制的API数据提取"""
+    async def extract_data_from_api_with_retry(self, max_retries: int = 3, page_no: int = None) -> dict:
+        """
+        带重试机制的API数据提取
+        
+        Args:
+            max_retries: 最大尝试次数
+            page_no: 期望的页码，为None时接受任意页码的响应
+        """
         for attempt in range(max_retries):
             try:
                 self.logger.info(f" 尝试获取API数据 (第 {attempt + 1}/{max_retries} 次)")
                 
-                # 增加等待时间，让页面完全加载
-                await asyncio.sleep(2)
-                
-                # 等待网络请求完成
-                try:
-                    await self.page.wait_for_load_state('networkidle', timeout=15000)
-                except Exception as e:
-                    self.logger.warning(f"等待网络空闲超时: {e}")
-                
-                # 尝试获取API数据
-                result = await self.extract_data_from_api()
+                # 尝试获取API数据（已有数据时立即返回，否则等待响应事件）
+                result = await self.extract_data_from_api(page_no=page_no)
                 
                 if result['success']:
                     # 检查是否是明确的"没有数据"情况
@@ -1152,31 +1515,45 @@ class KSXCrawler:
                         return result
                     else:
                         self.logger.warning(f"⚠️ 第 {attempt + 1} 次尝试: 成功但无数据")
+                        if self._replay_responses is not None:
+                            # 回放模式：重试即注入抓包中的下一个响应
+                            if attempt < max_retries - 1 and await self._replay_next_response():
+                                continue
+                            break
                         if attempt < max_retries - 1:
-                            wait_time = (attempt + 1) * 3
-                            self.logger.info(f" 等待 {wait_time} 秒后重试...")
-                            await asyncio.sleep(wait_time)
+                            await self.pacer.backoff(attempt)
                         else:
                             break
                 else:
                     self.logger.warning(f"⚠️ 第 {attempt + 1} 次尝试失败: {result.get('error', '获取失败')}")
                     
+                    if self._replay_responses is not None:
+                        if attempt < max_retries - 1 and await self._replay_next_response():
+                            continue
+                        break
+                    
                     if attempt < max_retries - 1:
-                        wait_time = (attempt + 1) * 3  # 递增等待时间
-                        self.logger.info(f" 等待 {wait_time} 秒后重试...")
-                        await asyncio.sleep(wait_time)
+                        # 指数退避（带随机抖动），上游熔断时等待冷却
+                        await self.pacer.backoff(attempt)
                         
-                        # 尝试刷新页面
+                        # 尝试刷新页面，并等待刷新后的/UIProcessor响应
                         try:
-                            await self.page.reload()
-                            await asyncio.sleep(3)
+                            await self._perform_and_wait_response(
+                                self.page.reload,
+                                timeout=self._wait_timeout('reload_response_timeout', 20000),
+                                step="刷新页面",
+                                phase="reload_response"
+                            )
                         except Exception as e:
                             self.logger.warning(f"页面刷新失败: {e}")
+                            self._last_response_error = None
                     
+            except UpstreamUnavailableError:
+                raise
             except Exception as e:
                 self.logger.error(f"❌ 第 {attempt + 1} 次尝试异常: {e}")
                 if attempt < max_retries - 1:
-                    await asyncio.sleep(5)
+                    await self.pacer.backoff(attempt)
         
         self.logger.error(f"❌ 经过 {max_retries} 次尝试，API数据获取失败")
         return {'success': False, 'error': f'经过 {max_retries} 次尝试后仍然失败'}
@@ -1295,8 +1672,8 @@ class KSXCrawler:
                 self.logger.warning("⚠️ 当前日期没有业务数据")
                 return {"success": True, "action": "no_data", "message": "当前日期没有业务数据，请核查日期"}
             
-            # 获取网站上的总数据量
-            website_total = first_page_result.get('total', 0)
+            # 获取网站上的总数据量（总数在pageInfo中）
+            website_total = (first_page_result.get('pageInfo') or {}).get('total', len(first_page_result['data']))
             self.logger.info(f" 网站显示总数据量: {website_total} 条")
             
             # 对比数据量
@@ -1343,15 +1720,182 @@ class KSXCrawler:
             self.logger.error(f"❌ 智能数据提取异常: {e}")
             return {"success": False, "action": "error", "message": f"智能数据提取异常: {str(e)}"}
 
-    async def full_api_data_extraction_range(self, start_date: str, end_date: str = None) -> dict:
-        """完整的API数据提取流程（支持日期范围）"""
-        try:
-            self.logger.info(f" 开始日期范围API数据提取流程，从 {start_date} 到 {end_date or start_date}...")
+    @staticmethod
+    def _date_list(start_date: str, end_date: str = None) -> List[str]:
+        """返回日期范围内的所有日期（YYYY-MM-DD）"""
+        start = datetime.strptime(start_date, '%Y-%m-%d')
+        end = datetime.strptime(end_date or start_date, '%Y-%m-%d')
+        dates = []
+        while start <= end:
+            dates.append(start.strftime('%Y-%m-%d'))
+            start += timedelta(days=1)
+        return dates
+
+    @staticmethod
+    def _merge_date_stats(base: Dict[str, Any], by_date: Dict[str, Any]) -> Dict[str, Any]:
+        """合并上次运行和本次运行按日期统计的记录数"""
+        merged = {date_str: dict(entry) for date_str, entry in (base or {}).items()}
+        for date_str, entry in (by_date or {}).items():
+            target = merged.setdefault(date_str, {'records': 0, 'saved': 0})
+            target['records'] = target.get('records', 0) + entry.get('records', 0)
+            target['saved'] = target.get('saved', 0) + entry.get('saved', 0)
+        return merged
+
+    @staticmethod
+    def get_pending_dates(start_date: str, end_date: str = None) -> List[str]:
+        """
+        返回日期范围内尚未完整爬取的日期
+        
+        已完成且经过校验的日期会被跳过：crawl_state中标记为完成，
+        且本地数据库记录数不少于当时入库的记录数（以及上游总数，如果已知）
+        """
+        dates = KSXCrawler._date_list(start_date, end_date)
+        completed = config_db_manager.get_completed_crawl_dates(dates[0], dates[-1])
+        db_manager = get_db_manager()
+        pending = []
+        for date_str in dates:
+            entry = completed.get(date_str)
+            if entry:
+                expected = max(entry.get('records', 0), entry.get('upstream_total') or 0)
+                local_count = db_manager.count_records(datetime.strptime(date_str, '%Y-%m-%d'))
+                if local_count >= expected:
+                    continue
+                logger.info(f" {date_str} 已标记完成，但本地记录数 {local_count} 少于 {expected}，需要重新爬取")
+            pending.append(date_str)
+        return pending
+
+    async def probe_date_total(self, date_str: str) -> Optional[int]:
+        """
+        探测指定日期在网站上的总记录数（只搜索并读取第一页的pageInfo.total）
+        
+        Args:
+            date_str: 日期 (YYYY-MM-DD)
             
-            # 执行搜索（传入日期范围）
-            search_result = await self.set_date_and_search(start_date, end_date)
+        Returns:
+            Optional[int]: 总记录数，探测失败时返回None
+        """
+        if not await self.set_date_and_search(date_str, change_page_size=False):
+            return None
+        
+        result = await self.extract_data_from_api_with_retry()
+        if not result['success']:
+            return None
+        if result.get('no_data', False):
+            return 0
+        page_info = result.get('pageInfo') or {}
+        return page_info.get('total', len(result.get('data') or []))
+
+    async def plan_crawl(self, start_date: str, end_date: str = None) -> Dict[str, Any]:
+        """
+        生成爬取计划：逐日探测网站总数并与本地记录数对比，只有缺失或有变化的日期需要爬取
+        
+        与网站一致的日期在crawl_state中标记为完成（附带上游总数），
+        随后以resume方式执行时会被跳过
+        
+        Args:
+            start_date: 开始日期 (YYYY-MM-DD)
+            end_date: 结束日期 (YYYY-MM-DD)
+            
+        Returns:
+            Dict[str, Any]: 爬取计划，work_list为需要爬取的日期
+        """
+        dates = self._date_list(start_date, end_date)
+        db_manager = get_db_manager()
+        entries = []
+        completed = {}
+        
+        self.logger.info(f" 开始生成爬取计划，共 {len(dates)} 个日期")
+        for date_str in dates:
+            local_count = db_manager.count_records(datetime.strptime(date_str, '%Y-%m-%d'))
+            upstream_total = await self.probe_date_total(date_str)
+            
+            if upstream_total is None:
+                action, reason = 'crawl', 'probe_failed'
+            elif local_count < upstream_total:
+                action, reason = 'crawl', 'missing'
+            elif local_count > upstream_total:
+                # 网站数据有删减或调整，本地多出的记录需要人工核查
+                action, reason = 'crawl', 'changed'
+            else:
+                action, reason = 'skip', 'no_data' if upstream_total == 0 else 'up_to_date'
+                completed[date_str] = {'records': local_count, 'saved': 0,
+                                       'upstream_total': upstream_total, 'complete': True}
+            
+            entries.append({
+                'date': date_str,
+                'upstream_total': upstream_total,
+                'local_count': local_count,
+                'action': action,
+                'reason': reason
+            })
+            self.logger.info(f" {date_str}: 网站 {upstream_total if upstream_total is not None else '未知'} 条，"
+                             f"本地 {local_count} 条 -> {action} ({reason})")
+        
+        if completed:
+            run_id = config_db_manager.create_crawl_run('plan', dates[0], dates[-1])
+            if run_id:
+                config_db_manager.update_crawl_checkpoint(run_id, records_by_date=completed, status='completed')
+        
+        work_list = [entry['date'] for entry in entries if entry['action'] == 'crawl']
+        upstream_total = sum(entry['upstream_total'] or 0 for entry in entries)
+        local_total = sum(entry['local_count'] for entry in entries)
+        missing_records = sum(max((entry['upstream_total'] or 0) - entry['local_count'], 0) for entry in entries)
+        self.logger.info(f" 爬取计划: {len(work_list)}/{len(dates)} 个日期需要爬取，预计缺失 {missing_records} 条记录")
+        
+        return {
+            "success": True,
+            "message": f"{len(work_list)}/{len(dates)} 个日期需要爬取",
+            "start_date": dates[0],
+            "end_date": dates[-1],
+            "dates": entries,
+            "work_list": work_list,
+            "upstream_total": upstream_total,
+            "local_total": local_total,
+            "missing_records": missing_records
+        }
+
+    async def full_api_data_extraction_range(self, start_date: str, end_date: str = None, resume: bool = False) -> dict:
+        """
+        完整的API数据提取流程（支持日期范围）
+        
+        每批数据入库后在config.db的crawl_state表中记录检查点。resume为True时，
+        跳过已完成且校验通过的日期，并从上次中断的运行的下一页继续
+        （同一查询条件下上游分页顺序不变）
+        """
+        end_date = end_date or start_date
+        run_id = None
+        try:
+            start_page = 1
+            base_stats = {}
+            if resume:
+                pending_dates = self.get_pending_dates(start_date, end_date)
+                if not pending_dates:
+                    self.logger.info(f"✅ {start_date} 到 {end_date} 的数据均已完整入库，无需重新爬取")
+                    return {"success": True, "message": "日期范围内的数据均已完整，无需重新爬取", "total": 0, "skipped": True}
+                if (pending_dates[0], pending_dates[-1]) != (start_date, end_date):
+                    self.logger.info(f" 跳过已完成的日期，爬取范围缩小为 {pending_dates[0]} 到 {pending_dates[-1]}")
+                    start_date, end_date = pending_dates[0], pending_dates[-1]
+                
+                previous_run = config_db_manager.get_resumable_crawl_run('range', start_date, end_date)
+                if previous_run:
+                    run_id = previous_run['run_id']
+                    start_page = previous_run['last_page'] + 1
+                    base_stats = previous_run['records_by_date']
+                    self.logger.info(f" 继续上次的运行 {run_id}，从第 {start_page} 页开始")
+                    config_db_manager.update_crawl_checkpoint(run_id, status='running', message='')
+            
+            if run_id is None:
+                run_id = config_db_manager.create_crawl_run('range', start_date, end_date)
+            
+            self.logger.info(f" 开始日期范围API数据提取流程，从 {start_date} 到 {end_date}...")
+            
+            # 执行搜索（传入日期范围），页面大小在下面单独带重试地设置
+            with self.timer.span('search'):
+                search_result = await self.set_date_and_search(start_date, end_date, change_page_size=False)
             if not search_result:
                 self.logger.error("❌ 搜索失败")
+                if run_id:
+                    config_db_manager.update_crawl_checkpoint(run_id, status='failed', message='搜索失败')
                 return {"success": False, "message": "搜索失败"}
             
             # 重试页面大小设置，确保获取最大数据量
@@ -1363,57 +1907,167 @@ class KSXCrawler:
                     break
                 else:
                     self.logger.warning(f" 第{attempt + 1}次页面大小设置失败，等待后重试...")
-                    await asyncio.sleep(2)
+                    await self.pacer.backoff(attempt)
             
             if not page_size_success:
+                if start_page > 1:
+                    # 页面大小不同时页码对应的数据也不同，不能按检查点续爬
+                    self.logger.warning("⚠️ 页面大小设置失败，无法按检查点续爬，从第一页重新开始")
+                    start_page = 1
+                    base_stats = {}
                 self.logger.warning("⚠️ 页面大小设置失败，将使用默认页面大小继续")
             else:
                 self.logger.info("✅ 页面大小设置成功")
             
-            # 立即尝试获取第一页数据
-            self.logger.info(" 尝试获取第一页数据...")
+            def save_checkpoint(last_page: int, stats: Dict[str, Any]):
+                if run_id:
+                    config_db_manager.update_crawl_checkpoint(
+                        run_id,
+                        last_page=last_page,
+                        total_pages=self.last_total_pages,
+                        records_by_date=self._merge_date_stats(base_stats, stats['by_date'])
+                    )
             
-            # 等待数据加载
-            await asyncio.sleep(3)
+            # 第一页数据由响应事件通知，无需额外等待
+            self.logger.info(" 尝试获取第一页数据...")
             
             # 获取所有页面数据（日期范围爬取时使用更大的页数限制和分批保存）
-            initial_data = await self.extract_all_pages_data_from_api(max_pages=1000, batch_save=True, batch_size=200)
+            with self.timer.span('extraction'):
+                await self.extract_all_pages_data_from_api(max_pages=1000, batch_save=True, batch_size=200,
+                                                           start_page=start_page, on_checkpoint=save_checkpoint)
+            stats = self.last_ingest_stats
+            complete = self.last_extraction_complete and stats is not None and not stats['failed_records']
+            
+            if run_id:
+                if complete:
+                    # 范围内没有数据的日期也标记为完成
+                    records_by_date = self._merge_date_stats(base_stats, stats['by_date'])
+                    for date_str in self._date_list(start_date, end_date):
+                        date_stats = records_by_date.setdefault(date_str, {'records': 0, 'saved': 0})
+                        date_stats['complete'] = True
+                        emit('date_done', date=date_str, records=date_stats['records'], saved=date_stats['saved'])
+                    config_db_manager.update_crawl_checkpoint(run_id, records_by_date=records_by_date,
+                                                              status='completed', message='')
+                else:
+                    config_db_manager.update_crawl_checkpoint(run_id, status='failed', message='数据提取未完成')
             
-            if not initial_data or len(initial_data) == 0:
+            if not stats or (stats['records'] == 0 and start_page == 1):
+                if not self.last_extraction_complete:
+                    return {"success": False, "message": "数据提取中断，可使用--resume继续", "total": 0, "run_id": run_id}
                 self.logger.warning("⚠️ 未获取到任何数据")
-                return {"success": True, "message": "当前日期范围没有业务数据，请核查日期", "total": 0}
-            
-            # 数据已经在分批保存过程中保存了，initial_data 只包含最后一批未保存的数据
-            if initial_data:
-                self.logger.info(f" 处理最后一批数据 ({len(initial_data)} 条)...")
-                # 保存最后一批数据
-                final_batch_result = await self.save_to_database_by_date(initial_data)
-                self.logger.info(f" 最后一批数据保存结果: {final_batch_result}")
-            else:
-                self.logger.info(" 所有数据已在分批保存过程中完成")
+                return {"success": True, "message": "当前日期范围没有业务数据，请核查日期", "total": 0, "run_id": run_id}
             
             # 批量查询时，跳过门店同步以提高效率
             self.logger.info(" 批量查询模式：跳过门店同步步骤")
             
-            # 清理旧数据库
-            from services.database_manager import DatabaseManager
-            db_manager = DatabaseManager()
-            # db_manager.cleanup_old_databases()
+            files_created = len([d for d in stats['by_date'].values() if d.get('saved', 0) > 0])
+            if stats['failed_records']:
+                return {
+                    "success": False,
+                    "message": f"数据提取完成，但有 {stats['failed_records']} 条记录写入失败",
+                    "total": stats['saved'],
+                    "files_created": files_created,
+                    "details": stats,
+                    "run_id": run_id
+                }
+            
+            if not self.last_extraction_complete:
+                return {
+                    "success": False,
+                    "message": f"数据提取中断，已新增 {stats['saved']} 条记录，可使用--resume继续",
+                    "total": stats['saved'],
+                    "files_created": files_created,
+                    "details": stats,
+                    "run_id": run_id
+                }
             
             return {
                 "success": True,
-                "message": f"API数据提取完成！数据已通过分批保存方式存储到数据库，避免了中途退出的数据丢失风险",
-                "total": 0,  # 分批保存时无法准确统计总数，但数据已保存
-                "files_created": 0,  # 分批保存时无法准确统计文件数
-                "details": {"batch_save": True, "batch_size": 200}
+                "message": f"API数据提取完成！新增 {stats['saved']} 条记录",
+                "total": stats['saved'],
+                "files_created": files_created,
+                "details": stats,
+                "run_id": run_id
             }
             
         except Exception as e:
             self.logger.error(f"❌ 日期范围API数据提取异常: {e}")
+            if run_id:
+                config_db_manager.update_crawl_checkpoint(run_id, status='failed', message=str(e))
             return {"success": False, "message": f"日期范围API数据提取异常: {str(e)}"}
 
+    async def _replay_next_response(self) -> bool:
+        """回放模式：将抓包中的下一个响应注入_handle_response，抓包结束时返回False"""
+        response = next(self._replay_responses, None)
+        if response is None:
+            return False
+        self._reset_page_state()
+        await self._handle_response(response)
+        return True
+
+    async def replay_capture(self, capture_path: str, batch_size: int = 200) -> dict:
+        """
+        回放模式：读取HAR或NDJSON抓包，把/UIProcessor响应依次注入_handle_response，
+        不启动浏览器即可运行翻页、去重和入库流程（用于压测和问题复现）
+        
+        Args:
+            capture_path: 抓包文件路径（.har / .ndjson，可以是.gz压缩文件或响应归档）
+            batch_size: 分批保存的大小
+            
+        Returns:
+            dict: 与full_api_data_extraction_range相同格式的结果，details中包含耗时
+        """
+        responses = load_capture(capture_path)
+        if not responses:
+            return {"success": False, "message": f"抓包中没有/UIProcessor响应: {capture_path}", "total": 0}
+        
+        sequences = split_sequences(responses)
+        self.logger.info(f" 回放抓包 {capture_path}: {len(responses)} 个响应，{len(sequences)} 次查询")
+        
+        # 回放时响应已在本地，不需要等待；抓包本身不再写入归档
+        saved_wait_config = self.wait_config
+        saved_archive = self.response_archive
+        self.wait_config = dict(self.wait_config, response_timeout=100)
+        self.response_archive = None
+        
+        totals = {'pages': 0, 'records': 0, 'duplicates': 0, 'saved': 0, 'failed_records': 0, 'by_date': {}}
+        started = time.perf_counter()
+        try:
+            for sequence in sequences:
+                self._replay_responses = iter(sequence)
+                await self._replay_next_response()
+                await self.extract_all_pages_data_from_api(max_pages=len(sequence) + 1, batch_save=True,
+                                                           batch_size=batch_size)
+                stats = self.last_ingest_stats or {}
+                for key in ('pages', 'records', 'duplicates', 'saved', 'failed_records'):
+                    totals[key] += stats.get(key, 0)
+                totals['by_date'] = self._merge_date_stats(totals['by_date'], stats.get('by_date'))
+        finally:
+            self._replay_responses = None
+            self.wait_config = saved_wait_config
+            self.response_archive = saved_archive
+        
+        seconds = time.perf_counter() - started
+        totals['seconds'] = round(seconds, 3)
+        totals['pages_per_second'] = round(totals['pages'] / seconds, 2) if seconds > 0 else 0
+        totals['records_per_second'] = round(totals['records'] / seconds, 1) if seconds > 0 else 0
+        self.logger.info(f" 回放完成: {totals['pages']} 页，{totals['records']} 条记录，新增 {totals['saved']} 条，"
+                         f"耗时 {seconds:.2f}s")
+        
+        return {
+            "success": not totals['failed_records'],
+            "message": f"回放完成！新增 {totals['saved']} 条记录",
+            "total": totals['saved'],
+            "files_created": len([d for d in totals['by_date'].values() if d.get('saved', 0) > 0]),
+            "details": totals
+        }
+
     async def save_to_database_by_date(self, data: list) -> dict:
-        """按日期分组保存数据到不同的数据库文件"""
+        """按日期分组保存数据到不同的数据库文件（SQLite写入在线程中执行，不阻塞事件循环）"""
+        return await asyncio.to_thread(self._save_records_by_date, data)
+
+    def _save_records_by_date(self, data: list) -> dict:
+        """按日期分组保存数据到不同的数据库文件（同步实现，供入库线程调用）"""
         try:
             if not data:
                 self.logger.warning("没有数据需要保存到数据库")
@@ -1497,7 +2151,8 @@ class KSXCrawler:
             self.logger.info(" 开始完整的API数据提取流程...")
             
             # 执行搜索
-            search_result = await self.set_date_and_search()
+            with self.timer.span('search'):
+                search_result = await self.set_date_and_search()
             if not search_result:
                 self.logger.error("❌ 搜索失败")
                 return {"success": False, "message": "搜索失败"}
@@ -1517,7 +2172,8 @@ class KSXCrawler:
                     self.logger.info(f" 成功获取第一页数据: {len(first_page_result['data'])} 条记录")
                     
                     # 提取所有页面数据
-                    all_data = await self.extract_all_pages_data_from_api()
+                    with self.timer.span('extraction'):
+                        all_data = await self.extract_all_pages_data_from_api()
                     if not all_data:
                         self.logger.error("❌ 没有提取到数据")
                         return {"success": False, "message": "没有提取到数据"}
@@ -1563,7 +2219,8 @@ class KSXCrawler:
             # 保存到数据库
             self.logger.info(" 开始保存数据到数据库...")
             # print(" 开始保存数据到数据库...")
-            db_result = await self.save_to_database(unique_data)
+            with self.timer.span('db_write'):
+                db_result = await self.save_to_database(unique_data)
             self.logger.info(f" 数据库保存结果: {db_result} 条记录")
             # print(f" 数据库保存结果: {db_result} 条记录")
             
@@ -1581,16 +2238,18 @@ class KSXCrawler:
             # 可选：保存到CSV文件作为备份（已注释，留作备用）
             # csv_file = await self.save_api_data_to_csv(unique_data)
             
+            emit('date_done', date=self.target_date, records=len(unique_data), saved=db_result)
+            
             if db_result > 0:
                 self.logger.info(f" API数据提取完成！新增数据库记录: {db_result}条")
                 # print(f" API数据提取完成！新增数据库记录: {db_result}条")
                 # if csv_file:
                 #     self.logger.info(f" CSV备份文件: {csv_file}")
-                return {"success": True, "message": f"数据提取完成，新增 {db_result} 条记录"}
+                return {"success": True, "message": f"数据提取完成，新增 {db_result} 条记录", "total": db_result}
             else:
                 self.logger.info(f" API数据提取完成！数据已是最新状态，无新记录需要添加")
                 # print(f" API数据提取完成！数据已是最新状态，无新记录需要添加")
-                return {"success": True, "message": "数据已是最新状态，无新记录需要添加"}
+                return {"success": True, "message": "数据已是最新状态，无新记录需要添加", "total": 0}
                 
         except Exception as e:
             self.logger.error(f"❌ 完整API数据提取失败: {e}")
@@ -1706,9 +2365,64 @@ class KSXCrawler:
             self.logger.error(f"截图失败: {e}")
             return False
     
+    def build_run_report(self, result: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        生成本次运行的JSON报告：各阶段耗时的p50/p95、入库统计和网络统计，
+        同时写入 logs/run_report_<时间戳>.json
+        
+        Args:
+            result: 爬取结果，摘要写入报告
+        """
+        stats = self.last_ingest_stats or {}
+        routing_stats = self.routing_policy.stats
+        result = result or {}
+        report = self.timer.build_report(
+            result={
+                'success': result.get('success', False),
+                'message': result.get('message', ''),
+                'total': result.get('total', 0),
+            },
+            ingest={key: stats.get(key, 0) for key in ('pages', 'records', 'duplicates', 'saved', 'batches', 'failed_records')},
+            network={
+                'requests': routing_stats.get('requests', 0),
+                'blocked': sum(routing_stats.get('blocked', {}).values()),
+                'network_bytes': routing_stats.get('network_bytes', 0),
+                'cache_hits': routing_stats.get('cache_hits', 0),
+            },
+            pacing=self.pacer.summary()
+        )
+        report['report_file'] = save_report(report, os.path.join(project_root, 'logs'))
+        self.run_report = report
+        
+        phases = ', '.join(f"{name} p50={item['p50']}s p95={item['p95']}s" for name, item in report['phases'].items())
+        self.logger.info(f" 运行报告: 总耗时 {report['duration_seconds']}s，{phases}")
+        return report
+
+    def _log_network_report(self):
+        """输出本次爬取的资源拦截和流量统计"""
+        try:
+            self.network_report = self.routing_policy.build_report()
+            report = self.network_report
+            self.logger.info(
+                f" 网络统计: 请求 {report['requests']} 个，拦截 {report['blocked_total']} 个 {report['blocked']}，"
+                f"网络下载 {report['network_bytes'] / 1024:.1f} KB，缓存命中 {report['cache_hits']} 个 "
+                f"({report['cache_bytes'] / 1024:.1f} KB)，节省 {report['bytes_saved'] / 1024:.1f} KB"
+            )
+            if 'login_page_load_seconds_saved' in report:
+                self.logger.info(f" 登录页加载耗时 {report['timings'].get('login_page_load')}s，"
+                                 f"较基线节省 {report['login_page_load_seconds_saved']}s")
+        except Exception as e:
+            self.logger.warning(f"生成网络统计失败: {e}")
+
     async def close(self):
         """关闭浏览器和资源"""
         try:
+            if getattr(self, 'context', None):
+                self._log_network_report()
+            
+            if getattr(self, 'response_archive', None):
+                await self.response_archive.aclose()
+            
             # 安全关闭页面
             if hasattr(self, 'page') and self.page:
                 try:
@@ -1741,6 +2455,7 @@ class KSXCrawler:
                 except Exception as e:
                     self.logger.warning(f"停止playwright时出错: {e}")
             
+            self.logged_in = False
             self.logger.info("浏览器资源已关闭")
             
         except Exception as e:
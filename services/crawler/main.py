@@ -42,31 +42,78 @@ def import_crawler():
 # 导入爬虫类
 KSXCrawler = import_crawler()
 
+from services.crawler.core.events import emit
+from services.crawler.core.pacing import UpstreamUnavailableError
 
-async def main(target_date: str = None):
-    """主函数 - 执行基于API的数据提取"""
-    if target_date:
-        logging.info(f"开始基于API的KSX数据提取，目标日期: {target_date}")
-        logging.info(f"main函数接收到的target_date参数：{target_date}")
-    else:
-        logging.info("开始基于API的KSX数据提取...")
-    
-    # 创建爬虫实例（使用配置文件中的设置）
+
+def create_crawler():
+    """按配置文件创建爬虫实例"""
     # 智能导入配置
     try:
         from .config import get_config
         config = get_config()
-        crawler = KSXCrawler(headless=config['browser']['headless'], timeout=30000)
+        return KSXCrawler(headless=config['browser']['headless'], timeout=30000)
     except ImportError:
         try:
             # 尝试绝对导入
             from services.crawler.config import get_config
             config = get_config()
-            crawler = KSXCrawler(headless=config['browser']['headless'], timeout=30000)
+            return KSXCrawler(headless=config['browser']['headless'], timeout=30000)
         except ImportError:
             logging.warning("配置导入失败，使用默认设置")
             # 如果配置导入失败，使用默认设置
-            crawler = KSXCrawler(headless=True, timeout=30000)  # 默认使用无头模式
+            return KSXCrawler(headless=True, timeout=30000)  # 默认使用无头模式
+
+
+def emit_summary(result: dict) -> dict:
+    """输出最终结果事件（后端据此得到同步结果，不再解析日志文本）"""
+    if isinstance(result, dict):
+        emit('summary', **{key: value for key, value in result.items() if key != 'details'})
+    return result
+
+
+def attach_run_report(crawler, result: dict) -> dict:
+    """生成运行报告（各阶段耗时p50/p95），附加到结果中并单独输出一行供后端读取"""
+    import json
+    
+    try:
+        report = crawler.build_run_report(result)
+        result['report'] = report
+        print(f"Run Report: {json.dumps(report, ensure_ascii=True, default=str)}", flush=True)
+    except Exception as e:
+        logging.warning(f"生成运行报告失败: {e}")
+    return result
+
+
+async def main(target_date: str = None, emit_result: bool = True, crawler=None):
+    """
+    主函数 - 执行基于API的数据提取
+    
+    Args:
+        target_date: 目标日期 (YYYY-MM-DD)
+        emit_result: 是否输出最终结果事件（批量模式逐日调用时由批量流程统一输出）
+        crawler: 已启动并登录的爬虫实例（常驻工作进程使用，执行完不关闭），None表示新建
+    """
+    result = await _main(target_date, crawler)
+    if emit_result:
+        emit_summary(result)
+    return result
+
+
+async def _main(target_date: str = None, crawler=None):
+    """单日期数据提取流程"""
+    if target_date:
+        logging.info(f"开始基于API的KSX数据提取，目标日期: {target_date}")
+        logging.info(f"main函数接收到的target_date参数：{target_date}")
+    else:
+        logging.info("开始基于API的KSX数据提取...")
+    
+    # 常驻工作进程传入已登录的爬虫实例，否则创建新实例
+    owns_crawler = crawler is None
+    if owns_crawler:
+        crawler = create_crawler()
+    else:
+        crawler.begin_run()
     
     # 如果指定了日期，设置爬虫的目标日期
     if target_date:
@@ -75,27 +122,33 @@ async def main(target_date: str = None):
     try:
         # 启动浏览器
         logging.info(" 正在启动浏览器...")
+        emit('progress', phase='browser_start', message='正在启动浏览器')
         browser_success = await crawler.start_browser()
         if not browser_success:
             logging.error(" 浏览器启动失败")
             logging.error("ERROR_TYPE: BROWSER_START_FAILED")
+            emit('error', error_type='BROWSER_START_FAILED', message='浏览器启动失败，请检查浏览器安装或权限设置')
             return {"success": False, "message": "浏览器启动失败"}
         
         logging.info(" 浏览器启动成功")
         
         # 执行登录
         logging.info(" 正在登录...")
+        emit('progress', phase='login', message='正在登录')
         login_success = await crawler.login()
         if not login_success:
             logging.error(" 登录失败")
             logging.error("ERROR_TYPE: LOGIN_FAILED")
+            emit('error', error_type='LOGIN_FAILED', message='登录失败，请检查用户名密码或网络连接')
             return {"success": False, "message": "登录失败"}
         
         logging.info(" 登录成功")
         
         # 执行完整的API数据提取流程
         logging.info(" 开始API数据提取...")
+        emit('progress', phase='extraction', message=f"正在提取 {target_date or '默认日期'} 的数据")
         extraction_result = await crawler.full_api_data_extraction()
+        attach_run_report(crawler, extraction_result)
         
         if extraction_result.get('success', False):
             message = extraction_result.get('message', '数据提取完成')
@@ -111,12 +164,14 @@ async def main(target_date: str = None):
             if '没有业务数据' in error_msg or '没有数据' in error_msg:
                 logging.info(f" {error_msg}")
                 logging.info("INFO_TYPE: NO_DATA_FOR_DATE")
+                emit('error', error_type='NO_DATA_FOR_DATE', message='当前同步日期没有数据')
                 # 同时输出到stdout（使用英文避免编码问题）
                 print(f"Crawler Result: {error_msg}")
                 print("Total Records: 0")
             else:
                 logging.error(f" {error_msg}")
                 logging.error("ERROR_TYPE: DATA_EXTRACTION_FAILED")
+                emit('error', error_type='DATA_EXTRACTION_FAILED', message=error_msg)
                 # 同时输出到stdout（使用英文避免编码问题）
                 print(f"Crawler Failed: {error_msg}")
             # 返回失败结果
@@ -128,49 +183,68 @@ async def main(target_date: str = None):
     except KeyboardInterrupt:
         logging.error("\n 用户中断操作")
         logging.error("ERROR_TYPE: USER_INTERRUPTED")
+        emit('error', error_type='USER_INTERRUPTED', message='用户中断操作')
         print("Crawler Failed: User interrupted")
         return {"success": False, "message": "用户中断操作"}
     except Exception as e:
         logging.error(f" 程序异常: {e}")
         logging.error("ERROR_TYPE: UNKNOWN_ERROR")
         logging.error(f"程序异常: {e}", exc_info=True)
+        emit('error', error_type='UNKNOWN_ERROR', message=str(e))
         print(f"Crawler Failed: Exception: {str(e)}")
         return {"success": False, "message": f"程序异常: {str(e)}"}
     finally:
-        # 清理资源
-        logging.info(" 正在清理资源...")
-        await crawler.close()
-        logging.info(" 资源清理完成")
+        if owns_crawler:
+            # 清理资源
+            logging.info(" 正在清理资源...")
+            await crawler.close()
+            logging.info(" 资源清理完成")
+        else:
+            await crawler.end_run()
+
 
+async def main_range(start_date: str, end_date: str = None, resume: bool = False, crawler=None):
+    """
+    主函数 - 执行日期范围的数据提取（一次浏览器会话处理整个日期范围）
+    
+    Args:
+        start_date: 开始日期 (YYYY-MM-DD)
+        end_date: 结束日期 (YYYY-MM-DD)
+        resume: 是否从上次中断的检查点继续，并跳过已完成且校验通过的日期
+        crawler: 已启动并登录的爬虫实例（常驻工作进程使用，执行完不关闭），None表示新建
+    """
+    return emit_summary(await _main_range(start_date, end_date, resume, crawler))
 
-async def main_range(start_date: str, end_date: str = None):
-    """主函数 - 执行日期范围的数据提取（一次浏览器会话处理整个日期范围）"""
+
+async def _main_range(start_date: str, end_date: str = None, resume: bool = False, crawler=None):
+    """日期范围数据提取流程"""
+    if resume:
+        # 所有日期都已完成时无需启动浏览器
+        pending_dates = KSXCrawler.get_pending_dates(start_date, end_date)
+        if not pending_dates:
+            logging.info(f" {start_date} 到 {end_date or start_date} 的数据均已完整，跳过爬取")
+            print("Crawler Result: All dates already complete")
+            print("Total Records: 0")
+            return {"success": True, "message": "日期范围内的数据均已完整，无需重新爬取", "total": 0, "skipped": True}
+    
     logging.info(f"开始基于API的KSX日期范围数据提取，开始日期: {start_date}, 结束日期: {end_date or start_date}")
     
-    # 创建爬虫实例（使用配置文件中的设置）
-    # 智能导入配置
-    try:
-        from .config import get_config
-        config = get_config()
-        crawler = KSXCrawler(headless=config['browser']['headless'], timeout=30000)
-    except ImportError:
-        try:
-            # 尝试绝对导入
-            from services.crawler.config import get_config
-            config = get_config()
-            crawler = KSXCrawler(headless=config['browser']['headless'], timeout=30000)
-        except ImportError:
-            logging.warning("配置导入失败，使用默认设置")
-            # 如果配置导入失败，使用默认设置
-            crawler = KSXCrawler(headless=True, timeout=30000)  # 默认使用无头模式
+    # 常驻工作进程传入已登录的爬虫实例，否则创建新实例
+    owns_crawler = crawler is None
+    if owns_crawler:
+        crawler = create_crawler()
+    else:
+        crawler.begin_run()
     
     try:
         # 启动浏览器
         logging.info(" 正在启动浏览器...")
+        emit('progress', phase='browser_start', message='正在启动浏览器')
         browser_success = await crawler.start_browser()
         if not browser_success:
             logging.error(" 浏览器启动失败")
             print("Crawler Failed: Browser start failed")
+            emit('error', error_type='BROWSER_START_FAILED', message='浏览器启动失败，请检查浏览器安装或权限设置')
             return {"success": False, "message": "浏览器启动失败"}
         
         logging.info(" 浏览器启动成功")
@@ -178,10 +252,12 @@ async def main_range(start_date: str, end_date: str = None):
         
         # 执行登录
         logging.info(" 正在登录...")
+        emit('progress', phase='login', message='正在登录')
         login_success = await crawler.login()
         if not login_success:
             logging.error(" 登录失败")
             print("Crawler Failed: Login failed")
+            emit('error', error_type='LOGIN_FAILED', message='登录失败，请检查用户名密码或网络连接')
             return {"success": False, "message": "登录失败"}
         
         logging.info(" 登录成功")
@@ -189,8 +265,10 @@ async def main_range(start_date: str, end_date: str = None):
         
         # 执行日期范围数据提取
         logging.info(f" 开始日期范围API数据提取，从 {start_date} 到 {end_date or start_date}...")
+        emit('progress', phase='extraction', message=f"正在提取 {start_date} 到 {end_date or start_date} 的数据")
         print(f"Starting date range extraction: {start_date} to {end_date or start_date}")
-        extraction_result = await crawler.full_api_data_extraction_range(start_date, end_date)
+        extraction_result = await crawler.full_api_data_extraction_range(start_date, end_date, resume=resume)
+        attach_run_report(crawler, extraction_result)
         
         if extraction_result.get('success', False):
             message = extraction_result.get('message', '数据提取完成')
@@ -205,33 +283,179 @@ async def main_range(start_date: str, end_date: str = None):
             error_msg = extraction_result.get('message', '数据提取失败')
             logging.error(f" {error_msg}")
             print(f"Crawler Failed: {error_msg}")
+            emit('error', error_type='DATA_EXTRACTION_FAILED', message=error_msg)
             return extraction_result
         
     except KeyboardInterrupt:
         logging.error("\n 用户中断操作")
         print("Crawler Failed: User interrupted")
+        emit('error', error_type='USER_INTERRUPTED', message='用户中断操作')
         return {"success": False, "message": "用户中断操作"}
     except Exception as e:
         logging.error(f" 程序异常: {e}")
         logging.error(f"程序异常: {e}", exc_info=True)
         print(f"Crawler Failed: Exception: {str(e)}")
+        emit('error', error_type='UNKNOWN_ERROR', message=str(e))
         return {"success": False, "message": f"程序异常: {str(e)}"}
     finally:
-        # 清理资源
-        logging.info(" 正在清理资源...")
+        if owns_crawler:
+            # 清理资源
+            logging.info(" 正在清理资源...")
+            await crawler.close()
+            logging.info(" 资源清理完成")
+        else:
+            await crawler.end_run()
+
+
+async def main_replay(capture_path: str):
+    """
+    回放模式：不启动浏览器，从HAR/NDJSON抓包中读取响应并执行翻页、去重和入库
+    
+    Args:
+        capture_path: 抓包文件路径
+    """
+    logging.info(f"开始回放抓包: {capture_path}")
+    crawler = KSXCrawler(headless=True, timeout=30000)
+    try:
+        emit('progress', phase='replay', message=f"正在回放抓包: {capture_path}")
+        result = await crawler.replay_capture(capture_path)
+        attach_run_report(crawler, result)
+        emit_summary(result)
+        if result.get('success', False):
+            print(f"Crawler Result: {result['message']}")
+        else:
+            print(f"Crawler Failed: {result.get('message', '回放失败')}")
+        print(f"Total Records: {result.get('total', 0)}")
+        details = result.get('details') or {}
+        if details:
+            print(f"Replay Throughput: {details['pages_per_second']} pages/s, {details['records_per_second']} records/s")
+        return result
+    except Exception as e:
+        logging.error(f" 回放异常: {e}", exc_info=True)
+        print(f"Crawler Failed: Exception: {str(e)}")
+        emit('error', error_type='UNKNOWN_ERROR', message=str(e))
+        return emit_summary({"success": False, "message": f"回放异常: {str(e)}"})
+    finally:
         await crawler.close()
-        logging.info(" 资源清理完成")
 
 
-async def main_batch(start_date: str, end_date: str):
+async def main_plan(start_date: str, end_date: str = None, execute: bool = False, crawler=None):
+    """
+    生成爬取计划（逐日探测网站总数并与本地记录数对比），可选在同一浏览器会话中执行
+    
+    计划以 "Crawl Plan: <JSON>" 的形式单独输出一行，后端在执行开始前即可读取
+    
+    Args:
+        start_date: 开始日期 (YYYY-MM-DD)
+        end_date: 结束日期 (YYYY-MM-DD)
+        execute: 是否在输出计划后爬取需要更新的日期
+        crawler: 已启动并登录的爬虫实例（常驻工作进程使用，执行完不关闭），None表示新建
+    """
+    return emit_summary(await _main_plan(start_date, end_date, execute, crawler))
+
+
+async def _main_plan(start_date: str, end_date: str = None, execute: bool = False, crawler=None):
+    """生成爬取计划并按计划爬取"""
+    import json
+    from datetime import datetime, timedelta
+    
+    logging.info(f"开始生成爬取计划，开始日期: {start_date}, 结束日期: {end_date or start_date}")
+    
+    # 常驻工作进程传入已登录的爬虫实例，否则创建新实例
+    owns_crawler = crawler is None
+    if owns_crawler:
+        crawler = create_crawler()
+    else:
+        crawler.begin_run()
+    
+    try:
+        logging.info(" 正在启动浏览器...")
+        emit('progress', phase='browser_start', message='正在启动浏览器')
+        if not await crawler.start_browser():
+            logging.error(" 浏览器启动失败")
+            print("Crawler Failed: Browser start failed")
+            emit('error', error_type='BROWSER_START_FAILED', message='浏览器启动失败，请检查浏览器安装或权限设置')
+            return {"success": False, "message": "浏览器启动失败"}
+        
+        logging.info(" 正在登录...")
+        emit('progress', phase='login', message='正在登录')
+        if not await crawler.login():
+            logging.error(" 登录失败")
+            print("Crawler Failed: Login failed")
+            emit('error', error_type='LOGIN_FAILED', message='登录失败，请检查用户名密码或网络连接')
+            return {"success": False, "message": "登录失败"}
+        
+        emit('progress', phase='plan', message='正在探测网站记录数并生成爬取计划')
+        plan = await crawler.plan_crawl(start_date, end_date)
+        print(f"Crawl Plan: {json.dumps(plan, ensure_ascii=True)}", flush=True)
+        emit('plan', plan=plan)
+        
+        if not execute or not plan['work_list']:
+            attach_run_report(crawler, plan)
+            print(f"Crawler Result: {plan['message']}")
+            print("Total Records: 0")
+            return plan
+        
+        # 将需要爬取的日期合并为连续区间，每个区间一次搜索
+        segments = []
+        for date_str in plan['work_list']:
+            current_dt = datetime.strptime(date_str, '%Y-%m-%d')
+            if segments and datetime.strptime(segments[-1][1], '%Y-%m-%d') + timedelta(days=1) == current_dt:
+                segments[-1][1] = date_str
+            else:
+                segments.append([date_str, date_str])
+        
+        total_records = 0
+        failed_segments = []
+        for segment_start, segment_end in segments:
+            print(f"Starting date range extraction: {segment_start} to {segment_end}")
+            emit('progress', phase='extraction', message=f"正在提取 {segment_start} 到 {segment_end} 的数据")
+            result = await crawler.full_api_data_extraction_range(segment_start, segment_end)
+            total_records += result.get('total', 0)
+            if not result.get('success', False):
+                failed_segments.append(f"{segment_start}~{segment_end}")
+                logging.error(f" {segment_start} 到 {segment_end} 爬取失败: {result.get('message')}")
+        
+        message = f"按计划爬取 {len(plan['work_list'])} 个日期，新增 {total_records} 条记录"
+        if failed_segments:
+            message += f"，失败区间: {', '.join(failed_segments)}"
+            print(f"Crawler Failed: {message}")
+        else:
+            print(f"Crawler Result: {message}")
+        print(f"Total Records: {total_records}")
+        return attach_run_report(crawler, dict(plan, success=not failed_segments, message=message, total=total_records))
+        
+    except Exception as e:
+        logging.error(f" 程序异常: {e}", exc_info=True)
+        print(f"Crawler Failed: Exception: {str(e)}")
+        emit('error', error_type='UNKNOWN_ERROR', message=str(e))
+        return {"success": False, "message": f"程序异常: {str(e)}"}
+    finally:
+        if owns_crawler:
+            logging.info(" 正在清理资源...")
+            await crawler.close()
+            logging.info(" 资源清理完成")
+        else:
+            await crawler.end_run()
+
+
+async def main_batch(start_date: str, end_date: str, resume: bool = False):
     """
     批量爬取指定日期范围的数据
     
     Args:
         start_date: 开始日期 (YYYY-MM-DD)
         end_date: 结束日期 (YYYY-MM-DD)
+        resume: 是否跳过已完成且校验通过的日期
     """
+    return emit_summary(await _main_batch(start_date, end_date, resume))
+
+
+async def _main_batch(start_date: str, end_date: str, resume: bool = False):
+    """逐日批量爬取流程"""
     from datetime import datetime, timedelta
+    from services.config_database_manager import config_db_manager
+    from services.database_manager import get_db_manager
     
     try:
         # 解析日期
@@ -250,23 +474,54 @@ async def main_batch(start_date: str, end_date: str):
             date_list.append(current_dt.strftime('%Y-%m-%d'))
             current_dt += timedelta(days=1)
         
-        total_dates = len(date_list)
         total_records = 0
         success_count = 0
         failed_dates = []
+        skipped_dates = []
+        
+        if resume:
+            pending_dates = set(KSXCrawler.get_pending_dates(start_date, end_date))
+            skipped_dates = [d for d in date_list if d not in pending_dates]
+            date_list = [d for d in date_list if d in pending_dates]
+            if skipped_dates:
+                print(f"Skipped {len(skipped_dates)} completed dates")
+                logging.info(f"跳过{len(skipped_dates)}个已完成且校验通过的日期：{', '.join(skipped_dates)}")
+        
+        total_dates = len(date_list)
+        
+        # 记录运行状态，每个日期完成后更新检查点
+        run_id = config_db_manager.create_crawl_run('batch', start_date, end_date)
+        records_by_date = {}
+        db_manager = get_db_manager()
         
         print(f"Crawler Batch Started: Processing {total_dates} dates from {start_date} to {end_date}")
         logging.info(f"开始批量爬取，共{total_dates}个日期：从{start_date}到{end_date}")
         
+        # 日期之间的间隔由节奏控制器按上游响应情况调整
+        pacer = KSXCrawler.shared_pacer()
+        
         # 逐个处理每个日期
         for i, date_str in enumerate(date_list, 1):
+            if i > 1:
+                try:
+                    await pacer.pace()
+                except UpstreamUnavailableError as e:
+                    # 上游持续不可用，剩余日期不再尝试，可使用--resume继续
+                    remaining = date_list[i - 1:]
+                    failed_dates.extend(remaining)
+                    logging.error(f"{e}，跳过剩余{len(remaining)}个日期")
+                    emit('error', error_type='UPSTREAM_UNAVAILABLE', message=str(e))
+                    break
+            
             print(f"Processing date {i}/{total_dates}: {date_str}")
             logging.info(f"正在处理第{i}/{total_dates}个日期：{date_str}")
             logging.info(f"传入main函数的日期参数：{date_str}")
+            emit('progress', phase='extraction', message=f"正在处理第{i}/{total_dates}个日期：{date_str}",
+                 current=i, total_dates=total_dates)
             
             try:
                 # 调用单日期爬取函数
-                result = await main(date_str)
+                result = await main(date_str, emit_result=False)
                 
                 if result and result.get('success', False):
                     success_count += 1
@@ -274,19 +529,22 @@ async def main_batch(start_date: str, end_date: str):
                     total_records += date_records
                     print(f"Date {date_str} completed: {date_records} records")
                     logging.info(f"日期{date_str}完成：{date_records}条记录")
+                    if run_id:
+                        local_count = db_manager.count_records(datetime.strptime(date_str, '%Y-%m-%d'))
+                        records_by_date[date_str] = {'records': local_count, 'saved': date_records, 'complete': True}
+                        config_db_manager.update_crawl_checkpoint(run_id, records_by_date=records_by_date)
                 else:
                     failed_dates.append(date_str)
                     print(f"Date {date_str} failed: {result.get('message', 'Unknown error') if result else 'No result'}")
                     logging.error(f"日期{date_str}失败：{result.get('message', '未知错误') if result else '无结果'}")
+                    emit('error', error_type='DATE_FAILED', date=date_str,
+                         message=result.get('message', '未知错误') if result else '无结果')
                 
             except Exception as e:
                 failed_dates.append(date_str)
                 print(f"Date {date_str} error: {str(e)}")
                 logging.error(f"日期{date_str}异常：{str(e)}")
-            
-            # 在日期之间稍作休息，避免过于频繁
-            if i < total_dates:
-                await asyncio.sleep(2)
+                emit('error', error_type='DATE_FAILED', date=date_str, message=str(e))
         
         # 输出最终结果
         print(f"Batch Completed: {success_count}/{total_dates} dates successful")
@@ -298,13 +556,21 @@ async def main_batch(start_date: str, end_date: str):
         
         logging.info(f"批量爬取完成：{success_count}/{total_dates}个日期成功，共{total_records}条记录")
         
+        if run_id:
+            config_db_manager.update_crawl_checkpoint(
+                run_id,
+                status='failed' if failed_dates else 'completed',
+                message=f"失败的日期：{', '.join(failed_dates)}" if failed_dates else ''
+            )
+        
         return {
             "success": True,
             "message": f"批量爬取完成：{success_count}/{total_dates}个日期成功",
             "total": total_records,
             "success_count": success_count,
             "failed_count": len(failed_dates),
-            "failed_dates": failed_dates
+            "failed_dates": failed_dates,
+            "skipped_dates": skipped_dates
         }
         
     except ValueError as e:
@@ -323,6 +589,11 @@ if __name__ == "__main__":
     parser.add_argument('--date', type=str, help='指定要爬取的日期 (YYYY-MM-DD)')
     parser.add_argument('--start-date', type=str, help='指定开始日期 (YYYY-MM-DD)')
     parser.add_argument('--end-date', type=str, help='指定结束日期 (YYYY-MM-DD)')
+    parser.add_argument('--resume', action='store_true',
+                        help='从上次中断的检查点继续，跳过已完成的日期；未完成的日期读取第1页后直接跳到检查点之后的页')
+    parser.add_argument('--plan', action='store_true', help='只生成爬取计划（对比网站与本地记录数），不爬取')
+    parser.add_argument('--execute', action='store_true', help='与--plan一起使用：输出计划后爬取需要更新的日期')
+    parser.add_argument('--replay', type=str, help='回放HAR/NDJSON抓包（不启动浏览器），用于压测和问题复现')
     args = parser.parse_args()
     
     # 设置基本日志配置
@@ -336,7 +607,9 @@ if __name__ == "__main__":
     )
     
     # 处理参数并运行主函数
-    if args.start_date or args.end_date:
+    if args.replay:
+        asyncio.run(main_replay(args.replay))
+    elif args.start_date or args.end_date:
         # 使用日期范围模式
         start_date = args.start_date
         end_date = args.end_date
@@ -352,8 +625,12 @@ if __name__ == "__main__":
                 print("Crawler Failed: Must provide at least start_date")
                 sys.exit(1)
         
-        # 使用新的日期范围处理函数（一次浏览器会话）
-        asyncio.run(main_range(start_date, end_date))
+        if args.plan:
+            # 先生成爬取计划，只爬取缺失或有变化的日期
+            asyncio.run(main_plan(start_date, end_date, execute=args.execute))
+        else:
+            # 使用新的日期范围处理函数（一次浏览器会话）
+            asyncio.run(main_range(start_date, end_date, resume=args.resume))
     else:
         # 使用单日期模式
         asyncio.run(main(args.date))
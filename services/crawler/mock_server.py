@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地模拟KSX服务器
+提供与真实站点相同选择器的登录页、查询页以及/UIProcessor接口，记录按
+DatabaseManager的表结构随机生成（同一日期、同一序号的记录每次生成结果相同），
+用于在不访问真实站点的情况下调试和压测爬虫（见 services/crawler/benchmark.py）
+
+用法:
+    python -m services.crawler.mock_server --port 18900 --records-per-day 2000 --latency-ms 200 --error-rate 0.02
+    KSX_LOGIN_URL=http://127.0.0.1:18900/ python services/crawler/main.py --start-date 2025-09-01 --end-date 2025-09-03
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse
+
+# 添加项目根目录到路径，以便直接运行本脚本
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from services.database_manager import DatabaseManager
+
+
+# 默认模拟配置
+MOCK_CONFIG = {
+    'records_per_day': 500,          # 每个日期的记录数
+    'empty_dates': [],               # 没有数据的日期（YYYY-MM-DD）
+    'page_sizes': [10, 20, 50, 100], # 每页数量选项，最后一个为最大值
+    'default_page_size': 10,
+    'stores': 300,                   # 门店数量
+    'latency_ms': 0,                 # /UIProcessor平均响应延迟（毫秒）
+    'latency_jitter_ms': 0,          # 延迟的随机波动范围（毫秒）
+    'error_rate': 0.0,               # /UIProcessor返回500的概率
+    'seed': 42,
+}
+
+_AREAS = ['1区', '2区', '3区', '4区', '5区']
+
+
+def _find_value(payload: Any, key: str) -> Optional[Any]:
+    """在请求体中递归查找字段（与爬虫_find_page_no的查找方式一致）"""
+    if isinstance(payload, dict):
+        for k, v in payload.items():
+            if k == key:
+                return v
+            found = _find_value(v, key)
+            if found is not None:
+                return found
+    elif isinstance(payload, list):
+        for v in payload:
+            found = _find_value(v, key)
+            if found is not None:
+                return found
+    return None
+
+
+def generate_record(date_str: str, index: int, config: Dict[str, Any]) -> Dict[str, Any]:
+    """按表结构生成一条模拟记录"""
+    rng = random.Random(f"{config['seed']}-{date_str}-{index}")
+    store_no = index % config['stores'] + 1
+    record = {
+        'ID': f"{date_str.replace('-', '')}{index:06d}",
+        'createDateShow': date_str,
+        'MDShow': f"模拟门店{store_no:04d}",
+        'area': _AREAS[store_no % len(_AREAS)],
+    }
+    for column in DatabaseManager._get_schema():
+        name = column['name']
+        if name in record or name == 'rawId':
+            continue
+        if column['type'] == 'REAL':
+            record[name] = round(rng.uniform(0, 100), 2)
+        elif 'Rate' in name:
+            record[name] = f"{rng.uniform(80, 100):.2f}%"
+        elif 'Rating' in name:
+            record[name] = f"{rng.uniform(4, 5):.1f}"
+        elif 'WeightingPenalty' in name:
+            record[name] = str(rng.choice([0, 0, 0, -1, -2]))
+        else:
+            record[name] = str(rng.randint(0, 100))
+    return record
+
+
+def _date_range(start_date: str, end_date: str) -> List[str]:
+    start = datetime.strptime(start_date, '%Y-%m-%d')
+    end = datetime.strptime(end_date or start_date, '%Y-%m-%d')
+    dates = []
+    while start <= end:
+        dates.append(start.strftime('%Y-%m-%d'))
+        start += timedelta(days=1)
+    return dates
+
+
+def query_page(start_date: str, end_date: str, page_no: int, page_size: int, config: Dict[str, Any]) -> Dict[str, Any]:
+    """返回日期范围内第page_no页的数据，格式与真实/UIProcessor响应一致"""
+    counts = []
+    for date_str in _date_range(start_date, end_date):
+        count = 0 if date_str in config['empty_dates'] else config['records_per_day']
+        counts.append((date_str, count))
+    total = sum(count for _, count in counts)
+
+    # 在按日期拼接的虚拟列表中定位当前页，不生成整个范围的数据
+    offset = (page_no - 1) * page_size
+    end = min(offset + page_size, total)
+    data = []
+    position = 0
+    for date_str, count in counts:
+        if offset < position + count and end > position:
+            for index in range(max(offset - position, 0), min(end - position, count)):
+                data.append(generate_record(date_str, index, config))
+        position += count
+        if position >= end:
+            break
+
+    return {
+        'success': True,
+        'data': data,
+        'pageInfo': {
+            'pageNo': page_no,
+            'pageSize': page_size,
+            'total': total,
+            'hasMore': end < total,
+        }
+    }
+
+
+_LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>KSX 模拟登录</title></head>
+<body>
+<form id="login-form">
+  <input name="userId" type="text" placeholder="用户名">
+  <input name="pass" type="password" placeholder="密码">
+  <button type="submit">登录</button>
+</form>
+<script>
+document.getElementById('login-form').addEventListener('submit', function (e) {
+  e.preventDefault();
+  sessionStorage.removeItem('ksx-query');
+  location.href = '/app';
+});
+</script>
+</body></html>
+"""
+
+_APP_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>KSX 模拟报表</title>
+<style>
+  .lb-LBPopper-sizer { position: absolute; background: #fff; border: 1px solid #ccc; }
+  .lb-LBPopper-sizer li, .lb-MuiPagination-ul li { cursor: pointer; padding: 2px 6px; }
+  .lb-MuiPagination-ul li { display: inline-block; }
+</style></head>
+<body>
+<button class="lb-LBObjectParameterFormExpandButton-root" id="expand">展开查询条件</button>
+<div id="query-form" style="display: none">
+  <input class="lb-LBDatePicker-input" type="text" id="start-date">
+  <input class="lb-LBDatePicker-input" type="text" id="end-date">
+  <button class="lb-LBButton-contained" id="search">查询</button>
+</div>
+<div id="summary"></div>
+<div class="lb-LBPagination-root">
+  <div class="lb-LBPagination-pageSizeChanger" id="size-changer">__DEFAULT_PAGE_SIZE__ 条/页</div>
+  <ul class="lb-MuiPagination-ul" id="pagination"></ul>
+</div>
+<div class="lb-LBPopper-sizer" id="size-popper" style="display: none"><ul>__PAGE_SIZE_OPTIONS__</ul></div>
+<script>
+var state = JSON.parse(sessionStorage.getItem('ksx-query') || 'null');
+
+function query() {
+  sessionStorage.setItem('ksx-query', JSON.stringify(state));
+  fetch('/UIProcessor', {
+    method: 'POST',
+    headers: {'Content-Type': 'application/json'},
+    body: JSON.stringify({
+      params: {startDate: state.startDate, endDate: state.endDate},
+      pageInfo: {pageNo: state.pageNo, pageSize: state.pageSize}
+    })
+  }).then(function (resp) { return resp.ok ? resp.json() : null; })
+    .then(function (body) { if (body) { render(body.pageInfo, body.data.length); } });
+}
+
+function render(pageInfo, count) {
+  document.getElementById('summary').textContent =
+    '第 ' + pageInfo.pageNo + ' 页，共 ' + pageInfo.total + ' 条，本页 ' + count + ' 条';
+  document.getElementById('size-changer').textContent = pageInfo.pageSize + ' 条/页';
+  var last = !pageInfo.hasMore;
+  document.getElementById('pagination').innerHTML =
+    '<li><button id="prev"' + (pageInfo.pageNo <= 1 ? ' disabled' : '') + '>上一页</button></li>' +
+    '<li><button>' + pageInfo.pageNo + '</button></li>' +
+    '<li><button id="next"' + (last ? ' disabled' : '') + '>下一页</button></li>';
+  document.getElementById('prev').onclick = function () { state.pageNo -= 1; query(); };
+  document.getElementById('next').onclick = function () { state.pageNo += 1; query(); };
+}
+
+document.getElementById('expand').onclick = function () {
+  var form = document.getElementById('query-form');
+  form.style.display = form.style.display === 'none' ? 'block' : 'none';
+};
+document.getElementById('search').onclick = function () {
+  state = {
+    startDate: document.getElementById('start-date').value,
+    endDate: document.getElementById('end-date').value,
+    pageNo: 1,
+    pageSize: state ? state.pageSize : __DEFAULT_PAGE_SIZE__
+  };
+  query();
+};
+document.getElementById('size-changer').onclick = function () {
+  document.getElementById('size-popper').style.display = 'block';
+};
+document.querySelectorAll('#size-popper li').forEach(function (li) {
+  li.onclick = function () {
+    document.getElementById('size-popper').style.display = 'none';
+    if (!state) { return; }
+    state.pageSize = parseInt(li.dataset.size, 10);
+    state.pageNo = 1;
+    query();
+  };
+});
+
+// 刷新页面后按保存的查询条件重新查询（与真实站点刷新后的行为一致）
+if (state) { query(); }
+</script>
+</body></html>
+"""
+
+
+def create_app(config: Dict[str, Any] = None) -> FastAPI:
+    """
+    创建模拟服务器应用
+
+    Args:
+        config: 模拟配置，未提供的项使用MOCK_CONFIG中的默认值
+    """
+    config = dict(MOCK_CONFIG, **(config or {}))
+    app = FastAPI(title="KSX Mock Server")
+    app.state.mock_config = config
+    app.state.stats = {'requests': 0, 'errors': 0, 'records': 0}
+
+    app_page = (_APP_PAGE
+                .replace('__DEFAULT_PAGE_SIZE__', str(config['default_page_size']))
+                .replace('__PAGE_SIZE_OPTIONS__', ''.join(
+                    f'<li data-size="{size}">{size} 条/页</li>' for size in config['page_sizes'])))
+
+    @app.get("/", response_class=HTMLResponse)
+    async def login_page():
+        return _LOGIN_PAGE
+
+    @app.get("/app", response_class=HTMLResponse)
+    async def report_page():
+        return app_page
+
+    @app.post("/UIProcessor")
+    async def ui_processor(request: Request):
+        app.state.stats['requests'] += 1
+        latency = config['latency_ms'] + random.uniform(-1, 1) * config['latency_jitter_ms']
+        if latency > 0:
+            await asyncio.sleep(latency / 1000)
+
+        if config['error_rate'] and random.random() < config['error_rate']:
+            app.state.stats['errors'] += 1
+            return JSONResponse(status_code=500, content={'success': False, 'message': '模拟服务器错误'})
+
+        try:
+            payload = await request.json()
+        except Exception:
+            payload = {}
+        start_date = _find_value(payload, 'startDate') or datetime.now().strftime('%Y-%m-%d')
+        end_date = _find_value(payload, 'endDate') or start_date
+        page_no = int(_find_value(payload, 'pageNo') or 1)
+        page_size = int(_find_value(payload, 'pageSize') or config['default_page_size'])
+
+        try:
+            result = await asyncio.to_thread(query_page, start_date, end_date, page_no, page_size, config)
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={'success': False, 'message': f'日期格式错误: {e}'})
+        app.state.stats['records'] += len(result['data'])
+        return result
+
+    @app.get("/mock/stats")
+    async def mock_stats():
+        return app.state.stats
+
+    return app
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser):
+    """添加模拟服务器的命令行参数（压测脚本共用）"""
+    parser.add_argument('--records-per-day', type=int, default=MOCK_CONFIG['records_per_day'], help='每个日期的记录数')
+    parser.add_argument('--page-sizes', type=str, default=','.join(map(str, MOCK_CONFIG['page_sizes'])),
+                        help='每页数量选项，逗号分隔，最后一个为最大值')
+    parser.add_argument('--latency-ms', type=float, default=MOCK_CONFIG['latency_ms'], help='/UIProcessor平均响应延迟（毫秒）')
+    parser.add_argument('--latency-jitter-ms', type=float, default=MOCK_CONFIG['latency_jitter_ms'], help='延迟的随机波动范围（毫秒）')
+    parser.add_argument('--error-rate', type=float, default=MOCK_CONFIG['error_rate'], help='/UIProcessor返回500的概率 (0-1)')
+    parser.add_argument('--empty-dates', type=str, default='', help='没有数据的日期，逗号分隔')
+
+
+def config_from_args(args) -> Dict[str, Any]:
+    """根据命令行参数生成模拟配置"""
+    page_sizes = [int(size) for size in args.page_sizes.split(',') if size.strip()]
+    return {
+        'records_per_day': args.records_per_day,
+        'page_sizes': page_sizes,
+        'default_page_size': page_sizes[0],
+        'latency_ms': args.latency_ms,
+        'latency_jitter_ms': args.latency_jitter_ms,
+        'error_rate': args.error_rate,
+        'empty_dates': [d.strip() for d in args.empty_dates.split(',') if d.strip()],
+    }
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description='本地模拟KSX服务器')
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=18900)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线重新入库
+从响应归档（archive/YYYY-MM/ksx_YYYY-MM-DD.ndjson.gz）重建指定日期范围的数据库，
+不需要启动浏览器；每个日期文件独立处理，多个日期并行
+
+用法:
+    python -m services.crawler.reingest --start-date 2025-09-01 --end-date 2025-09-30
+    python -m services.crawler.reingest --start-date 2025-09-01 --replace --workers 4
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Any, List
+
+# 添加项目根目录到路径，以便直接运行本脚本
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from services.crawler.core.archive import list_day_files, iter_archive_lines
+
+
+# 每次写入数据库的记录数
+INSERT_BATCH_SIZE = 5000
+
+
+def default_archive_dir() -> str:
+    """读取爬虫配置中的归档目录"""
+    try:
+        from services.crawler.config import CAPTURE_CONFIG
+        archive_dir = CAPTURE_CONFIG.get('archive_dir', 'archive')
+    except ImportError:
+        archive_dir = 'archive'
+    if not os.path.isabs(archive_dir):
+        archive_dir = os.path.join(project_root, archive_dir)
+    return archive_dir
+
+
+def reingest_day(date_str: str, archive_path: str, replace: bool = False) -> Dict[str, Any]:
+    """
+    将一个日期的归档文件写入对应的日期数据库（在工作进程中执行）
+
+    Args:
+        date_str: 日期 (YYYY-MM-DD)
+        archive_path: 归档文件路径
+        replace: 是否先清空该日期已有的数据库，完全以归档为准重建
+
+    Returns:
+        该日期的统计信息
+    """
+    from services.database_manager import get_db_manager
+
+    started = time.perf_counter()
+    db_manager = get_db_manager()
+    date_obj = datetime.strptime(date_str, '%Y-%m-%d')
+    db_path = db_manager.get_database_path(date_obj)
+    backup_path = db_path.with_suffix('.db.bak')
+
+    stats = {'date': date_str, 'responses': 0, 'records': 0, 'inserted': 0}
+    try:
+        if replace and db_path.exists():
+            # 先移走原数据库，重建失败时恢复
+            shutil.move(str(db_path), str(backup_path))
+
+        # 同一记录可能出现在多次爬取的归档中，按ID去重
+        records: Dict[Any, Dict[str, Any]] = {}
+        for line in iter_archive_lines(archive_path):
+            stats['responses'] += 1
+            for item in line.get('data') or []:
+                if not isinstance(item, dict):
+                    continue
+                raw_id = item.get('ID') or item.get('id') or item.get('rawId')
+                if raw_id:
+                    records[raw_id] = item
+        stats['records'] = len(records)
+
+        batch: List[Dict[str, Any]] = list(records.values())
+        for start in range(0, len(batch), INSERT_BATCH_SIZE):
+            stats['inserted'] += db_manager.insert_data(batch[start:start + INSERT_BATCH_SIZE], date=date_obj)
+
+        if backup_path.exists():
+            backup_path.unlink()
+    except Exception as e:
+        stats['error'] = str(e)
+        if backup_path.exists():
+            if db_path.exists():
+                db_path.unlink()
+            shutil.move(str(backup_path), str(db_path))
+
+    stats['seconds'] = round(time.perf_counter() - started, 3)
+    return stats
+
+
+def reingest_range(start_date: str, end_date: str = None, archive_dir: str = None,
+                   workers: int = None, replace: bool = False) -> Dict[str, Any]:
+    """
+    从归档重建日期范围内的数据库
+
+    Args:
+        start_date: 开始日期 (YYYY-MM-DD)
+        end_date: 结束日期 (YYYY-MM-DD)，默认等于开始日期
+        archive_dir: 归档目录，默认使用爬虫配置中的archive_dir
+        workers: 并行进程数，默认为CPU核数（最多8个），1表示在当前进程中串行执行
+        replace: 是否先清空已有的日期数据库
+
+    Returns:
+        Dict[str, Any]: {"success", "message", "total", "details"}
+    """
+    archive_dir = archive_dir or default_archive_dir()
+    day_files = list_day_files(archive_dir, start_date, end_date)
+    if not day_files:
+        return {"success": False, "message": f"归档目录中没有 {start_date} 到 {end_date or start_date} 的数据: {archive_dir}", "total": 0}
+
+    workers = workers or min(os.cpu_count() or 1, 8)
+    workers = max(1, min(workers, len(day_files)))
+    logging.info(f"开始从归档重新入库: {len(day_files)} 个日期，{workers} 个进程")
+
+    started = time.perf_counter()
+    details = []
+    if workers == 1:
+        for date_str, path in day_files.items():
+            details.append(reingest_day(date_str, str(path), replace))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(reingest_day, date_str, str(path), replace)
+                       for date_str, path in day_files.items()]
+            for future in as_completed(futures):
+                details.append(future.result())
+
+    details.sort(key=lambda item: item['date'])
+    for item in details:
+        if item.get('error'):
+            logging.error(f"{item['date']} 重新入库失败: {item['error']}")
+        else:
+            logging.info(f"{item['date']}: 归档 {item['records']} 条记录，写入 {item['inserted']} 条，耗时 {item['seconds']}s")
+
+    failed = [item['date'] for item in details if item.get('error')]
+    total_inserted = sum(item['inserted'] for item in details)
+    total_records = sum(item['records'] for item in details)
+    seconds = time.perf_counter() - started
+    message = f"重新入库完成：{len(details) - len(failed)}/{len(details)} 个日期成功，写入 {total_inserted} 条记录，耗时 {seconds:.1f}s"
+    if failed:
+        message += f"，失败的日期: {', '.join(failed)}"
+
+    return {
+        "success": not failed,
+        "message": message,
+        "total": total_inserted,
+        "records": total_records,
+        "records_per_second": round(total_records / seconds, 1) if seconds > 0 else 0,
+        "details": details
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='从响应归档离线重新入库')
+    parser.add_argument('--start-date', type=str, required=True, help='开始日期 (YYYY-MM-DD)')
+    parser.add_argument('--end-date', type=str, help='结束日期 (YYYY-MM-DD)，默认等于开始日期')
+    parser.add_argument('--archive-dir', type=str, help='归档目录，默认使用爬虫配置')
+    parser.add_argument('--workers', type=int, help='并行进程数，1表示串行')
+    parser.add_argument('--replace', action='store_true', help='先清空已有的日期数据库，完全以归档为准重建')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    result = reingest_range(args.start_date, args.end_date, args.archive_dir, args.workers, args.replace)
+    if result['success']:
+        print(f"Reingest Result: {result['message']}")
+    else:
+        print(f"Reingest Failed: {result['message']}")
+    print(f"Total Records: {result['total']}")
+    sys.exit(0 if result['success'] else 1)
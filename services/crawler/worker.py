@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常驻爬虫工作进程
+保持Chromium和已登录的浏览器上下文，依次执行后端通过本地IPC通道发送的同步任务，
+省去每次同步启动Python解释器、导入Playwright、启动浏览器和登录的固定开销
+
+执行一定数量的任务或页面内存增长过多后重启浏览器；进程自身内存增长过多时
+在任务结束后退出，由后端重新启动。后端关闭连接或发送shutdown时关闭浏览器并退出
+
+IPC消息（multiprocessing.connection，使用后端生成的认证密钥）：
+  后端 -> 工作进程: {'type': 'job', 'job_id', 'kind', 'params'} / {'type': 'ping'} / {'type': 'shutdown'}
+  工作进程 -> 后端: {'type': 'event', 'job_id', 'event'} / {'type': 'result', 'job_id', 'result', 'worker', 'restart'}
+                    / {'type': 'pong', 'worker'}
+
+用法（由后端启动，认证密钥通过环境变量 KSX_WORKER_AUTHKEY 传入）:
+    python services/crawler/worker.py --connect 127.0.0.1:50123
+"""
+
+import argparse
+import asyncio
+import contextvars
+import logging
+import os
+import sys
+import threading
+import time
+from multiprocessing.connection import Client
+from typing import Any, Dict, Optional
+
+# 添加项目根目录到路径，以便直接运行本脚本
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from services.crawler.core.events import events
+
+AUTHKEY_ENV = 'KSX_WORKER_AUTHKEY'
+
+
+def load_worker_config() -> Dict[str, Any]:
+    """读取爬虫配置中的常驻工作进程配置"""
+    try:
+        from services.crawler.config import WORKER_CONFIG
+        return dict(WORKER_CONFIG)
+    except ImportError:
+        return {'enabled': True, 'max_jobs': 20, 'max_js_heap_mb': 512, 'max_rss_growth_mb': 800,
+                'connect_timeout': 30, 'shutdown_timeout': 10}
+
+
+def process_rss_mb() -> float:
+    """当前进程的常驻内存（MB），无法获取时返回0"""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux单位为KB，macOS为字节
+        return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+    except (ImportError, OSError):
+        return 0.0
+
+
+class CrawlerWorker:
+    """保持浏览器和登录状态，依次执行爬取任务（打包环境在后端进程中直接使用）"""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        self.config = dict(load_worker_config(), **(config or {}))
+        self.crawler = None
+        self.jobs_since_start = 0
+        self.jobs_total = 0
+        self.browser_starts = 0
+        self.baseline_rss_mb = process_rss_mb()
+        self._warm_task: Optional[asyncio.Task] = None
+
+    def _create_crawler(self):
+        from services.crawler.main import create_crawler
+        self.crawler = create_crawler()
+        self.jobs_since_start = 0
+        self.browser_starts += 1
+
+    async def _warm_up(self):
+        """启动浏览器并登录，失败时留给下一个任务重试"""
+        started = time.perf_counter()
+        try:
+            if await self.crawler.start_browser() and await self.crawler.login():
+                logging.info(f"浏览器已预热并登录，耗时 {time.perf_counter() - started:.1f}s")
+            else:
+                logging.warning("浏览器预热失败，将在执行任务时重试")
+        except Exception as e:
+            logging.warning(f"浏览器预热异常: {e}")
+
+    def warm_up(self):
+        """在后台启动浏览器并登录，不阻塞接收任务"""
+        if self.crawler is None:
+            self._create_crawler()
+        if self._warm_task is None or self._warm_task.done():
+            # 使用空的上下文，预热不属于任何任务，不把事件发给当前任务
+            self._warm_task = asyncio.create_task(self._warm_up(), context=contextvars.Context())
+
+    async def run_job(self, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        使用常驻的浏览器执行一个任务
+
+        Args:
+            kind: sync（单日）/ batch（日期范围）/ plan（生成计划并按计划爬取）
+            params: 任务参数
+        """
+        from services.crawler import main as crawler_main
+
+        if self._warm_task is not None:
+            # 预热还没完成时等待，避免同时启动两个浏览器
+            await asyncio.gather(self._warm_task, return_exceptions=True)
+            self._warm_task = None
+        if self.crawler is None:
+            self._create_crawler()
+
+        try:
+            if kind == 'sync':
+                result = await crawler_main.main(params.get('date'), crawler=self.crawler)
+            elif kind == 'plan':
+                result = await crawler_main.main_plan(params['start_date'], params.get('end_date'),
+                                                      execute=True, crawler=self.crawler)
+            else:
+                result = await crawler_main.main_range(params['start_date'], params.get('end_date'),
+                                                       resume=params.get('resume', False), crawler=self.crawler)
+        finally:
+            self.jobs_since_start += 1
+            self.jobs_total += 1
+            await self._maybe_recycle()
+        return result
+
+    async def _maybe_recycle(self):
+        """达到任务数上限、浏览器断开或页面内存过大时重启浏览器"""
+        reason = None
+        if not self.crawler.is_browser_alive():
+            reason = "浏览器已断开"
+        elif self.jobs_since_start >= self.config['max_jobs']:
+            reason = f"已执行 {self.jobs_since_start} 个任务"
+        else:
+            heap_mb = await self.crawler.js_heap_mb()
+            if heap_mb > self.config['max_js_heap_mb']:
+                reason = f"页面JS堆 {heap_mb}MB 超过 {self.config['max_js_heap_mb']}MB"
+        if reason:
+            logging.info(f"重启浏览器: {reason}")
+            await self.recycle()
+
+    async def recycle(self):
+        """关闭当前浏览器，重新启动并登录"""
+        await self.close()
+        self._create_crawler()
+        self.warm_up()
+
+    def should_exit(self) -> bool:
+        """工作进程内存增长超过上限时应退出，由后端重新启动"""
+        growth = process_rss_mb() - self.baseline_rss_mb
+        if growth > self.config['max_rss_growth_mb']:
+            logging.info(f"工作进程内存增长 {growth:.0f}MB，超过 {self.config['max_rss_growth_mb']}MB，任务结束后退出")
+            return True
+        return False
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'pid': os.getpid(),
+            'jobs_total': self.jobs_total,
+            'jobs_since_browser_start': self.jobs_since_start,
+            'browser_starts': self.browser_starts,
+            'browser_alive': bool(self.crawler and self.crawler.is_browser_alive()),
+            'logged_in': bool(self.crawler and self.crawler.logged_in),
+            'rss_mb': round(process_rss_mb(), 1),
+        }
+
+    async def close(self):
+        """关闭浏览器"""
+        if self._warm_task is not None:
+            self._warm_task.cancel()
+            await asyncio.gather(self._warm_task, return_exceptions=True)
+            self._warm_task = None
+        if self.crawler is not None:
+            await self.crawler.close()
+            self.crawler = None
+
+
+async def serve(address, authkey: bytes):
+    """连接后端并依次执行收到的任务，直到后端要求退出或连接断开"""
+    conn = Client(address, authkey=authkey)
+    send_lock = threading.Lock()
+
+    def send(message: Dict[str, Any]):
+        with send_lock:
+            conn.send(message)
+
+    worker = CrawlerWorker()
+    worker.warm_up()
+    logging.info(f"爬虫工作进程已启动，进程ID: {os.getpid()}")
+
+    try:
+        while True:
+            message = await asyncio.to_thread(conn.recv)
+            kind = message.get('type')
+            if kind == 'shutdown':
+                logging.info("收到退出请求")
+                break
+            if kind == 'ping':
+                send({'type': 'pong', 'worker': worker.status()})
+                continue
+            if kind != 'job':
+                logging.warning(f"忽略未知消息: {kind}")
+                continue
+
+            job_id = message.get('job_id')
+            logging.info(f"开始执行任务 {job_id}: {message.get('kind')} {message.get('params')}")
+            token = events.set_sink(lambda event: send({'type': 'event', 'job_id': job_id, 'event': event}))
+            try:
+                result = await worker.run_job(message.get('kind'), message.get('params') or {})
+            except Exception as e:
+                logging.error(f"任务 {job_id} 执行异常: {e}", exc_info=True)
+                result = {"success": False, "message": f"爬虫执行异常: {e}", "total": 0}
+            finally:
+                events.reset_sink(token)
+
+            restart = worker.should_exit()
+            send({'type': 'result', 'job_id': job_id, 'result': result, 'worker': worker.status(), 'restart': restart})
+            if restart:
+                break
+    except (EOFError, OSError):
+        logging.info("与后端的连接已断开")
+    finally:
+        await worker.close()
+        conn.close()
+        logging.info("爬虫工作进程已退出")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='KSX常驻爬虫工作进程')
+    parser.add_argument('--connect', type=str, required=True, help='后端IPC地址 host:port')
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler()]
+    )
+
+    host, port = args.connect.rsplit(':', 1)
+    authkey = bytes.fromhex(os.environ.get(AUTHKEY_ENV, ''))
+    asyncio.run(serve((host, int(port)), authkey))
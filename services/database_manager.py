@@ -12,7 +12,7 @@ import shutil
 import sys
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 # 尝试导入loguru，如果失败则使用标准logging
 try:
     from loguru import logger
@@ -90,7 +90,8 @@ class DatabaseManager:
         # 固定的数据表结构定义
         self.schema = self._get_schema()
         
-    def _get_schema(self) -> List[Dict[str, Any]]:
+    @staticmethod
+    def _get_schema() -> List[Dict[str, Any]]:
         """获取数据表结构定义 - 根据data.json完整设计"""
         return [
             # 基础字段
@@ -296,44 +297,40 @@ class DatabaseManager:
             conn = sqlite3.connect(str(db_path))
             cursor = conn.cursor()
             
-            inserted_count = 0
-            
+            # 整理本批数据：确保有原始ID字段，并在批内去重
+            batch = {}
             for item in data:
-                # 确保有原始ID字段
                 raw_id = item.get('ID') or item.get('id') or item.get('rawId')
                 if not raw_id:
                     logger.warning("数据项缺少原始ID字段，跳过")
                     continue
-                
-                # 检查是否已存在（基于rawId去重）
-                cursor.execute("SELECT COUNT(*) FROM ksx_data WHERE rawId = ?", (raw_id,))
-                if cursor.fetchone()[0] > 0:
+                if raw_id not in batch:
+                    batch[raw_id] = item
+            
+            # 一次性查询已存在的rawId（基于rawId去重），替代逐条SELECT
+            existing_ids = set()
+            raw_ids = list(batch.keys())
+            for start in range(0, len(raw_ids), 500):
+                chunk = raw_ids[start:start + 500]
+                placeholders = ','.join(['?'] * len(chunk))
+                cursor.execute(f"SELECT rawId FROM ksx_data WHERE rawId IN ({placeholders})", chunk)
+                existing_ids.update(str(row[0]) for row in cursor.fetchall())
+            
+            # 准备插入的列和值，缺失的字段插入空值
+            columns = [col['name'] for col in self.schema]
+            rows = []
+            for raw_id, item in batch.items():
+                if str(raw_id) in existing_ids:
                     logger.debug(f"记录已存在，跳过: {raw_id}")
                     continue
-                
-                # 准备插入数据，确保rawId字段
                 item_copy = item.copy()
                 item_copy['rawId'] = raw_id
-                
-                # 准备插入的列和值
-                columns = []
-                values = []
-                
-                for col in self.schema:
-                    col_name = col['name']
-                    if col_name in item_copy:
-                        columns.append(col_name)
-                        values.append(item_copy[col_name])
-                    else:
-                        # 对于缺失的字段，插入空值
-                        columns.append(col_name)
-                        values.append(None)
-                
-                placeholders = ','.join(['?'] * len(columns))
-                sql = f"INSERT INTO ksx_data ({','.join(columns)}) VALUES ({placeholders})"
-                
-                cursor.execute(sql, values)
-                inserted_count += 1
+                rows.append([item_copy.get(col_name) for col_name in columns])
+            
+            placeholders = ','.join(['?'] * len(columns))
+            sql = f"INSERT INTO ksx_data ({','.join(columns)}) VALUES ({placeholders})"
+            cursor.executemany(sql, rows)
+            inserted_count = len(rows)
             
             conn.commit()
             conn.close()
@@ -425,6 +422,80 @@ class DatabaseManager:
             logger.error(f"查询数据失败: {e}")
             raise
     
+    def query_columns(self, date: datetime, columns: List[str]) -> List[Dict[str, Any]]:
+        """
+        查询指定日期数据库中所有记录的部分字段（按created_at排序），用于批量加载
+        
+        Args:
+            date: 日期
+            columns: 需要的字段，表中不存在的字段会被忽略
+            
+        Returns:
+            记录列表，数据库不存在时返回空列表
+        """
+        db_path = self.get_database_path(date)
+        if not db_path.exists():
+            return []
+        
+        try:
+            conn = sqlite3.connect(str(db_path))
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            existing = {row[1] for row in cursor.execute("PRAGMA table_info(ksx_data)")}
+            selected = [column for column in dict.fromkeys(columns) if column in existing]
+            if not selected:
+                conn.close()
+                return []
+            column_sql = ", ".join(f'"{column}"' for column in selected)
+            cursor.execute(f"SELECT {column_sql} FROM ksx_data ORDER BY created_at ASC")
+            data = [dict(row) for row in cursor.fetchall()]
+            conn.close()
+            return data
+        except Exception as e:
+            logger.error(f"批量查询数据失败 {db_path}: {e}")
+            raise
+    
+    def get_file_versions(self) -> Dict[str, Tuple[int, int]]:
+        """
+        所有日期数据库文件的版本，用于判断数据是否有变化
+
+        Returns:
+            {文件名: (文件大小, 修改时间纳秒)}，如 {'ksx_2025-08-01.db': (40960, 1754000000000000000)}
+        """
+        versions = {}
+        for db_file in self.base_dir.rglob("ksx_*.db"):
+            try:
+                stat = db_file.stat()
+            except OSError:
+                continue
+            versions[db_file.name] = (stat.st_size, stat.st_mtime_ns)
+        return versions
+
+    def count_records(self, date: datetime) -> int:
+        """
+        统计指定日期数据库中的记录数
+        
+        Args:
+            date: 日期
+            
+        Returns:
+            记录数，数据库不存在时返回0
+        """
+        db_path = self.get_database_path(date)
+        if not db_path.exists():
+            return 0
+        
+        try:
+            conn = sqlite3.connect(str(db_path))
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM ksx_data")
+            count = cursor.fetchone()[0]
+            conn.close()
+            return count
+        except Exception as e:
+            logger.warning(f"统计数据库记录数失败 {db_path}: {e}")
+            return 0
+    
     def cleanup_old_databases(self, keep_months: int = 1):
         """
         清理旧的数据库文件
@@ -506,6 +577,7 @@ class DatabaseManager:
             门店列表，包含name和value字段
         """
         stores = []
+        seen = set()
         
         # 遍历所有数据库文件，收集门店信息
         for db_file in self.base_dir.rglob("ksx_*.db"):
@@ -523,9 +595,9 @@ class DatabaseManager:
                 """)
                 
                 for row in cursor.fetchall():
-                    store = dict(row)
-                    if store not in stores:
-                        stores.append(store)
+                    if row['name'] not in seen:
+                        seen.add(row['name'])
+                        stores.append(dict(row))
                 
                 conn.close()
                 